@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: การ clean ของ scrap4 แบบเดิม (applymap ทีละ cell) เทียบกับ clean_frame (vectorized)
+- สร้างข้อมูลสังเคราะห์หน้าตาเหมือนประวัติเขื่อน (มี NaN / ขีด / ว่าง / space)
+- ตรวจว่า CSV ที่ได้ตรงกันทุก byte แล้วรายงานเวลาเป็นวินาทีต่อ 1 ล้านแถว
+
+ใช้งาน: python bench/bench_clean.py --rows 2000000 3000000
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scrap4 import clean_frame  # noqa: E402
+
+COLUMNS = [
+    "Dam", "Location", "Capacity_Total", "Capacity_Usable", "Water_Stored",
+    "Water_Usable", "Inflow", "Outflow", "Data_Time", "Water_Type", "DamType",
+]
+VALUES = [
+    "เขื่อนบางลาง", " ยะลา ", "1,454.36", "265", "1,248.49 (86%)", "972.21 (67%)",
+    "0.05", "-", "--", "–", "—", "", " - ", "18/03/2025", "แหล่งน้ำขนาดใหญ่", "large",
+]
+
+
+def synth_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pool = np.array(VALUES + [None], dtype=object)
+    data = {c: pool[rng.integers(0, len(pool), rows)] for c in COLUMNS}
+    return pd.DataFrame(data)
+
+
+def legacy_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """สำเนาขั้นตอนเดิมของ run_merge_only ไว้เทียบผล"""
+    df = df.fillna("0")
+    df = df.replace({"-": "0", "--": "0", "–": "0", "—": "0", "": "0"})
+    per_cell = getattr(df, "map", None) or df.applymap
+    return per_cell(lambda x: x.strip() if isinstance(x, str) else x)
+
+
+def csv_digest(df: pd.DataFrame) -> str:
+    return hashlib.sha256(df.to_csv(index=False).encode("utf-8")).hexdigest()
+
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    ap.add_argument("--skip-legacy", action="store_true", help="ไม่รันแบบเดิม (เร็วขึ้น แต่ไม่เทียบผล)")
+    args = ap.parse_args()
+
+    ok = True
+    for n in args.rows:
+        df = synth_frame(n)
+        new, t_new = timed(clean_frame, df)
+        line = f"rows={n:>10,}  vectorized={t_new / n * 1e6:7.3f}s/M"
+        if not args.skip_legacy:
+            old, t_old = timed(legacy_clean, df)
+            same = csv_digest(old) == csv_digest(new)
+            ok &= same
+            line += f"  legacy={t_old / n * 1e6:7.3f}s/M  speedup={t_old / t_new:5.1f}x  identical={same}"
+        print(line)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
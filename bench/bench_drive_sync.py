@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: drive_merge_update แบบเดิม (ดาวน์โหลดทั้งไฟล์ + อัปโหลดทั้งไฟล์ทุกวัน)
+เทียบกับ drive_sync.sync_append บน Drive จำลองในเครื่อง (bench/fake_drive.py)
+- จำลองข้อมูลฝนรายวัน 77 จังหวัด x 7 วัน ต่อท้ายไฟล์ที่มีประวัติอยู่แล้ว
+- รอบที่ 2 ของแต่ละวันเป็นการรันซ้ำ (ไม่มีแถวใหม่)
+- ตรวจว่าไฟล์บน Drive สุดท้ายเหมือนกันทุก byte แล้วรายงาน byte ที่รับ/ส่ง
+
+ใช้งาน: python bench/bench_drive_sync.py --history-days 365 --days 5
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_drive import FakeDrive  # noqa: E402
+
+PROVINCES = [f"จังหวัด{i:02d}" for i in range(77)]
+
+
+def day_rows(day: date) -> pd.DataFrame:
+    rows = []
+    for p in PROVINCES:
+        for k in range(7):
+            d = day + timedelta(days=k)
+            rows.append({"Province": p, "DateTime": d.isoformat(), "Rain": f"{(hash((p, d)) % 100)}%",
+                         "Temp": str(20 + hash((d, p)) % 15)})
+    return pd.DataFrame(rows)
+
+
+def legacy_merge_update(service, file_id: str, df_new: pd.DataFrame) -> int:
+    """สำเนา drive_merge_update เดิม (เรียงคอลัมน์แบบคงที่เพื่อเทียบผลได้)"""
+    from googleapiclient.http import MediaIoBaseUpload
+    data = service.files().get_media(fileId=file_id).execute()
+    df_old = pd.read_csv(io.StringIO(data.decode("utf-8-sig")))
+    all_cols = list(dict.fromkeys([*df_old.columns, *df_new.columns]))
+    merged = pd.concat([df_old.reindex(columns=all_cols), df_new.reindex(columns=all_cols)], ignore_index=True)
+    merged.drop_duplicates(subset=["Province", "DateTime"], keep="last", inplace=True)
+    buf = io.BytesIO(merged.to_csv(index=False).encode("utf-8-sig"))
+    service.files().update(fileId=file_id, media_body=MediaIoBaseUpload(buf, mimetype="text/csv"),
+                           supportsAllDrives=True).execute()
+    return len(merged)
+
+
+def run(mode: str, history: bytes, days: list) -> dict:
+    with tempfile.TemporaryDirectory() as tmp, FakeDrive({"rain": history}) as fake:
+        os.environ["DRIVE_CACHE_DIR"] = os.path.join(tmp, "cache")
+        os.environ["KEY_INDEX_DIR"] = os.path.join(tmp, "keys")
+        import importlib
+        import drive_sync
+        import key_index
+        importlib.reload(key_index)
+        importlib.reload(drive_sync)
+        service = fake.service()
+        for d in days:
+            for _ in range(2):  # รันจริง + รันซ้ำ
+                df_new = day_rows(d)
+                if mode == "legacy":
+                    legacy_merge_update(service, "rain", df_new)
+                else:
+                    drive_sync.sync_append(service, "rain", df_new, "rain")
+        return {**fake.stats, "final": fake.files["rain"]}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--history-days", type=int, default=365)
+    ap.add_argument("--days", type=int, default=5)
+    args = ap.parse_args()
+
+    start = date(2025, 1, 1)
+    hist = pd.concat([day_rows(start + timedelta(days=i)) for i in range(args.history_days)])
+    hist = hist.drop_duplicates(subset=["Province", "DateTime"], keep="last")
+    history = hist.to_csv(index=False).encode("utf-8-sig")
+    days = [start + timedelta(days=args.history_days + i) for i in range(args.days)]
+
+    res = {m: run(m, history, days) for m in ("legacy", "sync")}
+    same = res["legacy"]["final"] == res["sync"]["final"]
+    for m, r in res.items():
+        print(f"{m:<7} download={r['download_bytes'] / 1e6:8.2f} MB  upload={r['upload_bytes'] / 1e6:8.2f} MB  "
+              f"chunks={r['upload_chunks']}")
+    print(f"history={len(history) / 1e6:.2f} MB  runs={2 * args.days}  identical={same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
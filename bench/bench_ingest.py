@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: read_csv_smart แบบเดิม (ไล่ encoding ทีละตัว) เทียบกับ csv_ingest.read_csv_fast
+- สร้างไฟล์ประวัติเขื่อนสังเคราะห์เป็น utf-8-sig และ cp874 (กรณีที่แบบเดิมต้องอ่านซ้ำหลายรอบ)
+- อ่านไฟล์จริงที่ commit ไว้ (waterdam_report_large.csv: ค่า "0", "22" ที่ pyarrow เคยเดาเป็นตัวเลข) ด้วย
+- ตรวจว่า DataFrame ที่ได้เท่ากันทุกค่าทั้ง engine pyarrow และ c แล้วรายงานเวลาถึง DataFrame
+
+ใช้งาน: python bench/bench_ingest.py --rows 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from bench_clean import synth_frame  # noqa: E402
+from csv_ingest import _pyarrow_available, read_csv_fast  # noqa: E402
+
+REAL_CSV = os.path.join(ROOT, "waterdam_report_large.csv")
+
+
+def legacy_read(path: str) -> pd.DataFrame:
+    """สำเนา read_csv_smart เดิมไว้เทียบผล"""
+    for enc in ("utf-8-sig", "utf-8", "cp874", "latin-1"):
+        try:
+            return pd.read_csv(path, encoding=enc, dtype=str, low_memory=False, on_bad_lines="warn")
+        except UnicodeDecodeError:
+            continue
+    raise RuntimeError(path)
+
+
+def timed(fn, path):
+    t0 = time.perf_counter()
+    out = fn(path)
+    return out, time.perf_counter() - t0
+
+
+def compare(label: str, path: str, engines) -> bool:
+    ok = True
+    old, t_old = timed(legacy_read, path)
+    for engine in engines:
+        new, t_new = timed(lambda p: read_csv_fast(p, engine=engine), path)
+        same = old.equals(new)
+        ok &= same
+        print(f"{label:<26}  {engine:<7}  legacy={t_old:6.2f}s  single-pass={t_new:6.2f}s  "
+              f"speedup={t_old / t_new:4.1f}x  identical={same}")
+    return ok
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[300_000])
+    args = ap.parse_args()
+
+    engines = (["pyarrow"] if _pyarrow_available("pyarrow") else []) + ["c"]
+    ok = compare(os.path.basename(REAL_CSV), REAL_CSV, engines)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            df = synth_frame(n)
+            for enc in ("utf-8-sig", "cp874"):
+                path = os.path.join(tmp, f"dam_{enc}.csv")
+                df.to_csv(path, index=False, encoding=enc)
+                ok &= compare(f"rows={n:,} {enc}", path, engines)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark รวมของทุก scraper บนเว็บจำลองในเครื่อง (bench/fake_sites.py) ไม่ต้องออกเน็ต
+- scrap1 / scrap2 / scrap3: รันสคริปต์จริงเต็มรอบ (Chrome + Selenium) ชี้ URL ไปที่เว็บจำลอง
+- scrap1_api: scrap1 ผ่าน JSON API พยากรณ์ 7 วัน (TMD_FORECAST_API) ไม่เปิด Chrome
+- scrap4: รวมประวัติเขื่อนสังเคราะห์ขนาดต่าง ๆ (--merge-rows 10000 ... 10000000)
+- แต่ละเคสรันเป็นโปรเซสใหม่ในโฟลเดอร์ว่าง (ไม่มี cache / checkpoint / fingerprint ค้าง) พร้อม METRICS=true
+- รายงาน แถว/วินาที, latency ต่อหน้า p50/p95 (จาก metrics JSON) และ peak RSS ของโปรเซส Python (ไม่รวม Chrome)
+- --save-baseline เก็บผลเป็น baseline; รันครั้งต่อไปเทียบกับ baseline แล้ว exit 1 ถ้าแย่ลงเกิน --tolerance
+  (baseline ขึ้นกับเครื่อง -> สร้างบนเครื่อง/runner ที่จะใช้เทียบเอง)
+
+ใช้งาน:
+    python bench/bench_suite.py --save-baseline
+    python bench/bench_suite.py --cases scrap4 --merge-rows 10000 100000 1000000 10000000
+"""
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_clean import COLUMNS, synth_frame  # noqa: E402
+from fake_sites import FORECAST_API, FakeSites  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+GEN_CHUNK = 1_000_000
+LARGE_SHARE = 0.7
+
+# ค่าที่เทียบกับ baseline: ชื่อ -> True ถ้ามากกว่าดีกว่า
+COMPARED = {"rows_per_s": True, "page_p95_s": False, "rss_mb": False}
+
+
+# ================================== RUN ================================== #
+def run_case(name: str, script: str, env: Dict[str, str], workdir: str, page_stage: Optional[str],
+             input_rows: Optional[int] = None) -> dict:
+    """รันสคริปต์ในโปรเซสใหม่; peak RSS จาก wait4 ของโปรเซสนั้น"""
+    os.makedirs(workdir, exist_ok=True)
+    full_env = {**os.environ, "METRICS": "true", "METRICS_DIR": os.path.join(workdir, "metrics"),
+                "PYTHONUNBUFFERED": "1", **env}
+    log_path = os.path.join(workdir, "run.log")
+    t0 = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.Popen([sys.executable, os.path.join(ROOT, script)], cwd=workdir, env=full_env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    wall = time.perf_counter() - t0
+
+    snap = {}
+    dumps = sorted(glob.glob(os.path.join(workdir, "metrics", "*.json")))
+    if dumps:
+        with open(dumps[-1], encoding="utf-8") as f:
+            snap = json.load(f)
+    counters = snap.get("counters", {})
+    rows = input_rows if input_rows is not None else int(counters.get("rows_saved") or counters.get("rows_written") or 0)
+    page = snap.get("stages", {}).get(page_stage or "", {})
+    result = {
+        "exit": proc.returncode,
+        "rows": rows,
+        "wall_s": round(wall, 3),
+        "rows_per_s": round(rows / wall, 1) if wall else 0.0,
+        "pages": page.get("count", 0),
+        "page_p50_s": page.get("p50_s"),
+        "page_p95_s": page.get("p95_s"),
+        "rss_mb": round(usage.ru_maxrss / 1024, 1),  # Linux: KB
+    }
+    if proc.returncode != 0:
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            tail = f.readlines()[-15:]
+        print(f"❌ {name} exit={proc.returncode} (log: {log_path})\n" + "".join(tail))
+    return result
+
+
+def has_selenium() -> bool:
+    return importlib.util.find_spec("selenium") is not None
+
+
+def has_browser() -> bool:
+    return has_selenium() and any(shutil.which(n) for n in CHROME_NAMES)
+
+
+def scraper_cases(site: FakeSites, args) -> List[tuple]:
+    """(ชื่อ, สคริปต์, env, ชื่อ stage ที่ใช้เป็น latency ต่อหน้า)"""
+    common = {"HTTP_CACHE": "false", "ENABLE_GOOGLE_DRIVE_UPLOAD": "false", "FORCE_SCRAPE": "true",
+              "HISTORY_STORE": "false", "CAPTURE_JSON": "false", "FETCH_MODE": "selenium"}
+    return [
+        ("scrap1", "scrap1.py", {**common, "TMD_URL": site.url, "CSV_OUT": "rain.csv",
+                                 "RAIN_WORKERS": str(args.rain_workers)}, "province"),
+        ("scrap1_api", "scrap1.py", {**common, "TMD_URL": site.url, "CSV_OUT": "rain.csv",
+                                     "TMD_FORECAST_API": FORECAST_API}, "forecast_api"),
+        ("scrap2", "scrap2.py", {**common, "WATERLEVEL_URL": f"{site.url}/waterlevel",
+                                 "CSV_OUT": "waterlevel.csv"}, "page"),
+        ("scrap3", "scrap3.py", {**common, "DAM_URL": f"{site.url}/dam"}, "page"),
+    ]
+
+
+def make_history(rows: int, folder: str) -> Dict[str, str]:
+    """ไฟล์ large/medium สังเคราะห์ (เขียนทีละก้อน ไม่ต้องถือทั้งหมดในหน่วยความจำ)"""
+    os.makedirs(folder, exist_ok=True)
+    paths = {"LARGE_CSV": os.path.join(folder, "large.csv"), "MEDIUM_CSV": os.path.join(folder, "medium.csv")}
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+    split = {"LARGE_CSV": int(rows * LARGE_SHARE), "MEDIUM_CSV": rows - int(rows * LARGE_SHARE)}
+    cols = [c for c in COLUMNS if c != "DamType"]
+    seed = 0
+    for key, n in split.items():
+        first = True
+        for start in range(0, n, GEN_CHUNK):
+            df = synth_frame(min(GEN_CHUNK, n - start), seed=seed)[cols]
+            df.to_csv(paths[key], mode="w" if first else "a", header=first, index=False, encoding="utf-8")
+            first, seed = False, seed + 1
+    return paths
+
+
+# ================================== REPORT ================================== #
+def _fmt(v, spec: str) -> str:
+    return "-" if v is None else format(v, spec)
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base or res["exit"] != 0:
+            continue
+        for key, higher_better in COMPARED.items():
+            new, old = res.get(key), base.get(key)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_better else change
+            if worse > tolerance:
+                regressions.append(f"{name}.{key}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def print_table(results: Dict[str, dict], baseline: Dict[str, dict]) -> None:
+    print(f"\n{'case':<16}{'rows':>10}{'wall s':>9}{'rows/s':>11}{'pages':>7}{'p50 s':>8}{'p95 s':>8}"
+          f"{'RSS MB':>9}  vs baseline")
+    for name, r in results.items():
+        base = baseline.get(name, {})
+        delta = f"{(r['rows_per_s'] - base['rows_per_s']) / base['rows_per_s']:+.0%} rows/s" \
+            if base.get("rows_per_s") else ""
+        status = "" if r["exit"] == 0 else f"  ❌ exit {r['exit']}"
+        print(f"{name:<16}{r['rows']:>10,}{r['wall_s']:>9.2f}{r['rows_per_s']:>11,.0f}{r['pages']:>7}"
+              f"{_fmt(r['page_p50_s'], '.3f'):>8}{_fmt(r['page_p95_s'], '.3f'):>8}{r['rss_mb']:>9.1f}  {delta}{status}")
+
+
+# ================================== MAIN ================================== #
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", nargs="+", default=["scrap1", "scrap1_api", "scrap2", "scrap3", "scrap4"])
+    ap.add_argument("--merge-rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--waterlevel-pages", type=int, default=10)
+    ap.add_argument("--dam-pages", type=int, default=5)
+    ap.add_argument("--rows", type=int, default=200, help="แถวต่อหน้าของตารางจำลอง")
+    ap.add_argument("--delay-ms", type=int, default=50, help="ดีเลย์จำลองของ API หลังคลิก")
+    ap.add_argument("--rain-workers", type=int, default=1)
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="แย่ลงเกินสัดส่วนนี้ = regression")
+    ap.add_argument("--out", help="เขียนผลทั้งหมดเป็น JSON")
+    ap.add_argument("--keep", action="store_true", help="ไม่ลบโฟลเดอร์ทำงาน (ไว้ดู log/ไฟล์ผลลัพธ์)")
+    args = ap.parse_args()
+
+    baseline: Dict[str, dict] = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    results: Dict[str, dict] = {}
+    work = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        # scrap1_api ไม่เปิด Chrome แต่ scrap1 ยัง import selenium อยู่
+        site_cases = [c for c in ("scrap1", "scrap1_api", "scrap2", "scrap3") if c in args.cases]
+        skipped = [c for c in site_cases if not (has_browser() or c == "scrap1_api" and has_selenium())]
+        if skipped:
+            print(f"⚠️ ไม่มี selenium/Chrome -> ข้าม {', '.join(skipped)}")
+        if set(site_cases) - set(skipped):
+            with FakeSites(args.waterlevel_pages, args.dam_pages, args.rows, args.delay_ms) as site:
+                print(f"🌐 เว็บจำลอง {site.url}")
+                for name, script, env, page_stage in scraper_cases(site, args):
+                    if name in site_cases and name not in skipped:
+                        print(f"▶️ {name}")
+                        results[name] = run_case(name, script, env, os.path.join(work, name), page_stage)
+
+        if "scrap4" in args.cases:
+            for n in args.merge_rows:
+                name = f"scrap4_{n}"
+                print(f"▶️ {name} (สร้างข้อมูล {n:,} แถว)")
+                env = make_history(n, os.path.join(work, "history", str(n)))
+                env.update(OUT_CSV=os.path.join(work, name, "merged.csv"), HISTORY_STORE="false")
+                results[name] = run_case(name, "scrap4.py", env, os.path.join(work, name), None, input_rows=n)
+    finally:
+        if args.keep:
+            print(f"📁 โฟลเดอร์ทำงาน: {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print_table(results, baseline)
+    doc = {"when": time.strftime("%Y-%m-%d %H:%M:%S"), "python": sys.version.split()[0],
+           "args": {k: v for k, v in vars(args).items() if k not in ("out", "keep", "save_baseline")},
+           "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        baseline_ok = all(r["exit"] == 0 for r in results.values())
+        if baseline_ok:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(doc, f, ensure_ascii=False, indent=2)
+            print(f"💾 บันทึก baseline -> {args.baseline}")
+        return 0 if baseline_ok else 1
+
+    failed = [n for n, r in results.items() if r["exit"] != 0]
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"📉 {line}")
+    if not baseline:
+        print("ℹ️ ยังไม่มี baseline (รันด้วย --save-baseline ก่อน)")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Google Drive v3 จำลองในเครื่อง (เฉพาะ endpoint ของ files ที่ drive_sync ใช้) สำหรับ benchmark/ลองระบบ
+- GET   /drive/v3/files/{id}                 : metadata (md5Checksum, modifiedTime, size)
+- GET   /drive/v3/files/{id}?alt=media       : เนื้อไฟล์ (รองรับ Range แบบ chunk)
+- PATCH /upload/drive/v3/files/{id}?uploadType=media     : อัปโหลดทั้งไฟล์ครั้งเดียว
+- PATCH /upload/drive/v3/files/{id}?uploadType=resumable : เปิด session
+- PUT   /upload/session/{n}                  : ส่งทีละ chunk ตาม Content-Range (308 จนกว่าจะครบ)
+นับจำนวน byte ที่ดาวน์โหลด/อัปโหลดไว้ใน .stats
+
+ใช้งาน:
+    with FakeDrive({"abc": b"..."}) as fake:
+        service = fake.service()
+"""
+import hashlib
+import json
+import re
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, *args):  # เงียบ
+        pass
+
+    def _json(self, code: int, body: dict, headers: Dict[str, str] = None) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        m = re.fullmatch(r"/drive/v3/files/([^/]+)", url.path)
+        fake = self.server.fake
+        if not m or m.group(1) not in fake.files:
+            return self._json(404, {"error": {"code": 404, "message": "File not found"}})
+        fid = m.group(1)
+        data = fake.files[fid]
+        if parse_qs(url.query).get("alt") != ["media"]:
+            return self._json(200, fake.meta(fid))
+        start, end = 0, len(data) - 1
+        rng = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if rng:
+            start = int(rng.group(1))
+            end = min(int(rng.group(2) or end), len(data) - 1)
+        part = data[start:end + 1]
+        fake.stats["download_bytes"] += len(part)
+        self.send_response(206 if rng else 200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(part)))
+        if rng:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        self.wfile.write(part)
+
+    def do_PATCH(self):
+        url = urlparse(self.path)
+        m = re.fullmatch(r"/upload/drive/v3/files/([^/]+)", url.path)
+        fake = self.server.fake
+        body = self._body()
+        if not m or m.group(1) not in fake.files:
+            return self._json(404, {"error": {"code": 404, "message": "File not found"}})
+        if parse_qs(url.query).get("uploadType") == ["media"]:
+            # อัปโหลดครั้งเดียวทั้งไฟล์ (MediaIoBaseUpload แบบไม่ resumable)
+            fake.stats["upload_bytes"] += len(body)
+            fake.stats["upload_chunks"] += 1
+            fake.put(m.group(1), body)
+            return self._json(200, fake.meta(m.group(1)))
+        with fake.lock:
+            sid = str(len(fake.sessions))
+            fake.sessions[sid] = {"fid": m.group(1), "buf": bytearray()}
+        host = self.headers.get("Host")
+        self.send_response(200)
+        self.send_header("Location", f"http://{host}/upload/session/{sid}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        m = re.fullmatch(r"/upload/session/(\d+)", urlparse(self.path).path)
+        fake = self.server.fake
+        chunk = self._body()
+        sess = fake.sessions.get(m.group(1)) if m else None
+        if sess is None:
+            return self._json(404, {"error": {"code": 404, "message": "No session"}})
+        sess["buf"] += chunk
+        fake.stats["upload_bytes"] += len(chunk)
+        fake.stats["upload_chunks"] += 1
+        total = re.search(r"/(\d+|\*)$", self.headers.get("Content-Range", ""))
+        if total and total.group(1) != "*" and len(sess["buf"]) >= int(total.group(1)):
+            fake.put(sess["fid"], bytes(sess["buf"]))
+            return self._json(200, fake.meta(sess["fid"]))
+        self.send_response(308)
+        self.send_header("Range", f"bytes=0-{len(sess['buf']) - 1}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class _Server(ThreadingHTTPServer):
+    fake: "FakeDrive"
+
+
+class FakeDrive:
+    def __init__(self, files: Dict[str, bytes] = None):
+        self.files: Dict[str, bytes] = {}
+        self.modified: Dict[str, str] = {}
+        self.sessions: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+        self.stats = {"download_bytes": 0, "upload_bytes": 0, "upload_chunks": 0}
+        for fid, data in (files or {}).items():
+            self.put(fid, data)
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def put(self, fid: str, data: bytes) -> None:
+        self.files[fid] = data
+        self.modified[fid] = datetime.now(timezone.utc).isoformat()
+
+    def meta(self, fid: str) -> dict:
+        data = self.files[fid]
+        return {
+            "id": fid, "name": f"{fid}.csv", "mimeType": "text/csv",
+            "md5Checksum": hashlib.md5(data).hexdigest(),
+            "modifiedTime": self.modified[fid], "size": str(len(data)),
+        }
+
+    def service(self):
+        """googleapiclient service ที่ชี้มาที่ server นี้ (ไม่ต้องใช้ credentials)"""
+        import httplib2
+        from googleapiclient.discovery import build
+
+        local = self.url
+
+        class _Http(httplib2.Http):
+            # googleapiclient บังคับ URL อัปโหลดเป็น https -> ชี้กลับมาที่ server http ตัวนี้
+            def request(self, uri, *args, **kwargs):
+                return super().request(uri.replace("https://" + local[len("http://"):], local), *args, **kwargs)
+
+        return build("drive", "v3", http=_Http(), static_discovery=True,
+                     client_options={"api_endpoint": f"{self.url}/drive/v3/"})
+
+    def __enter__(self) -> "FakeDrive":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
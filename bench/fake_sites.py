@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+เว็บจำลองในเครื่องของทุกหน้าที่ scraper ใช้ สำหรับ benchmark แบบไม่ต้องออกเน็ต
+- GET /                     : หน้าแรก TMD (#province-selector, .forecast-weather, .forecast-rain)
+- GET /api/province/select  : รายชื่อจังหวัด (JSON แบบเดียวกับ TMD)
+- GET /api/forecast/7days?province=<id> : พยากรณ์ 7 วันของจังหวัด (ใช้กับ TMD_FORECAST_API ของ scrap1)
+- GET /waterlevel           : ตาราง MUI แบ่งหน้า (เมนู Rows per page 50/100/200 + ปุ่ม first/prev/next/last)
+- GET /dam                  : ตาราง MUI 2 แท็บ (tabpanel-0 ขนาดใหญ่, tabpanel-1 ขนาดกลาง)
+- GET /api/waterlevel, /api/dam/large, /api/dam/medium ?page=<n>&per_page=<n>
+                            : API แบ่งหน้าฝั่ง server ที่ตารางเรียกผ่าน XHR (record รูปแบบเดียวกับเว็บจริง
+                              {"data": {"data": [...], "current_page", "last_page", "total"}})
+record สร้างจากเลขแถว (ไม่มีไฟล์ fixture) หรือใส่ payload ที่บันทึกจากเว็บจริงผ่าน records=
+จำนวนหน้า/แถวต่อหน้า/ดีเลย์ตั้งได้
+
+ใช้งาน:
+    with FakeSites(waterlevel_pages=20, dam_pages=10, rows=200) as site:
+        os.environ["WATERLEVEL_URL"] = site.url + "/waterlevel"
+หรือเปิดดูด้วย browser: python bench/fake_sites.py --port 8000
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+PROVINCES = [f"จังหวัด{i:02d}" for i in range(1, 78)]
+FORECAST_API = "/api/forecast/7days?province={id}"
+# API ของแต่ละตาราง (ตามลำดับแท็บ)
+TABLE_APIS = {"waterlevel": ["waterlevel"], "dam": ["dam/large", "dam/medium"]}
+
+_TMD_HOME = """<!doctype html>
+<html><head><meta charset="utf-8"><title>TMD (fake)</title></head>
+<body>
+<select id="province-selector">{options}</select>
+<div class="forecast-weather"></div>
+<div class="forecast-rain"></div>
+<script>
+const DELAY = {delay};
+const sel = document.getElementById('province-selector');
+function show() {{
+  const v = Number(sel.value);
+  setTimeout(function () {{
+    document.querySelector('.forecast-weather').textContent = 'ฝนฟ้าคะนอง ' + sel.options[sel.selectedIndex].text;
+    document.querySelector('.forecast-rain').textContent = ((v * 37) % 100) + '%';
+  }}, DELAY);
+}}
+sel.addEventListener('change', show);
+show();
+</script>
+</body></html>
+"""
+
+_TABLE_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title} (fake)</title></head>
+<body>
+<div role="tablist">{tabs}</div>
+<table class="MuiTable-root"><thead><tr>{heads}</tr></thead><tbody></tbody></table>
+<div class="MuiTablePagination-root">
+  <p>Rows per page:</p>
+  <div class="MuiInputBase-root"><div role="button" id="rpp"></div></div>
+  <p id="range"></p>
+  <span title="First Page"><button aria-label="Go to first page">&laquo;</button></span>
+  <span title="Previous Page"><button aria-label="Go to previous page">&lsaquo;</button></span>
+  <span title="Next Page"><button aria-label="Go to next page">&rsaquo;</button></span>
+  <span title="Last Page"><button aria-label="Go to last page">&raquo;</button></span>
+</div>
+<ul role="listbox" id="menu" style="display:none">{menu}</ul>
+<script>
+const CFG = {cfg};
+const tbody = document.querySelector('.MuiTable-root tbody');
+let tab = 0, page = 0, per = CFG.per_page, count = 0, seq = 0, records = [];
+
+function num(x) {{ return x == null ? '' : x.toLocaleString('en-US', {{maximumFractionDigits: 2}}); }}
+function withPct(x, p) {{ return num(x) + ' (' + Math.round(p) + '%)'; }}
+function wlRow(r) {{
+  const parts = [['ต.', 'tumbon_name'], ['อ.', 'amphoe_name'], ['จ.', 'province_name']]
+    .filter(function (k) {{ return r.geocode[k[1]]; }})
+    .map(function (k) {{ return k[0] + r.geocode[k[1]].th; }});
+  return [r.station.tele_station_name.th, parts.join(' '), r.waterlevel_datetime.slice(11, 16),
+          num(r.waterlevel_msl), num(r.station.min_bank), num(r.station.ground_level),
+          num(r.storage_percent), r.situation_level.text];
+}}
+function damRow(r) {{
+  return [r.dam.dam_name.th, r.geocode.province_name.th, num(r.dam.normal_storage),
+          num(r.dam.normal_storage - r.dam.min_storage), withPct(r.dam_storage, r.dam_storage_percent),
+          withPct(r.dam_uses_water, r.dam_uses_water_percent), num(r.dam_inflow), num(r.dam_released)];
+}}
+function total() {{ return count; }}
+function pages() {{ return Math.max(1, Math.ceil(total() / per)); }}
+function setDisabled(name, off) {{
+  const b = document.querySelector('button[aria-label="Go to ' + name + ' page"]');
+  if (off) {{ b.setAttribute('disabled', ''); b.setAttribute('aria-disabled', 'true'); }}
+  else {{ b.removeAttribute('disabled'); b.removeAttribute('aria-disabled'); }}
+}}
+function render() {{
+  const start = page * per, end = start + records.length;
+  const make = CFG.kind === 'dam' ? damRow : wlRow;
+  tbody.innerHTML = records.map(function (r) {{
+    return '<tr>' + make(r).map(function (c) {{ return '<td>' + c + '</td>'; }}).join('') + '</tr>';
+  }}).join('');
+  document.getElementById('rpp').textContent = per;
+  document.getElementById('range').textContent = (start + 1) + '-' + end + ' of ' + total().toLocaleString('en-US');
+  setDisabled('first', page === 0);
+  setDisabled('previous', page === 0);
+  setDisabled('next', page >= pages() - 1);
+  setDisabled('last', page >= pages() - 1);
+}}
+// เหมือนเว็บจริง: ล้างตารางก่อน แล้วค่อยเติมเมื่อ API ตอบ (server หน่วง CFG.delay ms)
+// คลิกซ้อนกันเร็ว ๆ -> แสดงเฉพาะคำตอบของคำขอล่าสุด
+function load(fn) {{
+  tbody.innerHTML = '';
+  fn();
+  const mine = ++seq;
+  fetch('/api/' + CFG.apis[tab] + '?page=' + (page + 1) + '&per_page=' + per)
+    .then(function (res) {{ return res.json(); }})
+    .then(function (body) {{
+      if (mine !== seq) return;
+      records = body.data.data;
+      count = body.data.total;
+      render();
+    }});
+}}
+function go(p) {{ load(function () {{ page = Math.min(Math.max(p, 0), pages() - 1); }}); }}
+document.querySelector('button[aria-label="Go to first page"]').onclick = function () {{ go(0); }};
+document.querySelector('button[aria-label="Go to previous page"]').onclick = function () {{ go(page - 1); }};
+document.querySelector('button[aria-label="Go to next page"]').onclick = function () {{ go(page + 1); }};
+document.querySelector('button[aria-label="Go to last page"]').onclick = function () {{ go(pages() - 1); }};
+document.getElementById('rpp').onclick = function () {{ document.getElementById('menu').style.display = 'block'; }};
+document.querySelectorAll('#menu li').forEach(function (li) {{
+  li.onclick = function () {{
+    document.getElementById('menu').style.display = 'none';
+    load(function () {{ per = Number(li.textContent); page = 0; }});
+  }};
+}});
+document.querySelectorAll('button[aria-controls]').forEach(function (b) {{
+  b.onclick = function () {{ load(function () {{ tab = Number(b.dataset.tab); page = 0; }}); }};
+}});
+load(function () {{}});
+</script>
+</body></html>
+"""
+
+WATERLEVEL_HEADS = ["ชื่อสถานี", "ที่ตั้ง", "เวลา", "ระดับน้ำ", "ระดับตลิ่ง", "ค่าศูนย์เสาระดับ", "%ความจุน้ำ", "สถานการณ์"]
+DAM_HEADS = ["ชื่อเขื่อน", "จังหวัด", "ความจุ", "ความจุใช้การ", "ปริมาณน้ำ", "น้ำใช้การ", "น้ำไหลเข้า", "น้ำระบาย"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, *args):  # เงียบ
+        pass
+
+    def _send(self, body: str, ctype: str = "text/html; charset=utf-8") -> None:
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server.site.lock:
+            self.server.site.stats["requests"] += 1
+            self.server.site.stats["bytes"] += len(data)
+
+    def do_GET(self):
+        site = self.server.site
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip("/") or "/"
+        if path == "/":
+            return self._send(site.tmd_home())
+        if path == "/api/province/select":
+            items = [{"text": p, "value": str(i)} for i, p in enumerate(PROVINCES, 1)]
+            return self._send(json.dumps(items, ensure_ascii=False), "application/json; charset=utf-8")
+        if path == "/api/forecast/7days":
+            prov = (parse_qs(parsed.query).get("province") or [""])[0]
+            if not prov.isdigit() or not 1 <= int(prov) <= len(PROVINCES):
+                return self.send_error(404)
+            time.sleep(site.delay_ms / 1000)
+            body = {"success": True, "data": {"province": PROVINCES[int(prov) - 1], "forecasts": site.forecast(int(prov))}}
+            return self._send(json.dumps(body, ensure_ascii=False), "application/json; charset=utf-8")
+        if path.startswith("/api/") and path[5:] in site.totals:
+            q = parse_qs(parsed.query)
+            page = int((q.get("page") or ["1"])[0])
+            per_page = int((q.get("per_page") or [str(site.rows)])[0])
+            time.sleep(site.delay_ms / 1000)
+            body = {"success": True, "data": site.api_page(path[5:], page, per_page)}
+            return self._send(json.dumps(body, ensure_ascii=False), "application/json; charset=utf-8")
+        if path == "/waterlevel":
+            return self._send(site.table("waterlevel"))
+        if path == "/dam":
+            return self._send(site.table("dam"))
+        self.send_error(404)
+
+
+class _Server(ThreadingHTTPServer):
+    site: "FakeSites"
+
+
+class FakeSites:
+    def __init__(self, waterlevel_pages: int = 10, dam_pages: int = 5, rows: int = 200,
+                 delay_ms: int = 50, port: int = 0, records: Optional[Dict[str, List[dict]]] = None):
+        """
+        rows: แถวต่อหน้า (waterlevel: ขนาดหน้าที่ scrap2 เลือกจากเมนู -> ควรเป็น 50/100/200)
+        delay_ms: เวลาที่ API หน่วงก่อนตอบ (ตารางว่างอยู่ระหว่างนั้น)
+        records: payload ที่บันทึกไว้แทนข้อมูลสร้าง เช่น {"dam/large": [...]} (key ตาม TABLE_APIS)
+        """
+        self.waterlevel_pages = waterlevel_pages
+        self.dam_pages = dam_pages
+        self.rows = rows
+        self.delay_ms = delay_ms
+        self.records = dict(records or {})
+        self.totals = {"waterlevel": waterlevel_pages * rows, "dam/large": dam_pages * rows,
+                       "dam/medium": dam_pages * rows}
+        self.totals.update({name: len(recs) for name, recs in self.records.items()})
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "bytes": 0}
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.site = self
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def tmd_home(self) -> str:
+        options = "".join(f'<option value="{i}">{p}</option>' for i, p in enumerate(PROVINCES, 1))
+        return _TMD_HOME.format(options=options, delay=self.delay_ms)
+
+    def forecast(self, prov: int) -> list:
+        today = date.today()
+        return [{
+            "forecastDate": (today + timedelta(days=d)).isoformat() + "T00:00:00",
+            "weatherDescription": "ฝนฟ้าคะนอง" if (prov + d) % 3 else "มีเมฆบางส่วน",
+            "rainArea": (prov * 37 + d * 11) % 100,
+            "rain": round(((prov + d) % 9) * 1.7, 1),
+        } for d in range(7)]
+
+    def record(self, name: str, i: int) -> dict:
+        """record ลำดับที่ i ของ API name (รูปแบบ field เดียวกับ API จริงที่ _row_from_record อ่าน)"""
+        if name in self.records:
+            return self.records[name][i]
+        if name == "waterlevel":
+            lv = (i * 7919 % 10000) / 100
+            return {
+                "station": {"tele_station_name": {"th": f"สถานี{i} (ST{i})"},
+                            "min_bank": round(lv + 5, 2), "ground_level": round(lv - 3, 2)},
+                "geocode": {"tumbon_name": {"th": f"ตำบล{i % 50}"}, "amphoe_name": {"th": f"อำเภอ{i % 20}"},
+                            "province_name": {"th": PROVINCES[i % 77]}},
+                "waterlevel_datetime": f"{date.today().isoformat()} {i % 24:02d}:00:00",
+                "waterlevel_msl": lv,
+                "storage_percent": round(i * 31 % 100 + i % 10 / 10, 1),
+                "situation_level": {"text": "ปกติ" if i % 5 else "น้ำมาก"},
+            }
+        cap = round(100 + (i * 104729 % 90000) / 10, 2)
+        return {
+            "dam": {"dam_name": {"th": ("อ่างเก็บน้ำ" if name == "dam/medium" else "เขื่อน") + str(i)},
+                    "normal_storage": cap, "min_storage": round(cap * 0.2, 2)},
+            "geocode": {"province_name": {"th": PROVINCES[i % 77]}},
+            "dam_storage": round(cap * (i % 97) / 100, 2), "dam_storage_percent": i % 97,
+            "dam_uses_water": round(cap * (i % 61) / 100, 2), "dam_uses_water_percent": i % 61,
+            "dam_inflow": round((i % 13) / 10, 2), "dam_released": round((i % 11) / 10, 2),
+        }
+
+    def api_page(self, name: str, page: int, per_page: int) -> dict:
+        total = self.totals[name]
+        last = max(1, -(-total // per_page))
+        start = (min(max(page, 1), last) - 1) * per_page
+        return {"data": [self.record(name, i) for i in range(start, min(total, start + per_page))],
+                "current_page": page, "last_page": last, "per_page": per_page, "total": total}
+
+    def table(self, kind: str) -> str:
+        if kind == "dam":
+            tabs = ('<button aria-controls="tabpanel-0" data-tab="0">แหล่งน้ำขนาดใหญ่</button>'
+                    '<button aria-controls="tabpanel-1" data-tab="1">แหล่งน้ำขนาดกลาง</button>')
+            heads, per_page = DAM_HEADS, self.rows
+        else:
+            tabs, heads, per_page = "", WATERLEVEL_HEADS, 10
+        cfg = {"kind": kind, "apis": TABLE_APIS[kind], "per_page": per_page}
+        menu = "".join(f"<li>{n}</li>" for n in sorted({50, 100, 200, self.rows}))
+        return _TABLE_PAGE.format(
+            title=kind, tabs=tabs, heads="".join(f"<th>{h}</th>" for h in heads),
+            menu=menu, cfg=json.dumps(cfg, ensure_ascii=False),
+        )
+
+    def __enter__(self) -> "FakeSites":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--waterlevel-pages", type=int, default=10)
+    ap.add_argument("--dam-pages", type=int, default=5)
+    ap.add_argument("--rows", type=int, default=200)
+    ap.add_argument("--delay-ms", type=int, default=50)
+    args = ap.parse_args()
+    site = FakeSites(args.waterlevel_pages, args.dam_pages, args.rows, args.delay_ms, args.port)
+    print(f"🌐 เว็บจำลอง: {site.url}/  {site.url}/waterlevel  {site.url}/dam")
+    with site:
+        threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
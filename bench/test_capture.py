@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+ทดสอบโหมด CAPTURE_JSON กับเว็บจำลอง (bench/fake_sites.py) ที่ API แบ่งหน้าฝั่ง server
+- JSON ที่ดักได้มีแค่หน้าแรก -> records_from_payloads ต้องไม่รับ (จำนวนไม่ตรงกับ 'x-y of N')
+- payload ที่บันทึกจากเว็บจริง -> แถวต้องตรงกับที่ scrap3 เคยอ่านจากตาราง (waterdam_report_large.csv)
+- มี Chrome: CAPTURE_JSON=true ต้องได้แถวเท่ากับการไล่หน้า (ไม่มี browser -> ข้าม)
+
+ใช้งาน: python -m pytest -q bench/test_capture.py
+"""
+import csv
+import json
+import os
+import sys
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_suite import has_browser  # noqa: E402
+from fake_sites import FakeSites  # noqa: E402
+
+import scrap2  # noqa: E402
+import scrap3  # noqa: E402
+from netcapture import records_from_payloads  # noqa: E402
+
+# record ของ API เขื่อนขนาดใหญ่ (4 เขื่อนแรกของ waterdam_report_large.csv วันที่ 18/03/2025)
+RECORDED_DAM_LARGE = [
+    {"dam": {"id": 1, "dam_name": {"th": "เขื่อนแม่งัดสมบูรณ์ชล"}, "normal_storage": 265, "min_storage": 12},
+     "geocode": {"province_code": "50", "province_name": {"th": "เชียงใหม่"}},
+     "dam_date": "2025-03-18", "dam_storage": 230.27, "dam_storage_percent": 86.89,
+     "dam_uses_water": 218.09, "dam_uses_water_percent": 82.3, "dam_inflow": 0.05, "dam_released": 1.62},
+    {"dam": {"id": 2, "dam_name": {"th": "เขื่อนบางลาง"}, "normal_storage": 1454.36, "min_storage": 276.28},
+     "geocode": {"province_code": "95", "province_name": {"th": "ยะลา"}},
+     "dam_date": "2025-03-18", "dam_storage": 1248.49, "dam_storage_percent": 85.84,
+     "dam_uses_water": 972.21, "dam_uses_water_percent": 66.85, "dam_inflow": 3.3, "dam_released": 4.1},
+    {"dam": {"id": 3, "dam_name": {"th": "เขื่อนหนองปลาไหล"}, "normal_storage": 164, "min_storage": 13.75},
+     "geocode": {"province_code": "21", "province_name": {"th": "ระยอง"}},
+     "dam_date": "2025-03-18", "dam_storage": 131.25, "dam_storage_percent": 80.03,
+     "dam_uses_water": 117.75, "dam_uses_water_percent": 71.8, "dam_inflow": 0.33, "dam_released": 0.43},
+    {"dam": {"id": 4, "dam_name": {"th": "เขื่อนศรีนครินทร์"}, "normal_storage": 17745, "min_storage": 10265},
+     "geocode": {"province_code": "71", "province_name": {"th": "กาญจนบุรี"}},
+     "dam_date": "2025-03-18", "dam_storage": 13595.54, "dam_storage_percent": 76.62,
+     "dam_uses_water": 3330.54, "dam_uses_water_percent": 18.77, "dam_inflow": 1.32, "dam_released": 16.91},
+]
+
+
+def _get(url: str):
+    with urllib.request.urlopen(url) as r:
+        return json.load(r)
+
+
+def test_first_page_only_is_rejected():
+    with FakeSites(waterlevel_pages=3, rows=50, delay_ms=0) as site:
+        # หน้าแรกที่ตารางโหลดเอง (Rows per page = 10) ของทั้งหมด 150 แถว
+        first = f"{site.url}/api/waterlevel?page=1&per_page=10"
+        payloads = [(first, _get(first))]
+        assert records_from_payloads(payloads, expected=150) is None
+        assert len(records_from_payloads(payloads, expected=10)) == 10
+        whole = f"{site.url}/api/waterlevel?page=1&per_page=150"
+        assert len(records_from_payloads([(whole, _get(whole))], expected=150)) == 150
+
+
+def test_recorded_payload_matches_table_rows():
+    with FakeSites(delay_ms=0, records={"dam/large": RECORDED_DAM_LARGE}) as site:
+        url = f"{site.url}/api/dam/large?page=1"
+        records = records_from_payloads([(url, _get(url))], expected=len(RECORDED_DAM_LARGE))
+    with open(os.path.join(ROOT, "waterdam_report_large.csv"), encoding="utf-8-sig", newline="") as f:
+        table = [row[:8] for row in list(csv.reader(f))[1:len(RECORDED_DAM_LARGE) + 1]]
+    assert [scrap3._row_from_record(r) for r in records] == table
+
+
+@pytest.mark.skipif(not has_browser(), reason="ไม่มี selenium/Chrome")
+def test_capture_falls_back_to_paging(tmp_path, monkeypatch):
+    with FakeSites(waterlevel_pages=3, dam_pages=2, rows=50, delay_ms=0) as site:
+        monkeypatch.setattr(scrap2, "URL", site.url + "/waterlevel")
+        monkeypatch.setattr(scrap3, "URL", site.url + "/dam")
+        runs = {}
+        for capture in (False, True):
+            monkeypatch.setattr(scrap2, "CAPTURE_JSON", capture)
+            monkeypatch.setattr(scrap3, "CAPTURE_JSON", capture)
+            work = tmp_path / str(capture)
+            work.mkdir()
+            monkeypatch.chdir(work)  # checkpoint แยกกันต่อรอบ
+            runs[capture] = (scrap2.scrape_waterlevel(), scrap3.scrape_tab("medium"))
+    assert len(runs[False][0]) == 150 and len(runs[False][1]) == 100
+    assert runs[True] == runs[False]
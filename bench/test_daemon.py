@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ DeltaFilter ของ waterlevel_daemon
+- สถานีที่รายงาน HH:MM เดิมในวันถัดไป (เช่น 07:00 ทุกวัน) ต้องนับเป็นค่าใหม่ ทั้งตอน take และหลัง seed จากไฟล์
+- รอบที่ได้ไม่ครบต้องไม่ทำให้ลืมสถานีที่ขาดไป
+
+ใช้งาน: python -m pytest -q bench/test_daemon.py
+"""
+import csv
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import scrap2  # noqa: E402
+from waterlevel_daemon import DeltaFilter  # noqa: E402
+
+
+def row(station: str, time: str, day: str) -> list:
+    return [station, "ต.ก อ.ข จ.ค", time, "1.5", "3", "0", "50", "ปกติ", day]
+
+
+def test_same_clock_time_on_next_day_is_new():
+    deltas = DeltaFilter()
+    assert deltas.take([row("สถานีก", "07:00", "10/17/26")]) == [row("สถานีก", "07:00", "10/17/26")]
+    assert deltas.take([row("สถานีก", "07:00", "10/17/26")]) == []
+    assert deltas.take([row("สถานีก", "07:00", "10/18/26")]) == [row("สถานีก", "07:00", "10/18/26")]
+
+
+def test_seed_keeps_the_date(tmp_path):
+    path = tmp_path / "live.csv"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(scrap2.HEADERS)
+        writer.writerow(row("สถานีก", "07:00", "10/17/26"))
+    deltas = DeltaFilter()
+    deltas.seed(str(path))
+    assert deltas.take([row("สถานีก", "07:00", "10/17/26")]) == []
+    assert len(deltas.take([row("สถานีก", "07:00", "10/18/26")])) == 1
+
+
+def test_partial_poll_keeps_missing_stations():
+    deltas = DeltaFilter()
+    full = [row("สถานีก", "07:00", "10/18/26"), row("สถานีข", "07:00", "10/18/26")]
+    assert len(deltas.take(full)) == 2
+    assert deltas.take(full[:1]) == []
+    assert deltas.take(full) == []
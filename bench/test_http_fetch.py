@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ FETCH_MODE=http (http_fetch.fetch_records) กับ API แบ่งหน้าของเว็บจำลอง (bench/fake_sites.py)
+- ดึงครบทุกหน้าและเรียงตามหน้า
+- แถวจาก HTTP ต้องตรงกับแถวที่ scrap3 เคยอ่านจากตาราง (payload ที่บันทึกไว้ vs waterdam_report_large.csv)
+- มี Chrome: แถวจาก HTTP ต้องเท่ากับที่ Selenium ไล่หน้าได้จากตารางเดียวกัน (ไม่มี browser -> ข้าม)
+
+ใช้งาน: python -m pytest -q bench/test_http_fetch.py
+"""
+import csv
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_suite import has_browser  # noqa: E402
+from fake_sites import FakeSites  # noqa: E402
+from test_capture import RECORDED_DAM_LARGE  # noqa: E402
+
+import scrap2  # noqa: E402
+import scrap3  # noqa: E402
+from http_fetch import fetch_records  # noqa: E402
+
+LARGE, MEDIUM = scrap3.TABS["large"][0], scrap3.TABS["medium"][0]
+
+
+def test_fetch_records_reads_every_page():
+    with FakeSites(waterlevel_pages=3, rows=50, delay_ms=0) as site:
+        records = fetch_records(site.url + "/api/waterlevel", page_param="page", workers=2)
+        assert records == [site.record("waterlevel", i) for i in range(150)]
+
+
+def test_http_rows_match_recorded_table(monkeypatch):
+    with FakeSites(delay_ms=0, records={"dam/large": RECORDED_DAM_LARGE}) as site:
+        monkeypatch.setitem(scrap3.API_URLS, LARGE, site.url + "/api/dam/large")
+        monkeypatch.setattr(scrap3, "API_PAGE_PARAM", "page")
+        rows = scrap3.fetch_data_http(LARGE)
+    with open(os.path.join(ROOT, "waterdam_report_large.csv"), encoding="utf-8-sig", newline="") as f:
+        table = [row[:8] for row in list(csv.reader(f))[1:len(RECORDED_DAM_LARGE) + 1]]
+    assert [r[:8] for r in rows] == table
+    assert {r[-1] for r in rows} == {LARGE}
+
+
+@pytest.mark.skipif(not has_browser(), reason="ไม่มี selenium/Chrome")
+def test_http_rows_match_selenium(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with FakeSites(waterlevel_pages=3, dam_pages=2, rows=50, delay_ms=0) as site:
+        monkeypatch.setattr(scrap2, "URL", site.url + "/waterlevel")
+        monkeypatch.setattr(scrap2, "CAPTURE_JSON", False)
+        monkeypatch.setattr(scrap2, "API_URL", site.url + "/api/waterlevel")
+        monkeypatch.setattr(scrap2, "API_PAGE_PARAM", "page")
+        assert scrap2.scrape_waterlevel_http() == scrap2.scrape_waterlevel()
+
+        monkeypatch.setattr(scrap3, "URL", site.url + "/dam")
+        monkeypatch.setattr(scrap3, "CAPTURE_JSON", False)
+        monkeypatch.setattr(scrap3, "API_PAGE_PARAM", "page")
+        monkeypatch.setattr(scrap3, "use_http", lambda: False)  # scrape_tab = Selenium
+        for dam_type, tab_name in (("large", LARGE), ("medium", MEDIUM)):
+            api = site.url + "/api/" + ("dam/large" if dam_type == "large" else "dam/medium")
+            monkeypatch.setitem(scrap3.API_URLS, tab_name, api)
+            assert scrap3.fetch_data_http(tab_name) == scrap3.scrape_tab(dam_type)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ scrap4: โหมด memory กับ stream ต้องเขียน waterdam_report.csv เหมือนกันทุก byte
+- อินพุตจริงที่ commit ไว้ (waterdam_report_large.csv) + ไฟล์ขนาดกลางที่ตัดจากไฟล์เดียวกัน (มีแถวซ้ำข้ามไฟล์)
+- ต้องมี pyarrow (โหมด memory ใช้ pyarrow เมื่อ CSV_ENGINE=auto) ไม่มี -> ข้าม
+- stream ใช้ chunk เล็ก (MERGE_MEMORY_MB=1) ให้ผ่านหลาย chunk
+- TYPED_OUT: Data_Time ของไฟล์จริงเป็น NaT เฉพาะค่าที่ว่างในต้นทาง, รูปแบบที่ไม่ตรงกับไฟล์ -> หยุด (ไม่เขียน NaT)
+
+ใช้งาน: python -m pytest -q bench/test_merge.py
+"""
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import csv_ingest  # noqa: E402
+import scrap4  # noqa: E402
+
+LARGE = Path(ROOT) / "waterdam_report_large.csv"
+
+
+def test_memory_and_stream_write_identical_files(tmp_path, monkeypatch):
+    lines = LARGE.read_text(encoding="utf-8-sig").splitlines()
+    medium = tmp_path / "waterdam_report_medium.csv"
+    medium.write_text("\n".join(lines[:1] + lines[2000:4000]) + "\n", encoding="utf-8-sig")
+    monkeypatch.setattr(scrap4, "LARGE_CSV", LARGE)
+    monkeypatch.setattr(scrap4, "MEDIUM_CSV", medium)
+    monkeypatch.setattr(scrap4, "MERGE_MEMORY_MB", 1)
+    monkeypatch.setattr(scrap4, "TYPED_OUT", "")
+    monkeypatch.setattr(csv_ingest, "CSV_ENGINE", "auto")
+
+    out = {}
+    for mode in ("memory", "stream"):
+        monkeypatch.setattr(scrap4, "MERGE_MODE", mode)
+        monkeypatch.setattr(scrap4, "OUT_CSV", tmp_path / f"{mode}.csv")
+        rows, path = scrap4.run_merge_only()
+        out[mode] = (rows, Path(path).read_bytes())
+    assert csv_ingest.engine_order() == ["pyarrow", "c"]
+    assert len(lines) - 1 < out["memory"][0] < len(lines) - 1 + 2000  # แถวซ้ำข้ามไฟล์ถูกลบ
+    assert out["memory"] == out["stream"]
+
+
+def test_typed_output_keeps_every_date(tmp_path, monkeypatch):
+    typed = tmp_path / "typed.parquet"
+    monkeypatch.setattr(scrap4, "LARGE_CSV", LARGE)
+    monkeypatch.setattr(scrap4, "MEDIUM_CSV", LARGE)
+    monkeypatch.setattr(scrap4, "MERGE_MODE", "memory")
+    monkeypatch.setattr(scrap4, "OUT_CSV", tmp_path / "out.csv")
+    monkeypatch.setattr(scrap4, "TYPED_OUT", str(typed))
+    monkeypatch.setattr(scrap4, "TYPED_DATE_FORMATS", ())
+    scrap4.run_merge_only()
+    source = csv_ingest.read_csv_fast(LARGE)["Data_Time"].str.strip().replace("", None)
+    dates = pd.read_parquet(typed)["Data_Time"]  # ไฟล์ใหญ่ + ไฟล์กลาง (ไฟล์เดียวกัน)
+    assert source.isna().sum() == 1
+    assert dates.isna().sum() == 2 * source.isna().sum()
+
+    monkeypatch.setattr(scrap4, "TYPED_DATE_FORMATS", ("%d/%m/%Y", "%m/%d/%Y"))
+    with pytest.raises(ValueError, match="กำกวม"):
+        scrap4.run_merge_only()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+ทดสอบ RowSink ที่มีสคีมา (sink ของ scrap2)
+- แถวที่ยาวกว่าสคีมาต้องได้ Extra_n เหมือน save_csv เดิม (ไม่ถูกกักเพราะจำนวนคอลัมน์)
+- แถวที่สั้นกว่าตรวจหลังเติมช่องว่าง: ขาด Data_Time (required) จึงถูกกัก
+- แถวที่ค่าในคอลัมน์ของสคีมาผิดชนิด/ขาด required ยังไป quarantine
+- sink ของ scrap2 เป็น CSV เสมอ และ fmt="parquet" กับไฟล์ .csv ต้องไม่ถูกสร้าง
+
+ใช้งาน: python -m pytest -q bench/test_row_sink.py
+"""
+import csv
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import scrap2  # noqa: E402
+from row_sink import RowSink  # noqa: E402
+
+ROW = ["สถานีก", "ต.ก อ.ข จ.ค", "07:00", "1.5", "3", "0", "50", "ปกติ", "10/18/26"]
+
+
+def test_width_mismatch_widens_instead_of_quarantine(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / "waterlevel_report.csv"
+    with scrap2.open_sink(str(out)) as sink:
+        sink.write_rows([ROW])
+        sink.write_rows([ROW + ["หมายเหตุ"], ["สถานีข"] + ROW[1:8]])
+    with open(out, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == scrap2.HEADERS + ["Extra_1"]
+    assert rows[1:] == [ROW + [""], ROW + ["หมายเหตุ"]]
+    assert sink.quarantine.rows == 1  # แถวสั้นที่ไม่มี Data_Time (required)
+
+
+def test_bad_values_still_quarantined(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with scrap2.open_sink(str(tmp_path / "waterlevel_report.csv")) as sink:
+        sink.write_rows([ROW, ROW[:3] + ["สูง"] + ROW[4:]])
+    assert sink.rows == 1 and sink.quarantine.rows == 1
+
+
+def test_waterlevel_sink_is_always_csv(tmp_path):
+    out = str(tmp_path / "waterlevel_report.csv")
+    assert scrap2.open_sink(out).fmt == "csv"
+    with pytest.raises(ValueError):
+        RowSink(out, scrap2.HEADERS, fmt="parquet")
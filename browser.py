@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+โรงงานสร้าง Chrome driver กลางของทุก scraper
+- preset "tmd"   : หน้า TMD (scrap1) ต้องใช้ CSS ของหน้า จึงไม่บล็อก CSS
+- preset "table" : ตาราง MUI ของ nationalthaiwater (scrap2/scrap3) บล็อกได้ทั้ง CSS
+- บล็อกรูป/ฟอนต์/analytics ด้วย CDP Network.setBlockedURLs (ปิดได้ด้วย BLOCK_ASSETS=false)
+- BROWSER_CACHE_DIR: ใช้ user-data-dir ถาวร (แยกโฟลเดอร์ต่อ driver) เพื่อใช้ cache ข้ามรอบ
+- MAX_BROWSERS / limit_browsers(n): จำกัดจำนวน Chrome ที่เปิดพร้อมกันทั้งโปรเซส
+  (make_driver รอจนมีที่ว่าง, driver.quit() คืนที่)
+"""
+import itertools
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+import metrics
+from netcapture import enable_network_capture
+
+BLOCK_ASSETS = os.getenv("BLOCK_ASSETS", "true") == "true"
+BROWSER_CACHE_DIR = os.getenv("BROWSER_CACHE_DIR", "")
+SCRIPT_TIMEOUT = int(os.getenv("SCRIPT_TIMEOUT", "120"))
+MAX_BROWSERS = int(os.getenv("MAX_BROWSERS", "0"))  # 0 = ไม่จำกัด
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
+)
+
+IMAGE_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"]
+FONT_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"]
+CSS_PATTERNS = ["*.css"]
+TRACKER_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*",
+]
+
+PRESETS: Dict[str, dict] = {
+    "tmd": {
+        "page_load_strategy": "eager",
+        "window_size": "1920,1080",
+        "blocked": IMAGE_PATTERNS + FONT_PATTERNS + TRACKER_PATTERNS,
+    },
+    "table": {
+        "page_load_strategy": "none",
+        "window_size": "1440,900",
+        "blocked": IMAGE_PATTERNS + FONT_PATTERNS + CSS_PATTERNS + TRACKER_PATTERNS,
+    },
+}
+
+_BASE_ARGS = (
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--metrics-recording-only",
+    "--mute-audio",
+)
+
+# เลขประจำ driver ในรอบนี้ -> โฟลเดอร์ profile ไม่ชนกันเมื่อเปิดหลายตัวพร้อมกัน
+_slots = itertools.count()
+_slots_lock = threading.Lock()
+
+
+def _profile_dir(preset: str) -> str:
+    with _slots_lock:
+        slot = next(_slots)
+    path = os.path.join(os.path.abspath(BROWSER_CACHE_DIR), f"{preset}-{slot}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def build_options(preset: str = "table", capture: bool = False) -> Options:
+    cfg = PRESETS[preset]
+    opt = Options()
+    opt.page_load_strategy = cfg["page_load_strategy"]
+    for arg in _BASE_ARGS:
+        opt.add_argument(arg)
+    opt.add_argument(f"--window-size={cfg['window_size']}")
+    opt.add_argument(f"user-agent={USER_AGENT}")
+    if BLOCK_ASSETS:
+        opt.add_argument("--blink-settings=imagesEnabled=false")
+    if BROWSER_CACHE_DIR:
+        opt.add_argument(f"--user-data-dir={_profile_dir(preset)}")
+    if capture:
+        enable_network_capture(opt)
+    return opt
+
+
+_browser_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def limit_browsers(n: int) -> None:
+    """จำกัด Chrome ที่เปิดพร้อมกัน (0 = ไม่จำกัด); เรียกก่อนเริ่มสร้าง driver"""
+    global _browser_slots
+    _browser_slots = threading.BoundedSemaphore(n) if n > 0 else None
+
+
+limit_browsers(MAX_BROWSERS)
+
+
+def _hold_slot(drv: webdriver.Chrome, slots: threading.BoundedSemaphore) -> None:
+    """ผูกที่ว่างกับ driver: quit() ครั้งแรกคืนที่ (เรียกซ้ำไม่คืนเกิน)"""
+    quit_driver = drv.quit
+    released = threading.Event()
+
+    def quit() -> None:
+        try:
+            quit_driver()
+        finally:
+            if not released.is_set():
+                released.set()
+                slots.release()
+
+    drv.quit = quit
+
+
+@metrics.timed("driver_start")
+def _start_chrome(preset: str, capture: bool) -> webdriver.Chrome:
+    drv = webdriver.Chrome(options=build_options(preset, capture))
+    drv.set_script_timeout(SCRIPT_TIMEOUT)
+    if BLOCK_ASSETS:
+        try:
+            drv.execute_cdp_cmd("Network.enable", {})
+            drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": PRESETS[preset]["blocked"]})
+        except Exception as e:
+            print(f"ℹ️ บล็อก resource ไม่สำเร็จ (ข้าม): {e}")
+    return drv
+
+
+def make_driver(preset: str = "table", capture: bool = False) -> webdriver.Chrome:
+    slots = _browser_slots
+    if slots is None:
+        return _start_chrome(preset, capture)
+    with metrics.stage("browser_wait"):
+        slots.acquire()
+    try:
+        drv = _start_chrome(preset, capture)
+    except BaseException:
+        slots.release()
+        raise
+    _hold_slot(drv, slots)
+    return drv
+
+
+_JS_TRANSFER = """
+var total = 0, n = 0;
+performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+    .forEach(function(e){ total += (e.transferSize || 0); n += 1; });
+return [total, n];
+"""
+
+
+def log_page_stats(driver, label: str, started: Optional[float] = None) -> Dict[str, float]:
+    """พิมพ์จำนวน byte ที่ดาวน์โหลด (Resource Timing) และเวลาถึงแถวแรกนับจาก started"""
+    try:
+        total, n = driver.execute_script(_JS_TRANSFER) or (0, 0)
+    except Exception:
+        total, n = 0, 0
+    stats = {"bytes": float(total), "resources": float(n)}
+    msg = f"📦 {label}: ดาวน์โหลด {total / 1024:,.0f} KB จาก {n} resources"
+    if started is not None:
+        stats["first_row_sec"] = time.time() - started
+        msg += f", แถวแรกหลัง {stats['first_row_sec']:.2f}s"
+    print(msg)
+    return stats
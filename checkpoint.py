@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoint ต่อหน้า สำหรับ scrape แบบไล่หน้าที่ยาว ๆ
+- {name}.json       : หน้าล่าสุดที่ดึงเสร็จ, จำนวนแถวสะสม, hash ของแถวแรกในหน้านั้น
+                      และขนาดไฟล์ผลลัพธ์ก่อนหน้าแรก (offset) ไว้ตัดแถวทิ้งถ้า checkpoint ใช้ไม่ได้
+- {name}.rows.jsonl : แถวที่ดึงได้แล้ว (ต่อท้ายทีละหน้า) บรรทัดละ [page, row]
+- {name}.done       : วันที่ดึงครบแล้ว (mark_done) ให้ retry ในวันเดียวกันข้ามงานที่เสร็จไปแล้ว
+รันใหม่ในวันเดียวกันจะข้ามไปหน้าถัดจาก checkpoint ได้ทันที; เสร็จแล้วเรียก clear() หรือ mark_done()
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", ".checkpoints")
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "true") == "true"
+
+
+def row_hash(row: Optional[List[str]]) -> str:
+    return hashlib.sha1("\x1f".join(row or []).encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    def __init__(self, name: str, directory: str = CHECKPOINT_DIR):
+        self.name = name
+        self.meta_path = os.path.join(directory, f"{name}.json")
+        self.rows_path = os.path.join(directory, f"{name}.rows.jsonl")
+        self.done_path = os.path.join(directory, f"{name}.done")
+        self.today = datetime.now().strftime("%Y-%m-%d")
+        self.start_offset: Optional[int] = None
+        self.state = self._load() if CHECKPOINT_ENABLED else None
+        if self.state is None and CHECKPOINT_ENABLED:
+            self.clear()  # ลบแถวค้างที่ไม่มี meta คู่กัน
+
+    def _load(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # checkpoint ของวันอื่นใช้ไม่ได้ (ข้อมูลบนเว็บเปลี่ยนแล้ว)
+        if state.get("date") != self.today or not os.path.exists(self.rows_path):
+            self.clear()
+            return None
+        self._drop_pages_after(int(state["page"]))
+        return state
+
+    def _drop_pages_after(self, page: int) -> None:
+        """ตัดแถวของหน้าที่เขียนค้างไว้หลัง meta ล่าสุด (crash ระหว่างบันทึก) กันแถวซ้ำตอนรันต่อ"""
+        with open(self.rows_path, encoding="utf-8") as f:
+            lines = [ln for ln in f if ln.strip()]
+        kept = [ln for ln in lines if json.loads(ln)[0] <= page]
+        if len(kept) != len(lines):
+            with open(self.rows_path, "w", encoding="utf-8") as f:
+                f.writelines(kept)
+
+    @property
+    def page(self) -> int:
+        """หน้าสุดท้ายที่ดึงเสร็จ (0 = ไม่มี checkpoint)"""
+        return int(self.state["page"]) if self.state else 0
+
+    @property
+    def offset(self) -> Optional[int]:
+        """ขนาดไฟล์ผลลัพธ์ก่อนเขียนหน้าแรกของ checkpoint นี้ (None = ไม่ทราบ)"""
+        if self.state:
+            return self.state.get("offset")
+        return self.start_offset
+
+    def begin(self, offset: int) -> None:
+        """จำขนาดไฟล์ผลลัพธ์ตอนเริ่มหน้า 1 (ไม่มีผลถ้ากำลังต่อจาก checkpoint เดิม)"""
+        if not self.state:
+            self.start_offset = offset
+
+    def matches(self, first_row: Optional[List[str]]) -> bool:
+        """หน้าที่ข้ามมาถึงมีแถวแรกตรงกับตอนบันทึกหรือไม่"""
+        return bool(self.state) and self.state.get("first_row_hash") == row_hash(first_row)
+
+    def pages(self) -> Dict[int, List[List[str]]]:
+        out: Dict[int, List[List[str]]] = {}
+        with open(self.rows_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                page, row = json.loads(line)
+                out.setdefault(page, []).append(row)
+        return out
+
+    def rows(self) -> List[List[str]]:
+        return [r for _, rows in sorted(self.pages().items()) for r in rows]
+
+    def record(self, page: int, rows: List[List[str]], first_row: Optional[List[str]]) -> None:
+        if not CHECKPOINT_ENABLED:
+            return
+        os.makedirs(os.path.dirname(self.meta_path) or ".", exist_ok=True)
+        with open(self.rows_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps([page, row], ensure_ascii=False) + "\n")
+        total = (self.state or {}).get("rows", 0) + len(rows)
+        self.state = {
+            "name": self.name,
+            "date": self.today,
+            "page": page,
+            "rows": total,
+            "first_row_hash": row_hash(first_row),
+            "offset": self.offset,
+            "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.meta_path)
+
+    @property
+    def done(self) -> bool:
+        """ดึงครบไปแล้วในวันนี้ (mark_done)"""
+        if not CHECKPOINT_ENABLED:
+            return False
+        try:
+            with open(self.done_path, encoding="utf-8") as f:
+                return f.read().strip() == self.today
+        except OSError:
+            return False
+
+    def mark_done(self) -> None:
+        """ล้างหน้าที่ค้างแล้วบันทึกว่าวันนี้ดึงครบแล้ว"""
+        self.clear()
+        if not CHECKPOINT_ENABLED:
+            return
+        os.makedirs(os.path.dirname(self.done_path) or ".", exist_ok=True)
+        with open(self.done_path, "w", encoding="utf-8") as f:
+            f.write(self.today)
+
+    def clear(self) -> None:
+        self.state = None
+        for path in (self.meta_path, self.rows_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
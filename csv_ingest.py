@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+อ่าน CSV รอบเดียว: เดา encoding/ตัวคั่นจากส่วนต้นของไฟล์ก่อน แล้วค่อย parse
+- BOM utf-8 -> utf-8-sig, ไม่มี BOM -> ลอง decode ตัวอย่างเป็น utf-8 -> cp874 -> latin-1
+- ตัวคั่นเลือกจากบรรทัด header (, ; tab |) ค่าเริ่มต้น ","
+- engine: pyarrow ถ้าติดตั้งไว้ (CSV_ENGINE=auto) ไม่งั้นใช้ C engine แบบ memory_map
+  (pyarrow อ่านทุกคอลัมน์เป็น string ตั้งแต่ตอน parse -> ค่าเหมือน C engine ทุกตัว เช่น "0" ไม่กลายเป็น "0.0")
+- ถ้าเดาผิด (เจอ byte เสียหลังตัวอย่าง) ค่อยไล่ encoding แบบเดิมทีละตัว
+- iter_csv_chunks: ตัวอ่านเดียวกันแบบทีละ chunk (scrap4 โหมด stream ได้ค่าเหมือนโหมด memory ทุกตัว)
+"""
+import codecs
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
+
+CSV_ENGINE = os.getenv("CSV_ENGINE", "auto")  # auto | pyarrow | c
+SNIFF_BYTES = 1 << 20
+
+FALLBACK_ENCODINGS = ("utf-8-sig", "utf-8", "cp874", "latin-1")
+DELIMITERS = (",", ";", "\t", "|")
+
+
+def _trial_decode(sample: bytes, encoding: str, complete: bool) -> Optional[str]:
+    """decode ตัวอย่าง; ถ้าไม่ใช่ทั้งไฟล์ ยอมให้ตัวอักษรหลายไบต์ท้ายตัวอย่างค้างได้"""
+    dec = codecs.getincrementaldecoder(encoding)()
+    try:
+        return dec.decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return None
+
+
+def sniff(path: Path, nbytes: int = SNIFF_BYTES) -> Tuple[str, str]:
+    """คืน (encoding, delimiter) จาก nbytes แรกของไฟล์"""
+    with open(path, "rb") as f:
+        sample = f.read(nbytes)
+        complete = not f.read(1)
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding, text = "utf-8-sig", _trial_decode(sample, "utf-8-sig", complete)
+    else:
+        for encoding in ("utf-8", "cp874", "latin-1"):
+            text = _trial_decode(sample, encoding, complete)
+            if text is not None:
+                break
+    header = (text or "").split("\n", 1)[0]
+    delimiter = max(DELIMITERS, key=header.count) if header else ","
+    if header.count(delimiter) == 0:
+        delimiter = ","
+    return encoding, delimiter
+
+
+def _pyarrow_available(engine: str = CSV_ENGINE) -> bool:
+    if engine == "c":
+        return False
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        if engine == "pyarrow":
+            print("ℹ️ ไม่พบ pyarrow ใช้ C engine แทน")
+        return False
+
+
+def engine_order(engine: Optional[str] = None) -> List[str]:
+    """engine ที่จะลองตามลำดับ (engine: auto | pyarrow | c, None = CSV_ENGINE); C engine อยู่ท้ายเสมอ"""
+    return (["pyarrow"] if _pyarrow_available(engine or CSV_ENGINE) else []) + ["c"]
+
+
+def _arrow_options(path: Path, encoding: str, delimiter: str, block_size: Optional[int] = None):
+    """
+    (read, parse, convert) ของ pyarrow.csv ที่กำหนดทุกคอลัมน์เป็น string
+    (pd.read_csv(engine="pyarrow", dtype=str) เดาชนิดก่อนแล้วค่อยแปลง: "22" -> "22.0")
+    ค่าว่าง/NA ตามชุดเดียวกับ C engine; header ซ้ำ/ว่าง -> raise ให้ไปใช้ C engine
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    read = pa_csv.ReadOptions(encoding="utf8" if encoding in ("utf-8", "utf-8-sig") else encoding)
+    if block_size:
+        read.block_size = block_size
+    parse = pa_csv.ParseOptions(delimiter=delimiter, newlines_in_values=True)
+    with pa_csv.open_csv(path, read_options=read, parse_options=parse) as reader:
+        names = reader.schema.names
+    if not all(names) or len(set(names)) != len(names):
+        raise ValueError("header ว่างหรือซ้ำ (C engine ตั้งชื่อใหม่ให้)")
+    convert = pa_csv.ConvertOptions(column_types={n: pa.string() for n in names},
+                                    null_values=sorted(STR_NA_VALUES), strings_can_be_null=True)
+    return read, parse, convert
+
+
+def _arrow_frame(data) -> pd.DataFrame:
+    df = data.to_pandas()
+    if (df.dtypes == object).any():
+        df = df.where(df.notna(), np.nan)  # None -> NaN เหมือน C engine
+    return df
+
+
+def _read(path: Path, encoding: str, delimiter: str, engine: str) -> pd.DataFrame:
+    if engine == "pyarrow":
+        # แถวเสียรูป -> pyarrow raise ให้ไปใช้ C engine (on_bad_lines="warn")
+        from pyarrow import csv as pa_csv
+        read, parse, convert = _arrow_options(path, encoding, delimiter)
+        return _arrow_frame(pa_csv.read_csv(path, read_options=read, parse_options=parse, convert_options=convert))
+    return pd.read_csv(path, encoding=encoding, sep=delimiter, dtype=str,
+                       low_memory=False, on_bad_lines="warn", memory_map=True)
+
+
+def iter_csv_chunks(path: Path, encoding: str, delimiter: str, chunk_rows: int,
+                    engine: str = "c") -> Iterator[pd.DataFrame]:
+    """
+    อ่านทีละ chunk ด้วยตัวอ่านเดียวกับ read_csv_fast (ทุกค่าเป็น string แบบเดียวกัน)
+    - pyarrow: chunk ละราว chunk_rows แถว (ขนาด block คิดจากความยาวบรรทัดเฉลี่ยช่วงต้นไฟล์)
+      แถวเสียรูปกลางไฟล์ -> raise ผู้เรียกต้องเริ่มใหม่ด้วย engine="c"
+    - c: pd.read_csv(chunksize=chunk_rows) แถวเสียรูป -> warn แล้วข้าม
+    """
+    if engine == "pyarrow":
+        from pyarrow import csv as pa_csv
+        with open(path, "rb") as f:
+            sample = f.read(SNIFF_BYTES)
+        line_bytes = len(sample) / max(sample.count(b"\n"), 1)
+        read, parse, convert = _arrow_options(path, encoding, delimiter, max(1 << 16, int(chunk_rows * line_bytes)))
+        with pa_csv.open_csv(path, read_options=read, parse_options=parse, convert_options=convert) as reader:
+            for batch in reader:
+                if batch.num_rows:
+                    yield _arrow_frame(batch)
+        return
+    yield from pd.read_csv(path, encoding=encoding, sep=delimiter, dtype=str, chunksize=chunk_rows,
+                           low_memory=False, on_bad_lines="warn", memory_map=True)
+
+
+def read_csv_fast(path: Path, verbose: bool = False, engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    อ่าน CSV ทุกคอลัมน์เป็น string ในรอบเดียว
+    แถวเสียรูปยังรายงานผ่าน on_bad_lines="warn" เหมือนเดิม (pyarrow เจอแถวเสีย -> อ่านใหม่ด้วย C engine)
+    engine: auto | pyarrow | c (None = CSV_ENGINE)
+    """
+    t0 = time.time()
+    encoding, delimiter = sniff(path)
+    engines = engine_order(engine)
+    last_err = None
+    for engine in engines:
+        try:
+            df = _read(path, encoding, delimiter, engine)
+            if verbose:
+                print(f"📖 {Path(path).name}: {encoding}, sep={delimiter!r}, {engine} "
+                      f"-> {len(df):,} แถวใน {time.time() - t0:.2f}s")
+            return df
+        except UnicodeDecodeError as e:
+            last_err = e
+            break  # เดา encoding ผิด -> ไปไล่แบบเดิม
+        except Exception as e:
+            last_err = e  # pyarrow parse ไม่ผ่าน -> ลอง C engine
+    for enc in FALLBACK_ENCODINGS:
+        if enc == encoding:
+            continue
+        try:
+            return _read(path, enc, delimiter, "c")
+        except UnicodeDecodeError as e:
+            last_err = e
+    raise RuntimeError(f"อ่านไฟล์ไม่ได้: {path} (err={last_err})")
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+ซิงก์ CSV บน Google Drive แบบเพิ่มเฉพาะส่วนต่าง
+- เก็บสำเนาไฟล์บน Drive ไว้ในเครื่อง ({DRIVE_CACHE_DIR}/{fileId}.csv.gz) ผูกกับ md5Checksum/modifiedTime
+  ไฟล์บน Drive ไม่เปลี่ยน -> ไม่ต้องดาวน์โหลดซ้ำ
+- รวมเฉพาะแถวใหม่ผ่าน key_index.merge_new; ไม่มีแถวเปลี่ยน -> ไม่อัปโหลด
+- อัปโหลดแบบ resumable แบ่ง chunk (ขาดกลางทางต่อจาก chunk ล่าสุดได้)
+- Drive v3 ต่อท้ายไฟล์ไม่ได้ จึงยังต้องส่งทั้งไฟล์ตอนมีข้อมูลใหม่ (gzip ใช้กับ cache ในเครื่อง)
+ทุกฟังก์ชันรับ service จาก googleapiclient (ใช้กับ Drive จำลองในเครื่องได้ ดู bench/fake_drive.py)
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+
+import metrics
+from key_index import mark_synced, merge_new
+
+DRIVE_CACHE_DIR = os.getenv("DRIVE_CACHE_DIR", ".drive_cache")
+# ขนาด chunk ต้องเป็นพหุคูณของ 256 KB ตามข้อกำหนดของ resumable upload
+CHUNK_SIZE = int(os.getenv("DRIVE_CHUNK_MB", "8")) * 1024 * 1024
+
+META_FIELDS = "id,name,mimeType,md5Checksum,modifiedTime,size"
+
+
+def _read_csv_bytes(data: bytes) -> pd.DataFrame:
+    """แบบเดียวกับ scrap1 เดิม: decode utf-8-sig แล้ว read_csv"""
+    return pd.read_csv(io.StringIO(data.decode("utf-8-sig")))
+
+
+class DriveCache:
+    def __init__(self, file_id: str, directory: str = DRIVE_CACHE_DIR):
+        self.data_path = os.path.join(directory, f"{file_id}.csv.gz")
+        self.meta_path = os.path.join(directory, f"{file_id}.json")
+
+    def version(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def matches(self, meta: dict) -> bool:
+        v = self.version()
+        if not v or not os.path.exists(self.data_path):
+            return False
+        if meta.get("md5Checksum"):
+            return v.get("md5Checksum") == meta["md5Checksum"]
+        # Google Sheets ไม่มี md5 -> ใช้ modifiedTime แทน
+        return v.get("modifiedTime") == meta.get("modifiedTime")
+
+    def read(self) -> bytes:
+        with gzip.open(self.data_path, "rb") as f:
+            return f.read()
+
+    def write(self, data: bytes, meta: dict) -> None:
+        os.makedirs(os.path.dirname(self.data_path) or ".", exist_ok=True)
+        tmp = self.data_path + ".tmp"
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(data)
+        os.replace(tmp, self.data_path)
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({k: meta.get(k) for k in ("md5Checksum", "modifiedTime", "size")}, f)
+
+    def clear(self) -> None:
+        for path in (self.data_path, self.meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def file_meta(service, file_id: str) -> dict:
+    return service.files().get(fileId=file_id, fields=META_FIELDS, supportsAllDrives=True).execute()
+
+
+@metrics.timed("drive_download")
+def _download(service, meta: dict) -> bytes:
+    if meta.get("mimeType", "").startswith("application/vnd.google-apps"):
+        # Google Sheet -> export เป็น CSV
+        req = service.files().export_media(fileId=meta["id"], mimeType="text/csv")
+    else:
+        req = service.files().get_media(fileId=meta["id"], supportsAllDrives=True)
+    buf = io.BytesIO()
+    dl = MediaIoBaseDownload(buf, req, chunksize=CHUNK_SIZE)
+    done = False
+    while not done:
+        _, done = dl.next_chunk(num_retries=3)
+    return buf.getvalue()
+
+
+def fetch_bytes(service, file_id: str) -> Tuple[bytes, dict]:
+    """เนื้อไฟล์บน Drive (จาก cache ถ้า md5/modifiedTime ยังตรง) และ metadata"""
+    meta = file_meta(service, file_id)
+    cache = DriveCache(file_id)
+    if cache.matches(meta):
+        print(f"📦 Drive {meta.get('name', file_id)} ไม่เปลี่ยน -> ใช้สำเนาในเครื่อง")
+        return cache.read(), meta
+    data = _download(service, meta)
+    print(f"⬇️ ดาวน์โหลด {meta.get('name', file_id)} {len(data) / 1024:,.0f} KB")
+    cache.write(data, meta)
+    return data, meta
+
+
+def read_df(service, file_id: str,
+            reader: Callable[[bytes], pd.DataFrame] = _read_csv_bytes) -> pd.DataFrame:
+    data, _ = fetch_bytes(service, file_id)
+    return reader(data)
+
+
+@metrics.timed("drive_upload")
+def upload_bytes(service, file_id: str, data: bytes) -> dict:
+    """อัปโหลดทับแบบ resumable ทีละ chunk แล้วอัปเดต cache ด้วยเนื้อไฟล์ที่ส่งไป"""
+    media = MediaIoBaseUpload(io.BytesIO(data), mimetype="text/csv", chunksize=CHUNK_SIZE, resumable=True)
+    req = service.files().update(fileId=file_id, media_body=media, fields=META_FIELDS, supportsAllDrives=True)
+    resp = None
+    while resp is None:
+        _, resp = req.next_chunk(num_retries=3)  # ส่งซ้ำเฉพาะ chunk ที่ล้มเหลว
+    cache = DriveCache(file_id)
+    if resp.get("md5Checksum") in (None, hashlib.md5(data).hexdigest()):
+        cache.write(data, resp)
+    else:
+        cache.clear()  # Drive แปลงไฟล์ (เช่น Sheet) -> ครั้งหน้าค่อยดาวน์โหลดใหม่
+    print(f"⬆️ อัปโหลด {len(data) / 1024:,.0f} KB แบบ resumable (chunk {CHUNK_SIZE // (1024 * 1024)} MB)")
+    return resp
+
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+
+def sync_append(service, file_id: str, df_new: pd.DataFrame, dataset: str,
+                reader: Callable[[bytes], pd.DataFrame] = _read_csv_bytes,
+                normalize: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                fresh_on_error: bool = True) -> int:
+    """
+    รวม df_new เข้ากับไฟล์บน Drive (ลบซ้ำตาม natural key ของ dataset) แล้วอัปโหลดเมื่อมีข้อมูลเปลี่ยน
+    fresh_on_error=False: อ่านไฟล์เดิมไม่ได้ให้ raise แทนการเขียนทับด้วยข้อมูลใหม่อย่างเดียว
+    คืนจำนวนแถวทั้งหมดของไฟล์หลังรวม
+    """
+    try:
+        data_old, _ = fetch_bytes(service, file_id)
+        df_old = reader(data_old)
+    except Exception as e:
+        if not fresh_on_error:
+            raise
+        print(f"⚠️ อ่านไฟล์เดิมบน Drive ไม่ได้ ({e}) -> เริ่มจากไฟล์ว่าง")
+        data_old, df_old = b"", pd.DataFrame()
+    if normalize is not None:
+        df_old, df_new = normalize(df_old), normalize(df_new)
+    else:
+        all_cols = list(dict.fromkeys([*df_old.columns, *df_new.columns]))
+        df_old, df_new = df_old.reindex(columns=all_cols), df_new.reindex(columns=all_cols)
+
+    # fingerprint ของดัชนี key = md5 ของเนื้อไฟล์ (ไฟล์ถูกแก้บน Drive แม้จำนวนแถวเท่าเดิม -> สร้างดัชนีใหม่)
+    fp_old = hashlib.md5(data_old).hexdigest()
+    with metrics.stage("merge"):
+        merged = merge_new(df_old, df_new, dataset, fingerprint=fp_old)
+        data = to_csv_bytes(merged)
+    if data == data_old or data == to_csv_bytes(df_old):
+        mark_synced(dataset, fp_old)  # ไฟล์บน Drive ยังเป็นไฟล์เดิม
+        print(f"✔ ไม่มีแถวใหม่ -> ไม่ต้องอัปโหลด (rows = {len(merged)})")
+        return len(merged)
+    upload_bytes(service, file_id, data)
+    mark_synced(dataset, hashlib.md5(data).hexdigest())
+    print(f"✔ อัปเดตไฟล์ Drive rows = {len(merged)} (+{len(merged) - len(df_old)})")
+    return len(merged)
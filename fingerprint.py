@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+ตรวจว่าข้อมูลบนเว็บเปลี่ยนจากรอบก่อนหรือไม่ (รันซ้ำ/retry หลังรอบที่สำเร็จไม่ต้องไล่ทุกหน้าใหม่)
+- {name}.json เก็บ hash ของแถวแต่ละหน้า (และของ payload JSON/HTTP) จากรอบล่าสุดที่ดึงครบ
+- แถวมีวันที่ดึง (current_date) อยู่แล้ว รอบของวันอื่นจึงไม่มีทางตรงกัน
+- FORCE_SCRAPE=true: ไม่ใช้ fingerprint เดิม (ดึงครบทุกหน้า) แต่ยังบันทึกของรอบนี้
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+FORCE_SCRAPE = os.getenv("FORCE_SCRAPE", "false") == "true"
+FINGERPRINT_DIR = os.getenv("FINGERPRINT_DIR", ".fingerprints")
+
+
+class Unchanged(Exception):
+    """ข้อมูลเหมือนรอบก่อนทั้งชุด -> ใช้ผลเดิม"""
+
+
+def digest(rows: List[List[str]]) -> str:
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Fingerprints:
+    def __init__(self, name: str, output: Optional[str] = None, directory: str = FINGERPRINT_DIR):
+        """output: ไฟล์ผลลัพธ์ของรอบก่อน ถ้าไฟล์หายไป fingerprint เดิมใช้ไม่ได้"""
+        self.path = os.path.join(directory, f"{name}.json")
+        self.pages: Dict[str, str] = {}
+        self.payload: Optional[str] = None
+        self.payload_same = False
+        self.stopped_at: Optional[int] = None  # หน้าที่หยุดเพราะตรงกับรอบก่อน
+        self.prev = None if FORCE_SCRAPE or (output and not os.path.exists(output)) else self._load()
+
+    def _load(self) -> Optional[dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("complete") else None
+
+    def page_known(self, page: int, rows: List[List[str]]) -> bool:
+        """บันทึก hash ของหน้านี้ และบอกว่าตรงกับหน้าเดียวกันของรอบก่อนหรือไม่"""
+        h = digest(rows)
+        self.pages[str(page)] = h
+        return bool(rows) and self.prev is not None and self.prev.get("pages", {}).get(str(page)) == h
+
+    def payload_known(self, rows: List[List[str]]) -> bool:
+        self.payload = digest(rows)
+        self.payload_same = bool(rows) and self.prev is not None and self.prev.get("payload") == self.payload
+        return self.payload_same
+
+    @property
+    def unchanged(self) -> bool:
+        """ทั้งชุดเหมือนรอบก่อน (หน้าแรกหรือ payload ตรง)"""
+        return self.payload_same or self.stopped_at == 1
+
+    def save(self) -> None:
+        """
+        บันทึกเป็นรอบที่ครบ
+        หยุดก่อนจบ (stopped_at) -> ใช้ hash หน้าหลังจากนั้นของรอบก่อนต่อ
+        """
+        pages = dict(self.pages)
+        if self.stopped_at is not None and self.prev:
+            for p, h in self.prev.get("pages", {}).items():
+                if int(p) > self.stopped_at:
+                    pages.setdefault(p, h)
+        state = {
+            "complete": True,
+            "pages": pages,
+            "payload": self.payload,
+            "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+คลังประวัติแบบ columnar แบ่ง partition แทน CSV ที่ต่อท้ายไปเรื่อย ๆ
+  {HISTORY_DIR}/{dataset}/dam_type={large|medium}/date=YYYY-MM-DD/part-*.parquet
+- ทุกรอบ scrape เขียน partition ของวันนั้น (รันซ้ำวันเดียวกัน = แทนที่ partition เดิม)
+- คอลัมน์มีชนิดข้อมูลจริง (measurements): float32 / datetime / dictionary
+- อ่านแบบ lazy ด้วย pyarrow.dataset: ตัด partition ตามช่วงวันที่ก่อนเปิดไฟล์
+- HISTORY_FORMAT=ipc: Arrow IPC ไม่บีบอัด โหลดแบบ memory-map (zero-copy)
+- export_csv: เขียน CSV ทีละ batch (ค่าแบบมีชนิด: ตัวเลขไม่มี comma, ค่าว่างเป็นช่องว่าง
+  ไม่ใช่รูปแบบเดียวกับ waterdam_report.csv ของ scrap4 โหมดปกติ -> scrap4 ใช้เมื่อ MERGE_MODE=store เท่านั้น)
+
+ใช้งาน:
+  python history_store.py import waterdam waterdam_report_large.csv --dam-type large --date-format %m/%d/%Y
+  python history_store.py export waterdam waterdam_report.csv --start 2025-01-01
+"""
+import argparse
+import csv
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from measurements import type_dam_frame, type_waterlevel_frame
+from schemas import SCHEMAS
+
+HISTORY_STORE = os.getenv("HISTORY_STORE", "false") == "true"
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+HISTORY_FORMAT = os.getenv("HISTORY_FORMAT", "parquet")  # parquet | ipc
+
+DAM_COLUMNS = SCHEMAS["waterdam"].names
+
+TYPERS: Dict[str, Callable[..., pd.DataFrame]] = {
+    "waterdam": type_dam_frame,
+    "waterlevel": type_waterlevel_frame,
+}
+
+_EXT = {"parquet": "parquet", "ipc": "arrow"}
+
+# partition ของแถวที่อ่านวันที่ไม่ได้: เรียงก่อนทุกวัน จึงหลุดจากการกรองด้วย start เสมอ
+UNDATED = "0000-00-00"
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([("dam_type", pa.string()), ("date", pa.string())]), flavor="hive")
+
+
+def partition_dir(dataset: str, dam_type: str, day: str) -> str:
+    return os.path.join(HISTORY_DIR, dataset, f"dam_type={dam_type}", f"date={day}")
+
+
+def _normalize(table):
+    """ให้ schema ของทุก partition ตรงกัน (dictionary int32, timestamp us, คอลัมน์ว่างเป็น string)"""
+    import pyarrow as pa
+    fields = []
+    for f in table.schema:
+        t = f.type
+        if pa.types.is_dictionary(t):
+            t = pa.dictionary(pa.int32(), pa.string())
+        elif pa.types.is_timestamp(t):
+            t = pa.timestamp("us")
+        elif pa.types.is_null(t) or pa.types.is_large_string(t):
+            t = pa.string()
+        fields.append(pa.field(f.name, t))
+    return table.cast(pa.schema(fields))
+
+
+def write_partition(dataset: str, rows: Sequence[List[str]], dam_type: str,
+                    day: Optional[str] = None, columns: Sequence[str] = DAM_COLUMNS,
+                    date_formats: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    เขียนแถว (string) ของหนึ่งรอบ scrape เป็น partition ใหม่ของวัน day (ค่าเริ่มต้น = วันนี้)
+    partition เดิมของวันเดียวกันถูกแทนที่ทั้งก้อน (สลับโฟลเดอร์หลังเขียนเสร็จ)
+    """
+    if not rows:
+        return None
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    width = len(columns)
+    df = pd.DataFrame([list(r[:width]) + [""] * (width - len(r)) for r in rows], columns=list(columns))
+    typed = TYPERS[dataset](df.drop(columns=["DamType"], errors="ignore"), date_formats)
+    table = _normalize(pa.Table.from_pandas(typed, preserve_index=False))
+
+    final_dir = partition_dir(dataset, dam_type, day)
+    # ชื่อขึ้นต้นด้วย "." -> scan ข้ามโฟลเดอร์ที่ยังเขียนไม่เสร็จ
+    parent, name = os.path.split(final_dir)
+    tmp_dir = os.path.join(parent, f".tmp-{name}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(tmp_dir)
+    path = os.path.join(tmp_dir, f"part-{datetime.now():%H%M%S}.{_EXT[HISTORY_FORMAT]}")
+    if HISTORY_FORMAT == "ipc":
+        feather.write_feather(table, path, compression="uncompressed")
+    else:
+        pq.write_table(table, path)
+    old_dir = os.path.join(parent, f".old-{name}-{uuid.uuid4().hex[:8]}")
+    if os.path.exists(final_dir):
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(f"🗄️ {dataset}/{dam_type}/{day}: {table.num_rows:,} แถว -> {final_dir}")
+    return os.path.join(final_dir, os.path.basename(path))
+
+
+def write_frame(dataset: str, df: pd.DataFrame, dam_type: str,
+                date_formats: Optional[Sequence[str]] = None) -> int:
+    """นำเข้า CSV เดิม: แบ่ง partition ตามวันที่ใน Data_Time (แถวที่ไม่มีวันที่ -> UNDATED)"""
+    days = TYPERS[dataset](df[["Data_Time"]], date_formats)["Data_Time"].dt.strftime("%Y-%m-%d")
+    n = 0
+    for day, part in df.groupby(days.fillna(UNDATED), sort=True):
+        write_partition(dataset, part.astype(object).where(part.notna(), "").values.tolist(),
+                        dam_type, day, list(df.columns), date_formats)
+        n += len(part)
+    return n
+
+
+def scan(dataset: str, start: Optional[str] = None, end: Optional[str] = None,
+         dam_types: Optional[Sequence[str]] = None, columns: Optional[Sequence[str]] = None):
+    """
+    คืน pyarrow Scanner แบบ lazy (None ถ้ายังไม่มีข้อมูล)
+    start/end (YYYY-MM-DD รวมปลาย) และ dam_types ใช้ตัด partition โดยไม่เปิดไฟล์
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+
+    root = os.path.join(HISTORY_DIR, dataset)
+    if not os.path.isdir(root):
+        return None
+    dataset_ = ds.dataset(
+        root,
+        format="ipc" if HISTORY_FORMAT == "ipc" else "parquet",
+        partitioning=_partitioning(),
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=True,
+        ignore_prefixes=[".", "_"],
+    )
+    cond = None
+    for expr in (
+        ds.field("date") >= start if start else None,
+        ds.field("date") <= end if end else None,
+        ds.field("dam_type").isin(list(dam_types)) if dam_types else None,
+    ):
+        if expr is not None:
+            cond = expr if cond is None else cond & expr
+    return dataset_.scanner(columns=list(columns) if columns else None, filter=cond)
+
+
+def load(dataset: str, start: Optional[str] = None, end: Optional[str] = None,
+         dam_types: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    scanner = scan(dataset, start, end, dam_types)
+    if scanner is None:
+        return pd.DataFrame()
+    return scanner.to_table().to_pandas()
+
+
+def _csv_batches(scanner) -> Iterator[pd.DataFrame]:
+    for batch in scanner.to_batches():
+        if batch.num_rows == 0:
+            continue
+        df = batch.to_pandas()
+        for col in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = df[col].dt.strftime("%d/%m/%Y")
+        yield df.rename(columns={"dam_type": "DamType"}).drop(columns=["date"])
+
+
+def export_csv(dataset: str, path: str, start: Optional[str] = None, end: Optional[str] = None,
+               dam_types: Optional[Sequence[str]] = None) -> int:
+    """เขียน CSV (utf-8-sig) ทีละ batch; วันที่เป็น dd/mm/YYYY, ค่าว่างเป็นช่องว่าง"""
+    scanner = scan(dataset, start, end, dam_types)
+    tmp = f"{path}.part"
+    rows = 0
+    with open(tmp, "w", encoding="utf-8-sig", newline="") as f:
+        for df in _csv_batches(scanner) if scanner is not None else ():
+            df.to_csv(f, index=False, header=rows == 0, lineterminator=os.linesep,
+                      quoting=csv.QUOTE_MINIMAL)
+            rows += len(df)
+    os.replace(tmp, path)
+    print(f"📤 export {dataset} -> {path} ({rows:,} แถว)")
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="นำเข้า CSV เดิมเข้า store")
+    imp.add_argument("dataset", choices=sorted(TYPERS))
+    imp.add_argument("csv")
+    imp.add_argument("--dam-type", required=True)
+    imp.add_argument("--date-format", action="append", dest="date_formats",
+                     help="รูปแบบ Data_Time ของไฟล์ เช่น %%m/%%d/%%Y (ใส่ซ้ำได้; ไม่ใส่ = รูปแบบเริ่มต้นของ dataset)")
+    exp = sub.add_parser("export", help="export store เป็น CSV")
+    exp.add_argument("dataset", choices=sorted(TYPERS))
+    exp.add_argument("csv")
+    exp.add_argument("--start")
+    exp.add_argument("--end")
+    args = ap.parse_args()
+
+    if args.cmd == "import":
+        from csv_ingest import read_csv_fast
+        n = write_frame(args.dataset, read_csv_fast(args.csv), args.dam_type, args.date_formats)
+        print(f"✅ นำเข้า {n:,} แถว")
+    else:
+        export_csv(args.dataset, args.csv, args.start, args.end)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP GET แบบมี cache บนดิสก์ ใช้ร่วมกันทุก scraper (ข้อมูลอ้างอิงที่แทบไม่เปลี่ยน เช่น รายชื่อจังหวัด)
+- ใช้ Session กลางของ http_fetch (connection pool + keep-alive)
+- TTL ต่อ endpoint (TTL_RULES / HTTP_CACHE_TTL) ยังไม่หมดอายุ -> ไม่ยิง network เลย
+- หมดอายุแล้วยิงพร้อม If-None-Match / If-Modified-Since; ได้ 304 -> ใช้ของเดิมต่อ
+- เกิน HTTP_CACHE_MAX_MB -> ลบรายการที่ไม่ได้ใช้นานที่สุดก่อน (LRU)
+- HTTP_CACHE_OFFLINE=true: มีใน cache แล้วใช้เลยแม้หมดอายุ (รันซ้ำตอนพัฒนา)
+- validate=fn: ตรวจเนื้อ response ก่อนเก็บ/ก่อนใช้ของใน cache (ไม่ผ่าน = ไม่เก็บ/ลบทิ้ง)
+  refresh=True: ไม่อ่านจาก cache (ใช้ตอน retry) แต่ยังเก็บผลใหม่
+- นับ hit / revalidated / miss ไว้ใน STATS สำหรับสรุปท้ายรอบ (summary())
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from http_fetch import HTTP_TIMEOUT, get_session
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE", "true") == "true"
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_MAX_MB = float(os.getenv("HTTP_CACHE_MAX_MB", "64"))
+HTTP_CACHE_OFFLINE = os.getenv("HTTP_CACHE_OFFLINE", "false") == "true"
+
+# (ส่วนของ URL, TTL วินาที) ตัวแรกที่ตรงถูกใช้; ไม่ตรงเลย = TTL 0 (ตรวจกับ server ทุกครั้ง)
+TTL_RULES: List[Tuple[str, int]] = [
+    ("tmd.go.th/api/province/select", 7 * 24 * 3600),
+]
+# เพิ่ม/ทับกฎจาก env: HTTP_CACHE_TTL="province/select=86400,api/foo=600"
+for _rule in filter(None, os.getenv("HTTP_CACHE_TTL", "").split(",")):
+    _part, _, _ttl = _rule.rpartition("=")
+    TTL_RULES.insert(0, (_part.strip(), int(_ttl)))
+
+STATS: Dict[str, int] = {"hit": 0, "revalidated": 0, "miss": 0, "bypass": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(kind: str) -> None:
+    with _stats_lock:
+        STATS[kind] += 1
+
+
+def summary() -> str:
+    return (f"🗃️ HTTP cache: hit={STATS['hit']} revalidated={STATS['revalidated']} "
+            f"miss={STATS['miss']} bypass={STATS['bypass']}")
+
+
+def ttl_for(url: str) -> int:
+    for part, ttl in TTL_RULES:
+        if part in url:
+            return ttl
+    return 0
+
+
+class _Store:
+    """ดัชนีใน SQLite + เนื้อ response เป็นไฟล์แยก ({key}.body)"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT,"
+            " expires REAL, size INTEGER, accessed REAL)"
+        )
+        self.db.commit()
+
+    def _body(self, key: str) -> str:
+        return os.path.join(self.dir, f"{key}.body")
+
+    def get(self, key: str) -> Optional[dict]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._body(key), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "expires": row[2], "body": body}
+
+    def touch(self, key: str, expires: Optional[float] = None) -> None:
+        with self.lock:
+            if expires is None:
+                self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+            else:
+                self.db.execute("UPDATE entries SET accessed = ?, expires = ? WHERE key = ?",
+                                (time.time(), expires, key))
+            self.db.commit()
+
+    def put(self, key: str, url: str, body: bytes, etag: Optional[str],
+            last_modified: Optional[str], expires: float) -> None:
+        tmp = self._body(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, self._body(key))
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, etag, last_modified, expires, len(body), time.time()),
+            )
+            self._evict()
+            self.db.commit()
+
+    def drop(self, key: str) -> None:
+        with self.lock:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.db.commit()
+        try:
+            os.remove(self._body(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self._body(key))
+            except OSError:
+                pass
+            total -= size
+
+
+_store: Optional[_Store] = None
+_store_lock = threading.Lock()
+
+
+def _get_store() -> _Store:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = _Store(HTTP_CACHE_DIR, int(HTTP_CACHE_MAX_MB * 1024 * 1024))
+        return _store
+
+
+def get(url: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[int] = None,
+        timeout: float = HTTP_TIMEOUT, validate: Optional[Callable[[bytes], Any]] = None,
+        refresh: bool = False) -> bytes:
+    """
+    GET แล้วคืนเนื้อ response (bytes) ผ่าน cache
+    validate: raise ถ้าเนื้อ response ใช้ไม่ได้ -> ไม่เก็บลง cache (response เสียครั้งเดียวไม่ค้างไปทั้ง TTL)
+    refresh: ข้ามของใน cache (เช่น retry หลัง validate ไม่ผ่าน)
+    """
+    full = requests.Request("GET", url, params=params).prepare().url
+    if not HTTP_CACHE_ENABLED:
+        _count("bypass")
+        r = get_session().get(full, timeout=timeout)
+        r.raise_for_status()
+        if validate is not None:
+            validate(r.content)
+        return r.content
+
+    store = _get_store()
+    key = hashlib.sha1(full.encode("utf-8")).hexdigest()
+    ttl = ttl_for(full) if ttl is None else ttl
+    entry = None if refresh else store.get(key)
+    if entry and validate is not None:
+        try:
+            validate(entry["body"])
+        except Exception as e:
+            print(f"⚠️ cache ของ {full} ใช้ไม่ได้ ({e}) -> ลบแล้วโหลดใหม่")
+            store.drop(key)
+            entry = None
+    now = time.time()
+    if entry and (entry["expires"] > now or HTTP_CACHE_OFFLINE):
+        _count("hit")
+        store.touch(key)
+        return entry["body"]
+
+    headers = {}
+    if entry and entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    r = get_session().get(full, headers=headers, timeout=timeout)
+    if r.status_code == 304 and entry:
+        _count("revalidated")
+        store.touch(key, now + ttl)
+        return entry["body"]
+    r.raise_for_status()
+    _count("miss")
+    if validate is not None:
+        validate(r.content)
+    store.put(key, full, r.content, r.headers.get("ETag"), r.headers.get("Last-Modified"), now + ttl)
+    return r.content
+
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, ttl: Optional[int] = None,
+             validate: Optional[Callable[[Any], Any]] = None, refresh: bool = False) -> Any:
+    """validate รับค่าที่ parse แล้ว (JSON ที่ parse ไม่ได้ก็ไม่ถูกเก็บเช่นกัน)"""
+    def check(body: bytes) -> None:
+        data = json.loads(body)
+        if validate is not None:
+            validate(data)
+    return json.loads(get(url, params, ttl, validate=check, refresh=refresh))
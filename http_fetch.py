@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+ดึงข้อมูลจาก backend API โดยตรง (ไม่เปิด Chrome)
+- ใช้ requests.Session ตัวเดียว (connection pool + keep-alive)
+- ถ้า API แบ่งหน้า จะยิงหน้าที่เหลือพร้อมกันด้วย thread pool แบบจำกัดจำนวน
+- คืน record (list[dict]) ให้ scraper แปลงเป็นแถวด้วย _row_from_record ของตัวเอง
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from netcapture import find_records
+
+FETCH_MODE = os.getenv("FETCH_MODE", "selenium")  # selenium | http
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "4"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
+)
+
+# key ที่ API มักใช้บอกจำนวนหน้าทั้งหมด
+_TOTAL_PAGE_KEYS = ("last_page", "total_pages", "totalPages", "page_count")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def use_http() -> bool:
+    return FETCH_MODE == "http"
+
+
+def get_session() -> requests.Session:
+    """Session เดียวทั้ง process (thread-safe สำหรับการยิง GET พร้อมกัน)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_WORKERS, pool_maxsize=HTTP_WORKERS, max_retries=2)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+            _session = s
+        return _session
+
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None) -> Any:
+    r = get_session().get(url, params=params, timeout=HTTP_TIMEOUT)
+    r.raise_for_status()
+    return r.json()
+
+
+def _total_pages(payload: Any) -> int:
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for k in _TOTAL_PAGE_KEYS:
+                if isinstance(node.get(k), int):
+                    return node[k]
+            stack.extend(v for v in node.values() if isinstance(v, dict))
+    return 1
+
+
+def fetch_records(url: str, page_param: Optional[str] = None, params: Optional[Dict[str, Any]] = None,
+                  workers: int = HTTP_WORKERS) -> List[dict]:
+    """
+    ดึง record ทั้งหมดจาก endpoint
+    - page_param=None: ยิงครั้งเดียว
+    - page_param='page': ยิงหน้าแรกเพื่อหาจำนวนหน้า แล้วยิงที่เหลือพร้อมกัน (เรียงตามหน้า)
+    """
+    base = dict(params or {})
+    first = get_json(url, {**base, page_param: 1} if page_param else base)
+    records = list(find_records(first))
+    if not page_param:
+        return records
+
+    total = _total_pages(first)
+    if total <= 1:
+        return records
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        pages = ex.map(lambda p: find_records(get_json(url, {**base, page_param: p})), range(2, total + 1))
+        for recs in pages:
+            records.extend(recs)
+    print(f"🌐 {url}: {total} หน้า, {len(records)} records")
+    return records
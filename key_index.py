@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+ดัชนี natural key ถาวรต่อ dataset (SQLite) สำหรับลบแถวซ้ำข้ามรอบ
+- เก็บ hash 64-bit ของคอลัมน์ key เป็น INTEGER PRIMARY KEY (ไม่เก็บทั้งแถว)
+- ตรวจ/เพิ่มแถวใหม่ด้วย O(แถวใหม่) แทน drop_duplicates ทั้งประวัติ
+- fingerprint ของข้อมูลต้นทาง (เช่น md5 ของไฟล์บน Drive, ขนาด CSV) ไม่ตรง -> สร้างดัชนีใหม่
+"""
+import os
+import sqlite3
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from schemas import SCHEMAS
+
+KEY_INDEX_ENABLED = os.getenv("KEY_INDEX", "true") == "true"
+KEY_INDEX_DIR = os.getenv("KEY_INDEX_DIR", ".keyindex")
+
+# natural key ของแต่ละ dataset (ประกาศไว้ใน schemas.SCHEMAS)
+KEYS: Dict[str, List[str]] = {name: schema.keys for name, schema in SCHEMAS.items()}
+
+
+def key_hashes(df: pd.DataFrame, keys: Sequence[str]) -> np.ndarray:
+    """hash 64-bit ของคอลัมน์ key (เทียบเป็นข้อความที่ตัด space; ค่าว่าง = "")"""
+    cols = {k: (df[k] if k in df.columns else pd.Series("", index=df.index)) for k in keys}
+    frame = pd.DataFrame({k: s.astype(object).where(s.notna(), "").astype(str).str.strip()
+                          for k, s in cols.items()})
+    # SQLite เก็บ INTEGER แบบมีเครื่องหมาย -> มอง uint64 เป็น int64
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
+
+
+class KeyIndex:
+    def __init__(self, dataset: str, keys: Optional[Sequence[str]] = None,
+                 directory: str = KEY_INDEX_DIR):
+        self.dataset = dataset
+        self.keys = list(keys or KEYS[dataset])
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{dataset}.sqlite")
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "CREATE TABLE IF NOT EXISTS keys (h INTEGER PRIMARY KEY);"
+            "CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);"
+        )
+        stored = self._meta("keys")
+        if stored and stored != ",".join(self.keys):
+            print(f"ℹ️ key ของ {dataset} เปลี่ยน ({stored} -> {','.join(self.keys)}) สร้างดัชนีใหม่")
+            self.reset()
+
+    # ------------------------------------------------------------------ meta
+    def _meta(self, k: str) -> Optional[str]:
+        row = self._db.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, k: str, v: str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", (k, v))
+
+    def synced(self, fingerprint: str) -> bool:
+        """ดัชนีตรงกับข้อมูลต้นทางที่ fingerprint นี้หรือไม่"""
+        return self._meta("fingerprint") == str(fingerprint)
+
+    def commit(self, fingerprint: str) -> None:
+        self._set_meta("fingerprint", str(fingerprint))
+        self._set_meta("keys", ",".join(self.keys))
+        self._db.commit()
+
+    # ------------------------------------------------------------------ keys
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def reset(self) -> None:
+        self._db.execute("DELETE FROM keys")
+        self._db.execute("DELETE FROM meta")
+        self._db.commit()
+
+    def rebuild(self, df: pd.DataFrame, fingerprint: str) -> None:
+        """สร้างดัชนีใหม่จากข้อมูลทั้งก้อน (ใช้เมื่อ fingerprint ไม่ตรง)"""
+        self.reset()
+        self.add(df)
+        self.commit(fingerprint)
+        print(f"🔑 สร้างดัชนี {self.dataset} ใหม่: {len(self):,} key")
+
+    def seen(self, df: pd.DataFrame) -> np.ndarray:
+        """mask ของแถวที่ key มีอยู่ในดัชนีแล้ว"""
+        if df.empty:
+            return np.zeros(0, dtype=bool)
+        h = key_hashes(df, self.keys)
+        uniq = np.unique(h)
+        cur = self._db.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS q (h INTEGER PRIMARY KEY)")
+        cur.execute("DELETE FROM q")
+        cur.executemany("INSERT INTO q (h) VALUES (?)", ((int(x),) for x in uniq))
+        hits = np.fromiter((r[0] for r in cur.execute("SELECT h FROM q JOIN keys USING (h)")),
+                           dtype=np.int64)
+        return np.isin(h, hits)
+
+    def add(self, df: pd.DataFrame) -> int:
+        """เพิ่ม key ของแถวใน df; คืนจำนวน key ที่เพิ่มใหม่"""
+        if df.empty:
+            return 0
+        before = self._db.total_changes
+        self._db.executemany("INSERT OR IGNORE INTO keys (h) VALUES (?)",
+                             ((int(x),) for x in np.unique(key_hashes(df, self.keys))))
+        return self._db.total_changes - before
+
+    def close(self) -> None:
+        self._db.commit()
+        self._db.close()
+
+
+def merge_new(old: pd.DataFrame, new: pd.DataFrame, dataset: str,
+              keys: Optional[Sequence[str]] = None, fingerprint: Optional[str] = None) -> pd.DataFrame:
+    """
+    ผลเหมือน concat([old, new]).drop_duplicates(keys, keep="last")
+    - ถ้า key ของแถวใหม่ไม่เคยมีในดัชนี (กรณีปกติ) ต่อท้ายได้เลยโดยไม่ไล่ทั้งประวัติ
+    - ถ้ามี key ซ้ำกับของเดิม (รันซ้ำวันเดียวกัน) ค่อยลบซ้ำทั้งก้อนแบบเดิม
+    fingerprint: ค่าที่บอกเนื้อหาของ old (เช่น md5 ของไฟล์) ต้องตรงกับที่ mark_synced บันทึกไว้หลังเขียน
+    ผลรอบก่อน ไม่งั้น (หรือไม่ใส่) จะสร้างดัชนีใหม่จาก old และลบ key ซ้ำที่มีอยู่ใน old เองด้วย
+    หลังเขียนผลแล้วผู้เรียกต้อง mark_synced(dataset, fingerprint ของผล) ไม่งั้นรอบหน้าสร้างดัชนีใหม่
+    """
+    keys = list(keys or KEYS[dataset])
+    if not KEY_INDEX_ENABLED:
+        merged = pd.concat([old, new], ignore_index=True)
+        return merged.drop_duplicates(subset=[k for k in keys if k in merged.columns], keep="last")
+
+    idx = KeyIndex(dataset, keys)
+    try:
+        merged = pd.concat([old, new], ignore_index=True)
+        subset = [k for k in keys if k in merged.columns]
+        if fingerprint is None or not idx.synced(fingerprint):
+            # old ไม่ใช่ผลที่ดัชนีรู้จัก (ไฟล์ถูกแก้/ประวัติเก่า) -> อาจมี key ซ้ำในตัวเอง
+            head = merged.iloc[:len(old)]
+            dups = head.index[head.duplicated(subset=subset, keep="last").to_numpy()]
+            if len(dups):
+                print(f"🧹 {dataset}: ลบแถวซ้ำในไฟล์เดิม {len(dups):,} แถว")
+                merged = merged.drop(dups)
+            idx.rebuild(old, "")
+        hits = int(idx.seen(new).sum())
+        if hits:
+            print(f"🔁 {dataset}: {hits:,} แถวมี key เดิมอยู่แล้ว -> แทนที่แถวเก่า")
+            merged = merged.drop_duplicates(subset=subset, keep="last")
+        else:
+            # ลบซ้ำเฉพาะในส่วนที่เพิ่งต่อท้าย (O(แถวใหม่))
+            tail = merged[merged.index >= len(old)]
+            merged = merged.drop(tail.index[tail.duplicated(subset=subset, keep="last").to_numpy()])
+        idx.add(new)
+        idx.commit("")  # ยังไม่รู้ fingerprint ของผล -> รอ mark_synced
+    finally:
+        idx.close()
+    return merged
+
+
+def mark_synced(dataset: str, fingerprint: str, keys: Optional[Sequence[str]] = None) -> None:
+    """บันทึกว่าดัชนีตรงกับข้อมูลที่มี fingerprint นี้ (เรียกหลังเขียน/อัปโหลดผลของ merge_new แล้ว)"""
+    if not KEY_INDEX_ENABLED:
+        return
+    idx = KeyIndex(dataset, keys)
+    try:
+        idx.commit(fingerprint)
+    finally:
+        idx.close()
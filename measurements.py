@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+แปลงคอลัมน์ข้อความของข้อมูลเขื่อน/ระดับน้ำให้เป็นชนิดข้อมูลจริง (vectorized)
+- "1,248.49 (86%)" -> Water_Stored=1248.49, Water_Stored_Pct=86.0 (float32)
+- "1,454.36" -> 1454.36 (ตัด , หลักพัน)
+- Data_Time: dd/mm/YYYY (ประวัติเขื่อน), mm/dd/YYYY (scrap3) และ mm/dd/yy (scrap2) -> datetime64
+  ค่าเริ่มต้นตามชุดข้อมูล (DATE_FORMATS); ค่าที่แปลงไม่ได้หรือกำกวม -> ValueError (ไม่เขียนเป็น NaT)
+- ค่าว่าง/ขีด -> NaN/NaT (ไม่แปลงเป็น "0")
+- คอลัมน์ชื่อ (Dam/Location/Station/...) -> category
+ทุกฟังก์ชันแปลงเฉพาะค่าที่ไม่ซ้ำ (factorize) แล้วกระจายกลับ เพราะข้อมูลซ้ำกันสูง
+"""
+from typing import Callable, Iterable, Optional, Sequence
+
+import pandas as pd
+from pandas.api.extensions import take
+
+NULL_TOKENS = ("", "-", "--", "–", "—")
+
+_VALUE_PCT_RE = r"^\s*(?P<value>[-+]?[\d,]*\.?\d+)\s*(?:\(\s*(?P<pct>[-+]?[\d,]*\.?\d+)\s*%\s*\))?\s*$"
+
+DAM_CATEGORIES = ("Dam", "Location", "Water_Type", "DamType")
+DAM_NUMBERS = ("Capacity_Total", "Capacity_Usable", "Inflow", "Outflow")
+DAM_VALUE_PCT = ("Water_Stored", "Water_Usable")
+
+WATERLEVEL_CATEGORIES = ("Station", "Location", "Status")
+WATERLEVEL_NUMBERS = ("Water_Level", "Bank_Level", "Gauge_Zero", "Capacity_Percent")
+
+
+def _on_uniques(s: pd.Series, fn: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    """ใช้ fn กับค่าที่ไม่ซ้ำของ s แล้วกระจายกลับ (NaN คงเป็น NaN/NaT)"""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    parsed = fn(pd.Series(uniques, dtype=object)).to_numpy()
+    return pd.Series(take(parsed, codes, allow_fill=True), index=s.index, name=s.name)
+
+
+def _clean_text(u: pd.Series) -> pd.Series:
+    u = u.astype(str).str.strip()
+    return u.mask(u.isin(NULL_TOKENS))
+
+
+def _to_float(u: pd.Series) -> pd.Series:
+    return pd.to_numeric(u.str.replace(",", "", regex=False), errors="coerce").astype("float32")
+
+
+def parse_number(s: pd.Series) -> pd.Series:
+    """"1,454.36" -> 1454.36 (float32); ค่าที่แปลงไม่ได้ -> NaN"""
+    return _on_uniques(s, lambda u: _to_float(_clean_text(u)))
+
+
+def split_value_percent(s: pd.Series):
+    """"1,248.49 (86%)" -> (1248.49, 86.0) เป็น float32 ทั้งคู่"""
+    def _parts(u: pd.Series) -> pd.DataFrame:
+        parts = _clean_text(u).str.extract(_VALUE_PCT_RE)
+        return pd.DataFrame({"value": _to_float(parts["value"]), "pct": _to_float(parts["pct"])})
+
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    parts = _parts(pd.Series(uniques, dtype=object))
+    return tuple(
+        pd.Series(take(parts[col].to_numpy(dtype="float32"), codes, allow_fill=True), index=s.index)
+        for col in ("value", "pct")
+    )
+
+
+# รูปแบบ Data_Time ที่แต่ละชุดข้อมูลเขียนจริง (ใช้เมื่อไม่ได้ระบุ date_formats)
+# - waterdam: ไฟล์ประวัติ waterdam_report*.csv เป็น d/m/Y (scrap3 เขียน m/d/Y จึงส่ง formats เองตอน write_partition)
+# - waterlevel: scrap2/daemon เขียน m/d/y
+DATE_FORMATS = {
+    "waterdam": ("%d/%m/%Y",),
+    "waterlevel": ("%m/%d/%y",),
+}
+
+
+def parse_data_time(s: pd.Series, formats: Sequence[str]) -> pd.Series:
+    """
+    แปลงด้วยทุกรูปแบบใน formats แล้วใช้ผลที่อ่านได้ (ค่าว่าง/ขีดในต้นทาง -> NaT)
+    - ไม่ใช้ "รูปแบบแรกที่อ่านได้": 10/05/2025 อ่านได้ทั้ง d/m และ m/d แต่ได้คนละวัน -> กำกวม
+    - มีค่าที่แปลงไม่ได้หรือกำกวม -> ValueError ทั้งก้อน แทนการเขียนเป็น NaT เงียบ ๆ
+    """
+    formats = tuple(formats)
+
+    def _parse(u: pd.Series) -> pd.Series:
+        u = _clean_text(u)
+        out = pd.to_datetime(u, format=formats[0], errors="coerce")
+        ambiguous = pd.Series(False, index=u.index)
+        for fmt in formats[1:]:
+            other = pd.to_datetime(u, format=fmt, errors="coerce")
+            ambiguous |= out.notna() & other.notna() & (out != other)
+            out = out.fillna(other)
+        if ambiguous.any():
+            raise ValueError(f"❌ Data_Time กำกวม {int(ambiguous.sum()):,} ค่า (ไม่นับซ้ำ) (เช่น {u[ambiguous].iloc[0]}) "
+                             f"อ่านได้หลายวันตาม {list(formats)} -> ระบุรูปแบบเดียวตามแหล่งข้อมูล")
+        failed = u.notna() & out.isna()
+        if failed.any():
+            raise ValueError(f"❌ Data_Time แปลงไม่ได้ {int(failed.sum()):,} ค่า (ไม่นับซ้ำ) (เช่น {u[failed].iloc[0]}) "
+                             f"ด้วยรูปแบบ {list(formats)} -> ระบุรูปแบบตามแหล่งข้อมูล")
+        return out
+
+    return _on_uniques(s, _parse)
+
+
+def to_category(s: pd.Series) -> pd.Series:
+    return _on_uniques(s, _clean_text).astype("category")
+
+
+def _typed(df: pd.DataFrame, categories: Iterable[str], numbers: Iterable[str],
+           value_pct: Iterable[str], date_formats: Sequence[str]) -> pd.DataFrame:
+    out = {}
+    for col in df.columns:
+        if col in categories:
+            out[col] = to_category(df[col])
+        elif col in numbers:
+            out[col] = parse_number(df[col])
+        elif col in value_pct:
+            out[col], out[f"{col}_Pct"] = split_value_percent(df[col])
+        elif col == "Data_Time":
+            out[col] = parse_data_time(df[col], date_formats)
+        else:
+            out[col] = df[col]
+    return pd.DataFrame(out, index=df.index)
+
+
+def type_dam_frame(df: pd.DataFrame, date_formats: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """ข้อมูลเขื่อน (waterdam_report*.csv) ที่อ่านมาเป็น string"""
+    return _typed(df, DAM_CATEGORIES, DAM_NUMBERS, DAM_VALUE_PCT, date_formats or DATE_FORMATS["waterdam"])
+
+
+def type_waterlevel_frame(df: pd.DataFrame, date_formats: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """ข้อมูลระดับน้ำ (waterlevel_report.csv) ที่อ่านมาเป็น string"""
+    return _typed(df, WATERLEVEL_CATEGORIES, WATERLEVEL_NUMBERS, (), date_formats or DATE_FORMATS["waterlevel"])
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+จับเวลาแต่ละขั้นของ scraper แล้วเขียนสรุปเป็น JSON ต่อรอบ (METRICS=true)
+- stage("page_load") : context manager จับเวลาช่วงหนึ่ง
+- timed("extract_rows") : decorator จับเวลาทั้งฟังก์ชัน
+- observe / incr / info : ใส่ค่าเอง (เช่น เวลาต่อหน้า, จำนวนแถว)
+- แต่ละ stage เก็บ count/total/min/max + histogram (ms) สำหรับดู latency ต่อหน้า
+- ปิดอยู่ (ค่าเริ่มต้น): timed คืนฟังก์ชันเดิม, stage คืน nullcontext ตัวเดียว -> แทบไม่มี overhead
+- start(run) ลงทะเบียนเขียนไฟล์ {METRICS_DIR}/{run}-{เวลา}.json ตอนจบโปรเซส (รวมตอน error)
+"""
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+METRICS_ENABLED = os.getenv("METRICS", "false") == "true"
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+
+# ขอบบนของแต่ละช่อง histogram (ms); ช่องสุดท้าย = เกินค่าสุดท้าย
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_stages: Dict[str, "_Stage"] = {}
+_counters: Dict[str, float] = {}
+_info: Dict[str, Any] = {}
+_run: Dict[str, Any] = {}
+
+
+class _Stage:
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, sec: float) -> None:
+        self.count += 1
+        self.total += sec
+        self.min = min(self.min, sec)
+        self.max = max(self.max, sec)
+        ms = sec * 1000
+        for i, edge in enumerate(BUCKETS_MS):
+            if ms <= edge:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """ประมาณจาก histogram: ขอบบนของช่องที่สะสมถึง q (วินาที)"""
+        need, acc = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            acc += n
+            if acc >= need and n:
+                return min(BUCKETS_MS[i] / 1000, self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 4),
+            "mean_s": round(self.total / self.count, 4) if self.count else 0.0,
+            "min_s": round(self.min, 4) if self.count else 0.0,
+            "max_s": round(self.max, 4),
+            "p50_s": round(self.quantile(0.50), 4),
+            "p95_s": round(self.quantile(0.95), 4),
+            "histogram_ms": {(f"<={e}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): n
+                             for i, (e, n) in enumerate(zip(BUCKETS_MS + (None,), self.buckets)) if n},
+        }
+
+
+def observe(name: str, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        st = _stages.get(name)
+        if st is None:
+            st = _stages[name] = _Stage()
+        st.add(seconds)
+
+
+def incr(name: str, n: float = 1) -> None:
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def info(key: str, value: Any) -> None:
+    if METRICS_ENABLED:
+        _info[key] = value
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        observe(self.name, time.perf_counter() - self.t0)
+
+
+def stage(name: str):
+    return _Timer(name) if METRICS_ENABLED else _NULL
+
+
+def timed(name: str) -> Callable:
+    def deco(fn: Callable) -> Callable:
+        if not METRICS_ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - t0)
+        return wrapper
+    return deco
+
+
+def snapshot() -> dict:
+    with _lock:
+        stages = {k: v.to_dict() for k, v in sorted(_stages.items())}
+        counters = dict(_counters)
+    out = {"stages": stages, "counters": counters, "info": dict(_info)}
+    if _run:
+        out = {"run": _run["name"], "started": _run["started"],
+               "wall_s": round(time.perf_counter() - _run["t0"], 3), **out}
+    return out
+
+
+def dump(path: Optional[str] = None) -> Optional[str]:
+    if not METRICS_ENABLED:
+        return None
+    if path is None:
+        name = _run.get("name", "run")
+        path = os.path.join(METRICS_DIR, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=2)
+    print(f"📊 บันทึก metrics -> {path}")
+    return path
+
+
+def start(run: str) -> None:
+    """เริ่มนับเวลาของรอบ และเขียนไฟล์ metrics ตอนโปรเซสจบ"""
+    if not METRICS_ENABLED or _run:
+        return
+    _run.update(name=run, started=datetime.now().strftime("%Y-%m-%d %H:%M:%S"), t0=time.perf_counter())
+    atexit.register(dump)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+ดึงข้อมูลตาราง MUI ทั้งหน้าด้วย execute_script ครั้งเดียว
+- เดิมอ่านทีละ cell (find_elements + .text) = 1 round trip ต่อ cell
+- ตอนนี้ได้ทั้ง tbody กลับมาเป็น list[list[str]] ในคำสั่งเดียว
+"""
+import re
+import time
+from typing import List, Optional
+
+import metrics
+
+TABLE_ROWS_CSS = ".MuiTable-root tbody tr"
+
+# innerText ใกล้เคียงกับ WebElement.text (ข้อความที่มองเห็นจริง)
+_JS_EXTRACT_ROWS = """
+var rows = document.querySelectorAll(arguments[0]);
+var out = [];
+for (var i = 0; i < rows.length; i++) {
+    var tds = rows[i].querySelectorAll('td');
+    var cols = [];
+    for (var j = 0; j < tds.length; j++) {
+        cols.push(tds[j].innerText || '');
+    }
+    out.push(cols);
+}
+return out;
+"""
+
+
+@metrics.timed("extract_rows")
+def extract_rows(driver, css: str = TABLE_ROWS_CSS, label: Optional[str] = None) -> List[List[str]]:
+    """
+    คืนค่าทุกแถวของตารางเป็น list ของ list[str] (strip แล้ว)
+    - ไม่กรองแถว: ให้ scraper แต่ละตัวกรองตามกติกาเดิมของตัวเอง
+    - ถ้าใส่ label จะพิมพ์ความเร็ว rows/sec ของหน้านั้น
+    """
+    t0 = time.perf_counter()
+    raw = driver.execute_script(_JS_EXTRACT_ROWS, css) or []
+    rows = [[(c or "").strip() for c in r] for r in raw]
+    if label is not None:
+        dt = time.perf_counter() - t0
+        rate = len(rows) / dt if dt > 0 else float("inf")
+        print(f"⚡ {label}: ดึง {len(rows)} แถว ใน {dt:.3f}s ({rate:,.0f} rows/s)")
+    return rows
+
+
+_JS_FIRST_ROW_TEXT = """
+var tr = document.querySelector(arguments[0]);
+return tr ? tr.innerText : '';
+"""
+
+
+def first_row_text(driver, css: str = TABLE_ROWS_CSS) -> str:
+    """ข้อความของแถวแรก ใช้เป็นลายเซ็นว่าตารางเปลี่ยนหน้าแล้วหรือยัง"""
+    return driver.execute_script(_JS_FIRST_ROW_TEXT, css) or ""
+
+
+_JS_PAGINATION_TEXT = """
+var el = document.querySelector('.MuiTablePagination-root');
+return el ? el.innerText : '';
+"""
+
+
+def pagination_total(driver) -> int:
+    """จำนวนแถวทั้งหมดจากข้อความ pagination เช่น '1-200 of 5,432' (ไม่พบ -> 0)"""
+    m = re.search(r"(?:of|จาก)\s*([\d,]+)", driver.execute_script(_JS_PAGINATION_TEXT) or "")
+    return int(m.group(1).replace(",", "")) if m else 0
+
+
+def table_total(driver, css: str = TABLE_ROWS_CSS) -> int:
+    """จำนวนแถวทั้งหมดของตาราง: ตาม pagination ถ้ามี ไม่งั้นเท่ากับแถวที่แสดงอยู่"""
+    return pagination_total(driver) or int(
+        driver.execute_script("return document.querySelectorAll(arguments[0]).length;", css) or 0
+    )
+
+
+def wait_table_changed(driver, before: str, timeout: float = 15.0, poll: float = 0.1,
+                       css: str = TABLE_ROWS_CSS) -> bool:
+    """รอจนแถวแรกไม่ใช่ข้อความเดิม (หน้าใหม่ render แล้ว); คืน False ถ้าหมดเวลา"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        now = first_row_text(driver, css)
+        if now and now != before:
+            return True
+        time.sleep(poll)
+    return False
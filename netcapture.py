@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+ดักข้อมูล JSON (XHR) ที่หน้าเว็บใช้เติมตาราง ผ่าน Chrome performance log
+- เปิด log ด้วย enable_network_capture(opt) ก่อนสร้าง driver
+- drain_json_responses() ดึง body ของ response ที่เป็น JSON ผ่าน CDP
+- find_records() หา list ของ record ที่ใหญ่ที่สุดใน payload (ไม่ผูกกับโครงสร้าง API)
+- records_from_payloads(..., expected) เทียบกับจำนวนแถวของตาราง: API ที่แบ่งหน้าฝั่ง server
+  ส่งมาแค่หน้าแรก -> ไม่ครบ ให้ผู้เรียกกลับไปไล่หน้าแทน
+"""
+import json
+from typing import Any, Iterable, List, Optional, Tuple
+
+
+def enable_network_capture(opt) -> None:
+    """ให้ chromedriver เก็บ Network.* events ไว้ใน performance log"""
+    opt.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def _iter_json_responses(entries: Iterable[dict], url_part: str):
+    for entry in entries:
+        try:
+            msg = json.loads(entry["message"])["message"]
+        except Exception:
+            continue
+        if msg.get("method") != "Network.responseReceived":
+            continue
+        params = msg.get("params", {})
+        resp = params.get("response", {})
+        if "json" not in (resp.get("mimeType") or ""):
+            continue
+        url = resp.get("url", "")
+        if url_part and url_part not in url:
+            continue
+        yield params.get("requestId"), url
+
+
+def drain_json_responses(driver, url_part: str = "") -> List[Tuple[str, Any]]:
+    """
+    คืน [(url, payload)] ของ response JSON ที่เกิดขึ้นตั้งแต่เรียกครั้งก่อน
+    (get_log จะล้าง buffer ทุกครั้ง จึงเรียกซ้ำหลังคลิกแท็บเพื่อเอาเฉพาะของใหม่ได้)
+    """
+    out: List[Tuple[str, Any]] = []
+    for request_id, url in _iter_json_responses(driver.get_log("performance"), url_part):
+        try:
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+            out.append((url, json.loads(body.get("body") or "null")))
+        except Exception as e:
+            print(f"ℹ️ อ่าน response ไม่ได้ ({url}): {e}")
+    return out
+
+
+def find_records(payload: Any) -> List[dict]:
+    """หา list ของ dict ที่ยาวที่สุดใน payload (ค้นแบบ recursive)"""
+    best: List[dict] = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            if node and all(isinstance(x, dict) for x in node) and len(node) > len(best):
+                best = node
+            stack.extend(node)
+    return best
+
+
+def dig(record: Any, path: str, default: Any = None) -> Any:
+    """อ่านค่าแบบ dotted path เช่น 'station.tele_station_name.th'"""
+    cur = record
+    for key in path.split("."):
+        if not isinstance(cur, dict) or key not in cur:
+            return default
+        cur = cur[key]
+    return default if cur is None else cur
+
+
+def fmt_num(value: Any) -> str:
+    """จัดรูปตัวเลขให้เหมือนที่ตารางแสดง: 1,454.36 / 265 / 3.3"""
+    if value in (None, ""):
+        return ""
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    return f"{v:,.2f}".rstrip("0").rstrip(".")
+
+
+def fmt_with_percent(value: Any, percent: Any) -> str:
+    """เช่น '1,248.49 (86%)' ตามรูปแบบคอลัมน์ Water_Stored เดิม"""
+    text = fmt_num(value)
+    if not text:
+        return ""
+    try:
+        return f"{text} ({round(float(percent))}%)"
+    except (TypeError, ValueError):
+        return text
+
+
+def records_from_payloads(payloads: List[Tuple[str, Any]], expected: int = 0) -> Optional[List[dict]]:
+    """
+    เลือก record ชุดที่ใหญ่ที่สุดจากทุก response ที่ดักได้
+    expected: จำนวนแถวทั้งหมดของตาราง ('x-y of N'); ได้ไม่เท่ากัน -> None
+    """
+    best: List[dict] = []
+    for url, payload in payloads:
+        recs = find_records(payload)
+        if len(recs) > len(best):
+            best = recs
+            print(f"📡 พบข้อมูล {len(recs)} records จาก {url}")
+    if best and expected and len(best) != expected:
+        print(f"⚠️ JSON มี {len(best):,} records แต่ตารางมีทั้งหมด {expected:,} แถว (แบ่งหน้าฝั่ง server?) -> ไม่ใช้ JSON")
+        return None
+    return best or None
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+รัน scraper ทั้งหมด (ฝน / ระดับน้ำ / เขื่อน) ในโปรเซสเดียวพร้อมกัน แทนการเปิด 3 workflow แยก
+- เรียก scraper แต่ละตัวเป็นฟังก์ชัน (scrap1.scrape_rain, scrap2.main, scrap3.run_tab, scrap4.run_merge_only)
+- ทุกขั้นรันบน thread pool เดียว; ขั้นที่ขึ้นกับขั้นอื่น (รวมไฟล์เขื่อน, ซิงก์ Drive) เริ่มทันทีที่ input พร้อม
+  ขั้นก่อนหน้าล้มเหลว -> ขั้นที่ขึ้นกับมันถูกข้าม แต่งานสายอื่นยังรันต่อ
+- Chrome ทุกตัวใช้โควตาร่วมกัน (browser.limit_browsers) ไม่ให้เปิดพร้อมกันเกิน MAX_BROWSERS
+- จบแล้วสรุปเวลา/สถานะทุกขั้น exit code 1 ถ้ามีขั้นใดล้มเหลว
+
+ใช้งาน: JOBS=rain,waterlevel,dam python orchestrate.py
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+import metrics
+from browser import MAX_BROWSERS, limit_browsers
+
+# ================================== CONFIG ================================== #
+JOBS = [j.strip() for j in os.getenv("JOBS", "rain,waterlevel,dam").split(",") if j.strip()]
+# Chrome ที่เปิดพร้อมกันได้ทั้งโปรเซส (MAX_BROWSERS ของ browser.py ถ้าตั้งไว้)
+BROWSERS = MAX_BROWSERS or int(os.getenv("ORCH_BROWSERS", "6"))
+ORCH_WORKERS = int(os.getenv("ORCH_WORKERS", "8"))
+# ดึงแท็บเขื่อนซ้ำเมื่อล้มเหลว (เดิม workflow ลอง scrap3.py 3 รอบ); checkpoint ทำให้ต่อจากหน้าที่ค้าง
+DAM_RETRIES = int(os.getenv("DAM_RETRIES", "2"))
+RETRY_SLEEP = float(os.getenv("RETRY_SLEEP", "20"))
+
+# แต่ละ scraper ใช้ CSV_OUT / DRIVE_FILE_ID ชื่อเดียวกัน -> แยกชื่อ env ตอนรันรวม
+RAIN_CSV_OUT = os.getenv("RAIN_CSV_OUT", "tmd_7day_forecast_today.csv")
+RAIN_DRIVE_FILE_ID = os.getenv("RAIN_DRIVE_FILE_ID", "")
+WATERLEVEL_CSV_OUT = os.getenv("WATERLEVEL_CSV_OUT", "waterlevel_report.csv")
+WATERLEVEL_DRIVE_FILE_ID = os.getenv("WATERLEVEL_DRIVE_FILE_ID", "")
+WATERLEVEL_DRIVE_FOLDER_ID = os.getenv("WATERLEVEL_DRIVE_FOLDER_ID", "")
+ENABLE_GOOGLE_DRIVE_UPLOAD = os.getenv("ENABLE_GOOGLE_DRIVE_UPLOAD", "false") == "true"
+SERVICE_ACCOUNT_JSON = os.getenv("SERVICE_ACCOUNT_JSON")
+
+
+# ================================== STAGES ================================== #
+class Stage:
+    """งานหนึ่งขั้น: fn รับผลของขั้นที่เสร็จแล้ว (dict ชื่อขั้น -> ค่าที่คืน)"""
+
+    def __init__(self, fn: Callable[[Dict[str, Any]], Any], deps: Tuple[str, ...] = (), retries: int = 0):
+        self.fn = fn
+        self.deps = deps
+        self.retries = retries
+
+
+def _rows(value: Any) -> Any:
+    """จำนวนแถวจากค่าที่แต่ละขั้นคืนมา (DataFrame / (rows, path) / int)"""
+    if hasattr(value, "__len__") and hasattr(value, "columns"):
+        return len(value)
+    if isinstance(value, tuple):
+        return value[0]
+    return value if isinstance(value, int) else None
+
+
+def build_stages(jobs) -> Dict[str, Stage]:
+    """import scraper เฉพาะงานที่เลือก (ก่อนเริ่ม thread) แล้วประกอบเป็นขั้นตอน"""
+    stages: Dict[str, Stage] = {}
+    if "rain" in jobs:
+        import scrap1
+        scrap1.CSV_OUT = RAIN_CSV_OUT
+        scrap1.DRIVE_FILE_ID = RAIN_DRIVE_FILE_ID or scrap1.DRIVE_FILE_ID
+        stages["rain"] = Stage(lambda out: scrap1.scrape_rain())
+        if ENABLE_GOOGLE_DRIVE_UPLOAD:
+            stages["rain_drive"] = Stage(lambda out: scrap1.drive_merge_update(out["rain"]), deps=("rain",))
+
+    if "waterlevel" in jobs:
+        import scrap2
+        scrap2.CSV_OUT = WATERLEVEL_CSV_OUT
+        stages["waterlevel"] = Stage(lambda out: scrap2.main())
+        if ENABLE_GOOGLE_DRIVE_UPLOAD and SERVICE_ACCOUNT_JSON:
+            import waterlevel_drive
+
+            def sync_waterlevel(out):
+                if not os.path.exists(WATERLEVEL_CSV_OUT):
+                    print(f"ℹ️ ไม่มี {WATERLEVEL_CSV_OUT} -> ข้ามการซิงก์ Drive")
+                    return 0
+                return waterlevel_drive.upload_waterlevel(
+                    WATERLEVEL_CSV_OUT, json.loads(SERVICE_ACCOUNT_JSON),
+                    file_id=WATERLEVEL_DRIVE_FILE_ID or None, folder_id=WATERLEVEL_DRIVE_FOLDER_ID or None,
+                )
+            stages["waterlevel_drive"] = Stage(sync_waterlevel, deps=("waterlevel",))
+
+    if "dam" in jobs:
+        import scrap3
+        for dam_type in scrap3.TABS:
+            stages[f"dam_{dam_type}"] = Stage(lambda out, t=dam_type: scrap3.run_tab(t), retries=DAM_RETRIES)
+
+        def merge_dam(out):
+            # import ตอนนี้: scrap4 หาไฟล์อินพุตตอน import ซึ่งต้องหลังจาก scrap3 เขียนไฟล์แล้ว
+            import scrap4
+            return scrap4.run_merge_only()
+        stages["dam_merge"] = Stage(merge_dam, deps=tuple(f"dam_{t}" for t in scrap3.TABS))
+    return stages
+
+
+def _run_stage(name: str, stage: Stage, out: Dict[str, Any]) -> dict:
+    t0 = time.perf_counter()
+    for attempt in range(stage.retries + 1):
+        try:
+            value = stage.fn(out)
+            out[name] = value
+            return {"status": "ok", "seconds": time.perf_counter() - t0, "rows": _rows(value)}
+        except BaseException as e:  # scrap4 ใช้ sys.exit เมื่อไม่มีไฟล์อินพุต
+            if isinstance(e, KeyboardInterrupt):
+                raise
+            err = repr(e)
+            if attempt < stage.retries:
+                print(f"↻ {name} ล้มเหลว ({err}) -> ลองใหม่ครั้งที่ {attempt + 2} ใน {RETRY_SLEEP:.0f}s")
+                time.sleep(RETRY_SLEEP)
+    print(f"✖ {name} ล้มเหลว: {err}")
+    return {"status": "failed", "seconds": time.perf_counter() - t0, "error": err}
+
+
+def run_stages(stages: Dict[str, Stage], workers: int = ORCH_WORKERS) -> Dict[str, dict]:
+    """รันทุกขั้นตามลำดับการขึ้นต่อกัน; ขั้นที่อิสระต่อกันรันพร้อมกัน"""
+    report: Dict[str, dict] = {}
+    out: Dict[str, Any] = {}
+    pending = dict(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        while pending or running:
+            changed = True
+            while changed:  # ข้ามต่อเป็นทอด ๆ เมื่อขั้นก่อนหน้าไม่สำเร็จ
+                changed = False
+                for name, stage in list(pending.items()):
+                    states = [report.get(d, {}).get("status") for d in stage.deps]
+                    if any(s in ("failed", "skipped") or d not in stages for s, d in zip(states, stage.deps)):
+                        report[name] = {"status": "skipped", "seconds": 0.0}
+                        print(f"⏭️ ข้าม {name} (ขั้นก่อนหน้าไม่สำเร็จ)")
+                        del pending[name]
+                        changed = True
+                    elif all(s == "ok" for s in states):
+                        print(f"▶️ เริ่ม {name}")
+                        running[ex.submit(_run_stage, name, stage, out)] = name
+                        del pending[name]
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                report[name] = fut.result()
+                metrics.observe(f"stage.{name}", report[name]["seconds"])
+    return report
+
+
+# ================================== MAIN ================================== #
+def main() -> int:
+    t0 = time.time()
+    metrics.start("orchestrate")
+    stages = build_stages(JOBS)
+    # scrap2 แบบแบ่ง shard ถือ driver ตัวแรกไว้ระหว่างรอ shard อื่น -> โควตาต้องพอสำหรับทุก shard
+    browsers = max(BROWSERS, int(os.getenv("PAGE_SHARDS", "1")) if "waterlevel" in JOBS else 1)
+    limit_browsers(browsers)
+    print(f"🚦 รัน {', '.join(stages)} (Chrome พร้อมกันสูงสุด {browsers}, thread {ORCH_WORKERS})")
+    report = run_stages(stages)
+    metrics.info("stages", report)
+
+    elapsed = time.time() - t0
+    failed = [n for n, r in report.items() if r["status"] != "ok"]
+    when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"\n{'รันสำเร็จ' if not failed else 'รันเสร็จแต่มีข้อผิดพลาด'} {when}")
+    for name in stages:
+        r = report[name]
+        icon = {"ok": "✔", "failed": "✖", "skipped": "⏭️"}[r["status"]]
+        rows = f" ({r['rows']} แถว)" if r.get("rows") is not None else ""
+        print(f"- {name:<17} {icon} {r['seconds']:8.2f} วินาที{rows}")
+    print(f"- ใช้เวลารวม: {elapsed:.2f} วินาที (ผลรวมทุกขั้น {sum(r['seconds'] for r in report.values()):.2f})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+ควบคุมจังหวะการยิงเว็บแทน time.sleep แบบตายตัว
+- Pacer: token bucket ที่ปรับอัตราแบบ AIMD (เว็บปกติ -> เร่งขึ้นทีละนิด, timeout -> ลดครึ่ง)
+- backoff_delay / retry: exponential backoff + jitter สำหรับการลองใหม่
+- wait_until: รอจนเงื่อนไขเป็นจริง (poll ถี่ ๆ) แทนการ sleep เผื่อเวลา
+"""
+import os
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple, Type
+
+PACE_RATE = float(os.getenv("PACE_RATE", "2.0"))          # action/วินาที เริ่มต้น
+PACE_MIN_RATE = float(os.getenv("PACE_MIN_RATE", "0.2"))
+PACE_MAX_RATE = float(os.getenv("PACE_MAX_RATE", "10.0"))
+
+
+class Pacer:
+    """Token bucket ที่ thread-safe ใช้ร่วมกันได้หลาย worker ที่ยิงเว็บเดียวกัน"""
+
+    def __init__(self, rate: float = PACE_RATE, min_rate: float = PACE_MIN_RATE,
+                 max_rate: float = PACE_MAX_RATE, step: float = 0.25, burst: float = 1.0):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """รอจนได้ token 1 ใบ; คืนเวลาที่รอ (วินาที)"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                need = (1.0 - self._tokens) / self.rate
+            time.sleep(need)
+            waited += need
+
+    def success(self) -> None:
+        """additive increase"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def failure(self) -> None:
+        """multiplicative decrease"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            print(f"🐢 ลดความเร็วเหลือ {self.rate:.2f} ครั้ง/วินาที")
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """exponential backoff แบบ full jitter: สุ่มใน [0, min(cap, base * 2^(attempt-1))]"""
+    return random.uniform(0, min(cap, base * (2 ** max(0, attempt - 1))))
+
+
+def retry(fn: Callable, tries: int = 3, base: float = 1.0, cap: float = 30.0,
+          exceptions: Tuple[Type[BaseException], ...] = (Exception,), label: str = ""):
+    """เรียก fn() ซ้ำสูงสุด tries ครั้ง พร้อม backoff ระหว่างครั้ง"""
+    last_err: Optional[BaseException] = None
+    for i in range(1, tries + 1):
+        try:
+            return fn()
+        except exceptions as e:
+            last_err = e
+            if i == tries:
+                break
+            delay = backoff_delay(i, base, cap)
+            print(f"⚠️ {label or getattr(fn, '__name__', 'call')} attempt {i}/{tries} failed: {repr(e)} (รอ {delay:.1f}s)")
+            time.sleep(delay)
+    raise last_err
+
+
+def wait_until(cond: Callable[[], object], timeout: float = 10.0, poll: float = 0.1):
+    """poll cond() จนคืนค่า truthy; คืนค่านั้น หรือ None ถ้าหมดเวลา"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            value = cond()
+            if value:
+                return value
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(poll)
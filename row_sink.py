@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+เขียนแถวลงไฟล์ทีละหน้า (stream) แทนการเก็บทั้งหมดไว้ใน list แล้วค่อยสร้าง DataFrame
+- เติมช่องว่างทีละแถวให้ครบจำนวนคอลัมน์ และแปลงค่าทีละคอลัมน์ (เช่น extract_thai)
+- mode="w": เขียนลง {path}.part แล้ว rename ตอนปิดสำเร็จ (ไฟล์เดิมไม่หายถ้า crash)
+- mode="a": ต่อท้ายไฟล์เดิม ใช้จำนวนคอลัมน์ตาม header ของไฟล์ (truncate(offset) ตัดแถวที่ต่อท้ายไปแล้วทิ้งได้)
+  (strict=True: แถวที่จำนวนคอลัมน์ไม่ตรง header เดิมจะถูกข้าม แทนการตัด/เติม)
+- schema=...: ตรวจแต่ละชุดกับสคีมา (schemas.py) แถวที่ไม่ผ่านไปอยู่ใน quarantine/{dataset}.csv
+  แถวที่ผ่านเขียนตามปกติ (ตรวจเฉพาะคอลัมน์ของสคีมา แถวสั้น/ยาวยังเติมช่องและเพิ่ม Extra_n เหมือนไม่มีสคีมา)
+- fmt="parquet": 1 หน้า = 1 row group (ต้องมี pyarrow)
+"""
+import csv
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+import metrics
+from schemas import Quarantine, Schema, admit
+
+SINK_FORMAT = os.getenv("SINK_FORMAT", "csv")  # csv | parquet
+
+
+def read_header(path: str) -> Optional[List[str]]:
+    """อ่าน header ของ CSV เดิม (None ถ้าไม่มีไฟล์/ไฟล์ว่าง)"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f), None)
+
+
+class RowSink:
+    def __init__(self, path: str, headers: Optional[List[str]] = None, mode: str = "w",
+                 fmt: str = SINK_FORMAT, transforms: Optional[Dict[str, Callable[[str], str]]] = None,
+                 extra_prefix: str = "Extra_", strict: bool = False, schema: Optional[Schema] = None):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"ไม่รองรับรูปแบบไฟล์: {fmt}")
+        if fmt == "parquet" and mode == "a":
+            raise ValueError("parquet ต่อท้ายไฟล์เดิมไม่ได้ ใช้ mode='w'")
+        if fmt == "parquet" and path.lower().endswith(".csv"):
+            raise ValueError(f"{path}: ชื่อไฟล์เป็น .csv แต่ fmt='parquet' (ผู้อ่านจะเปิดเป็น CSV ไม่ได้)")
+        self.path = path
+        self.mode = mode
+        self.fmt = fmt
+        self.transforms = transforms or {}
+        self.extra_prefix = extra_prefix
+        self.strict = strict
+        self.schema = schema
+        self.quarantine = Quarantine(schema.dataset) if schema is not None else None
+        self.rejected = 0
+        self.rows = 0
+        self.widened = False
+        self.truncated = 0
+
+        existing = read_header(path) if mode == "a" else None
+        self.has_header_on_disk = existing is not None
+        if headers is None and schema is not None:
+            headers = schema.names
+        self.headers: Optional[List[str]] = existing or (list(headers) if headers else None)
+        if schema is not None and existing is not None and schema.canonical(existing) != schema.names:
+            print(f"⚠️ {path}: header เดิม ({len(existing)} คอลัมน์) ไม่ตรงสคีมา {schema.dataset} -> เขียนตาม header เดิม")
+        self._declared = len(self.headers or [])
+
+        out_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(out_dir, exist_ok=True)
+        self._target = path if mode == "a" else f"{path}.part"
+        self._fh = None
+        self._writer = None
+
+    # ------------------------------------------------------------------ helpers
+    def _ensure_headers(self, width: int) -> None:
+        if self.headers is None:
+            # แบบเดียวกับ pd.DataFrame(list) -> ชื่อคอลัมน์ 0..n-1
+            self.headers = [str(i) for i in range(width)]
+            self._declared = 0
+        elif width > len(self.headers):
+            if self.has_header_on_disk or self.fmt == "parquet":
+                self.truncated += 1  # โครงสร้างไฟล์ตายตัว -> ตัดส่วนเกินใน _shape
+                return
+            # แบบเดียวกับ save_csv เดิม: header ที่ประกาศไว้ + Extra_1..n
+            start = len(self.headers) - self._declared + 1
+            self.headers += [f"{self.extra_prefix}{i}" for i in range(start, width - self._declared + 1)]
+            self.widened = self._writer is not None
+
+    def _shape(self, row: List[str]) -> List[str]:
+        width = len(self.headers)
+        row = list(row[:width]) + [""] * (width - len(row))
+        for i, col in enumerate(self.headers):
+            fn = self.transforms.get(col)
+            if fn is not None:
+                row[i] = fn(row[i])
+        return row
+
+    def _open(self) -> None:
+        if self.fmt == "csv":
+            fresh = self.mode == "w" or not self.has_header_on_disk
+            enc = "utf-8-sig" if fresh else "utf-8"
+            self._fh = open(self._target, "w" if self.mode == "w" else "a", encoding=enc, newline="")
+            self._writer = csv.writer(self._fh, lineterminator=os.linesep)
+            if fresh:
+                self._writer.writerow(self.headers)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._schema = pa.schema([(h, pa.string()) for h in self.headers])
+            self._writer = pq.ParquetWriter(self._target, self._schema)
+
+    # ------------------------------------------------------------------ API
+    def admit(self, rows: Iterable[List[str]]) -> List[List[str]]:
+        """แถวที่ผ่านสคีมา (ไม่มีสคีมา = ทุกแถว); ที่ไม่ผ่านเขียนลง quarantine"""
+        if self.schema is None:
+            return list(rows)
+        return admit(rows, self.schema, self.quarantine, self.path)
+
+    @metrics.timed("csv_write")
+    def write_rows(self, rows: Iterable[List[str]], checked: bool = False) -> int:
+        """เขียนหนึ่งชุด (ปกติคือหนึ่งหน้า) แล้ว flush ทันที; checked=True = ผ่าน admit มาแล้ว"""
+        rows = list(rows) if checked else self.admit(rows)
+        if self.strict and self.has_header_on_disk:
+            width = len(self.headers)
+            kept = [r for r in rows if len(r) == width]
+            self.rejected += len(rows) - len(kept)
+            rows = kept
+        if not rows:
+            return 0
+        self._ensure_headers(max(len(r) for r in rows))
+        if self._writer is None:
+            self._open()
+        shaped = [self._shape(r) for r in rows]
+        if self.fmt == "csv":
+            self._writer.writerows(shaped)
+            self._fh.flush()
+        else:
+            import pyarrow as pa
+            cols = list(zip(*shaped))
+            self._writer.write_table(pa.Table.from_arrays([pa.array(c, pa.string()) for c in cols], schema=self._schema))
+        self.rows += len(shaped)
+        metrics.incr("rows_written", len(shaped))
+        return len(shaped)
+
+    def truncate(self, offset: int) -> None:
+        """ตัดไฟล์ (mode="a") กลับไปที่ขนาด offset byte เช่น ทิ้งแถวของ checkpoint ที่ใช้ต่อไม่ได้"""
+        if self.mode != "a" or self.fmt != "csv":
+            raise ValueError("truncate ใช้ได้กับ CSV mode='a' เท่านั้น")
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = self._writer = None
+        if os.path.exists(self.path) and os.path.getsize(self.path) > offset:
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+            print(f"✂️ {self.path}: ตัดกลับไปที่ {offset:,} byte")
+        self.has_header_on_disk = read_header(self.path) is not None
+
+    def close(self, ok: bool = True) -> None:
+        if self.quarantine is not None and self.quarantine.rows:
+            print(f"⚠️ {self.path}: กัก {self.quarantine.rows} แถวที่ไม่ตรงสคีมาไว้ที่ {self.quarantine.path}")
+        if self.rejected:
+            print(f"⚠️ {self.path}: ข้าม {self.rejected} แถวที่จำนวนคอลัมน์ไม่ตรงกับไฟล์เดิม")
+        if self.truncated:
+            print(f"⚠️ {self.path}: มี {self.truncated} หน้าที่แถวยาวเกินโครงสร้างไฟล์ (ตัดคอลัมน์ส่วนเกิน)")
+        if self._writer is not None:
+            if self.fmt == "csv":
+                self._fh.close()
+            else:
+                self._writer.close()
+        if self.mode == "a":
+            return
+        if not ok:
+            if self._writer is not None:
+                print(f"⚠️ เก็บไฟล์ที่เขียนค้างไว้ที่ {self._target}")
+            return
+        if self.rows == 0:
+            return
+        if self.widened:
+            self._rewrite_header()
+        os.replace(self._target, self.path)
+
+    def _rewrite_header(self) -> None:
+        """มีแถวที่ยาวกว่า header ตอนเริ่ม -> เขียน header ใหม่และเติมช่องให้ครบทุกแถว (ไม่ค่อยเกิด)"""
+        tmp = f"{self._target}.tmp"
+        width = len(self.headers)
+        with open(self._target, encoding="utf-8-sig", newline="") as src, \
+                open(tmp, "w", encoding="utf-8-sig", newline="") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator=os.linesep)
+            next(reader, None)
+            writer.writerow(self.headers)
+            for row in reader:
+                writer.writerow(row + [""] * (width - len(row)))
+        os.replace(tmp, self._target)
+
+    def __enter__(self) -> "RowSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(ok=exc_type is None)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+สคีมากลางของแต่ละ dataset: ชื่อคอลัมน์, ชื่อไทย (alias), ชนิดข้อมูล, natural key
+- ใช้แทนรายชื่อคอลัมน์ที่เคยเขียนซ้ำหลายไฟล์ (HEADERS ของ scrap2, CANON/TH2EN, DAM_COLUMNS, KEYS)
+- validate(rows): ตรวจทั้งชุดแบบ vectorized (ชนิดของค่าที่ไม่ซ้ำในแต่ละคอลัมน์ของสคีมา)
+  คืน mask แถวที่ผ่าน และเหตุผลของแถวที่ไม่ผ่าน
+  จำนวนคอลัมน์ไม่ใช่เหตุผลให้ตัดแถว: แถวสั้นเติม "" (คอลัมน์ required ที่ขาดจึงไม่ผ่าน),
+  แถวยาวตรวจเฉพาะคอลัมน์ที่รู้จัก ส่วนเกินให้ผู้เขียนจัดการ (RowSink -> Extra_n)
+- admit(...): แถวที่ไม่ผ่านเขียนลง {QUARANTINE_DIR}/{dataset}.csv ส่วนแถวที่ผ่านไปบันทึกตามปกติ
+  (แถวเสียแถวเดียวไม่ทำให้ทั้งหน้า/ทั้งแท็บหาย)
+"""
+import csv
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from measurements import NULL_TOKENS
+
+QUARANTINE_DIR = os.getenv("QUARANTINE_DIR", "quarantine")
+
+_NUMBER = r"[-+]?[\d,]*\.?\d+"
+# รูปแบบของค่าที่ไม่ว่าง (ตรวจหลัง strip แบบทั้งค่า)
+PATTERNS = {
+    "number": rf"{_NUMBER}\s*%?",                                   # 1,454.36 / 56.7%
+    "value_pct": rf"{_NUMBER}(?:\s*\(\s*{_NUMBER}\s*%\s*\))?",      # 1,248.49 (86%)
+    "time": r"(?:.*\s)?\d{1,2}[:.]\d{2}(?::\d{2})?(?:\s*น\.?)?",      # 14:00 / 14.00 น.
+}
+
+
+class Column:
+    """kind: text | number | value_pct | time | date (date ต้องใส่ formats)"""
+
+    __slots__ = ("name", "kind", "th", "required", "formats")
+
+    def __init__(self, name: str, kind: str = "text", th: Optional[str] = None, required: bool = False,
+                 formats: Sequence[str] = ()):
+        self.name = name
+        self.kind = kind
+        self.th = th
+        self.required = required
+        self.formats = tuple(formats)
+
+
+def _valid(s: pd.Series, col: Column) -> np.ndarray:
+    """mask ค่าที่ตรงชนิดของคอลัมน์; ตรวจเฉพาะค่าที่ไม่ซ้ำ (factorize) แล้วกระจายกลับ"""
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    u = pd.Series(uniques, dtype=object).astype(str).str.strip()
+    empty = u.isin(NULL_TOKENS)
+    if col.kind == "date":
+        ok = pd.Series(False, index=u.index)
+        for fmt in col.formats:
+            ok |= pd.to_datetime(u, format=fmt, errors="coerce").notna()
+    elif col.kind in PATTERNS:
+        ok = u.str.fullmatch(PATTERNS[col.kind])
+    else:
+        ok = pd.Series(True, index=u.index)
+    ok = (ok & ~empty) if col.required else (ok | empty)
+    # code -1 (None/NaN) -> ช่องสุดท้าย
+    return np.append(ok.to_numpy(dtype=bool), not col.required)[codes]
+
+
+class Schema:
+    def __init__(self, dataset: str, columns: Sequence[Column], keys: Sequence[str]):
+        self.dataset = dataset
+        self.columns = list(columns)
+        self.keys = list(keys)
+        self.names = [c.name for c in self.columns]
+        self.aliases = {c.th: c.name for c in self.columns if c.th}
+
+    def canonical(self, header: Sequence[str]) -> List[str]:
+        return [self.aliases.get(h, h) for h in header]
+
+    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """ชื่อไทย -> อังกฤษ, ตัดคอลัมน์นอกสคีมา, เติมคอลัมน์ที่ขาดเป็น "" แล้วเรียงตามสคีมา"""
+        df = df.rename(columns=self.aliases)
+        df = df[[c for c in df.columns if c in self.names]]
+        for c in self.names:
+            if c not in df.columns:
+                df[c] = ""
+        return df[self.names]
+
+    def check(self, df: pd.DataFrame) -> np.ndarray:
+        """เหตุผลต่อแถวของ DataFrame ที่มีคอลัมน์ตามสคีมา ("" = ผ่าน)"""
+        reasons = np.full(len(df), "", dtype=object)
+        for col in self.columns:
+            if col.name not in df.columns:
+                continue
+            bad = ~_valid(df[col.name], col)
+            if bad.any():
+                reasons[bad] = np.where(reasons[bad] == "", col.name, reasons[bad] + "," + col.name)
+        return reasons
+
+    def validate(self, rows: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray]:
+        """(mask แถวที่ผ่าน, เหตุผลของแต่ละแถว) สำหรับแถวดิบแบบ list ตามลำดับคอลัมน์"""
+        width = len(self.names)
+        df = pd.DataFrame([list(r[:width]) + [""] * (width - len(r)) for r in rows],
+                          columns=self.names, dtype=object)
+        reasons = self.check(df)
+        return reasons == "", reasons
+
+    def filter(self, rows: Sequence[Sequence[str]]) -> list:
+        """เฉพาะแถวที่ผ่าน (ไม่เขียน quarantine)"""
+        ok, _ = self.validate(rows)
+        return [r for r, k in zip(rows, ok) if k]
+
+
+SCHEMAS: Dict[str, Schema] = {s.dataset: s for s in (
+    Schema("rain", [
+        Column("Province", required=True),
+        Column("ForecastDate", "date", formats=("%Y-%m-%d",)),
+        Column("Weather"),
+        Column("RainChance", "number"),
+        Column("Rainfall_mm", "number"),
+        Column("DateTime", "date", required=True, formats=("%Y-%m-%d %H:%M:%S",)),
+    ], keys=["Province", "ForecastDate", "DateTime"]),
+    Schema("waterlevel", [
+        Column("Station", th="ชื่อสถานี", required=True),
+        Column("Location", th="ที่ตั้ง"),
+        Column("Time", "time", th="เวลา"),
+        Column("Water_Level", "number", th="ระดับน้ำ"),
+        Column("Bank_Level", "number", th="ระดับตลิ่ง"),
+        Column("Gauge_Zero", "number", th="ค่าศูนย์เสาระดับ"),
+        Column("Capacity_Percent", "number", th="%ความจุน้ำ"),
+        Column("Status", th="สถานการณ์"),
+        Column("Data_Time", "date", th="วันที่เก็บข้อมูล", required=True, formats=("%m/%d/%y",)),
+    ], keys=["Station", "Data_Time", "Time"]),
+    Schema("waterdam", [
+        Column("Dam", required=True),
+        Column("Location"),
+        Column("Capacity_Total", "number"),
+        Column("Capacity_Usable", "number"),
+        Column("Water_Stored", "value_pct"),
+        Column("Water_Usable", "value_pct"),
+        Column("Inflow", "number"),
+        Column("Outflow", "number"),
+        # scrap3 เขียน mm/dd/YYYY; ประวัติเก่าบางส่วนเป็น dd/mm/YYYY
+        Column("Data_Time", "date", required=True, formats=("%m/%d/%Y", "%d/%m/%Y")),
+        Column("Water_Type", required=True),
+    ], keys=["Dam", "Data_Time", "Water_Type"]),
+)}
+
+
+# ================================== QUARANTINE ================================== #
+_write_lock = threading.Lock()  # แท็บเขื่อน 2 แท็บเขียนไฟล์ quarantine เดียวกันพร้อมกันได้
+
+
+class Quarantine:
+    """ต่อท้าย {QUARANTINE_DIR}/{dataset}.csv: เวลา, ไฟล์ปลายทาง, เหตุผล, แถวดิบ (JSON)"""
+
+    HEADERS = ["Quarantined_At", "Target", "Reason", "Row"]
+
+    def __init__(self, dataset: str, directory: str = QUARANTINE_DIR):
+        self.path = os.path.join(directory, f"{dataset}.csv")
+        self.rows = 0
+
+    def write(self, rows: Sequence[Sequence[str]], reasons: Sequence[str], target: str) -> int:
+        if not len(rows):
+            return 0
+        when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with _write_lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fresh = not os.path.exists(self.path)
+            with open(self.path, "a", encoding="utf-8-sig" if fresh else "utf-8", newline="") as f:
+                writer = csv.writer(f, lineterminator=os.linesep)
+                if fresh:
+                    writer.writerow(self.HEADERS)
+                writer.writerows([when, target, reason, json.dumps(list(row), ensure_ascii=False, default=str)]
+                                 for row, reason in zip(rows, reasons))
+        self.rows += len(rows)
+        metrics.incr("rows_quarantined", len(rows))
+        return len(rows)
+
+
+def admit(rows: Sequence[Sequence[str]], schema: Schema, quarantine: Quarantine, target: str) -> list:
+    """คืนเฉพาะแถวที่ผ่านสคีมา; แถวที่ไม่ผ่านไปอยู่ใน quarantine"""
+    rows = list(rows)
+    if not rows:
+        return rows
+    ok, reasons = schema.validate(rows)
+    if ok.all():
+        return rows
+    bad = np.flatnonzero(~ok)
+    quarantine.write([rows[i] for i in bad], reasons[bad], target)
+    return [r for r, k in zip(rows, ok) if k]
+
+
+def admit_frame(df: pd.DataFrame, schema: Schema, quarantine: Quarantine, target: str) -> pd.DataFrame:
+    """แบบเดียวกับ admit สำหรับ DataFrame ที่มีคอลัมน์ตามสคีมาแล้ว"""
+    if df.empty:
+        return df
+    reasons = schema.check(df)
+    ok = reasons == ""
+    if not ok.all():
+        bad = df[~ok].astype(object)
+        quarantine.write(bad.where(bad.notna(), None).values.tolist(), reasons[~ok], target)
+    return df[ok]
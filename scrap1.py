@@ -2,16 +2,16 @@
 import os
 import time
 import json
-import random
-import requests
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
+from urllib.parse import quote
 
 import pandas as pd
 
 # ---- Selenium ----
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -20,15 +20,21 @@ from selenium.common.exceptions import TimeoutException, StaleElementReferenceEx
 # ---- Google Drive API ----
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
 
-from io import BytesIO, StringIO
+import http_cache
+import metrics
+from browser import log_page_stats, make_driver
+from drive_sync import sync_append
+from http_fetch import HTTP_WORKERS, get_json
+from netcapture import dig, find_records
+from pacing import Pacer, retry, wait_until
+from schemas import SCHEMAS, Quarantine, admit_frame
 
 
 # ============================================================
 # CONFIG
 # ============================================================
-HOME = "https://www.tmd.go.th"
+HOME = os.getenv("TMD_URL", "https://www.tmd.go.th")  # เปลี่ยนได้ เช่น ชี้ไปเว็บจำลองของ bench/
 
 CSV_OUT = os.getenv("CSV_OUT", "tmd_7day_forecast_today.csv")
 ENABLE_GOOGLE_DRIVE_UPLOAD = os.getenv("ENABLE_GOOGLE_DRIVE_UPLOAD", "false") == "true"
@@ -37,8 +43,17 @@ DRIVE_FILE_ID = os.getenv("DRIVE_FILE_ID")
 
 WAIT_LONG = 25
 WAIT_MED = 15
-SLEEP_MIN = 0.6
-SLEEP_MAX = 1.0
+
+# จังหวะการเปลี่ยนจังหวัด ใช้ร่วมกันทุก worker (เร่ง/ผ่อนตามการตอบสนองของเว็บ)
+PACER = Pacer()
+
+# จำนวน browser ที่ดึงจังหวัดพร้อมกัน (1 = ทีละจังหวัดแบบเดิม)
+RAIN_WORKERS = int(os.getenv("RAIN_WORKERS", "1"))
+PROVINCE_RETRIES = int(os.getenv("PROVINCE_RETRIES", "2"))
+
+# พยากรณ์ 7 วันจาก JSON API ของ TMD: template ที่มี {id} (value ของจังหวัด) และ/หรือ {name}
+# เช่น "/api/...?provinceId={id}" (ขึ้นต้นด้วย / = ต่อจาก HOME); ว่าง = ใช้ Selenium อย่างเดียว
+FORECAST_API = os.getenv("TMD_FORECAST_API", "")
 
 
 # ============================================================
@@ -64,17 +79,8 @@ def bypass_popup(driver):
 
 
 # ============================================================
-# Selenium driver
+# Selenium driver (สร้างจาก browser.make_driver preset "tmd")
 # ============================================================
-def make_driver():
-    opt = Options()
-    opt.add_argument("--headless=new")
-    opt.add_argument("--disable-gpu")
-    opt.add_argument("--no-sandbox")
-    opt.add_argument("--disable-dev-shm-usage")
-    opt.add_argument("--window-size=1920,1080")
-    return webdriver.Chrome(options=opt)
-
 def safe_get(driver, url):
     try:
         driver.get(url)
@@ -85,14 +91,25 @@ def safe_get(driver, url):
 # ============================================================
 # จังหวัด จาก API (แทน DOM เดิม)
 # ============================================================
-def collect_mapping() -> Dict[str, str]:
-    url = "https://www.tmd.go.th/api/province/select"
-    r = requests.get(url, timeout=10)
-    data = r.json()
-
+def _province_mapping(data) -> Dict[str, str]:
     mapping = {item["text"]: item["value"] for item in data if item.get("text")}
     if len(mapping) < 70:
         raise TimeoutException("โหลดจังหวัดไม่ครบจาก API")
+    return mapping
+
+
+def collect_mapping() -> Dict[str, str]:
+    url = f"{HOME}/api/province/select"
+
+    # รายชื่อจังหวัดแทบไม่เปลี่ยน -> cache บนดิสก์ (TTL 7 วัน + ETag/If-Modified-Since)
+    # ตรวจก่อนเก็บ: response ที่ไม่ครบไม่ถูก cache; ครั้งที่ลองใหม่ไม่อ่านจาก cache
+    attempt = [0]
+
+    def load():
+        attempt[0] += 1
+        return http_cache.get_json(url, validate=_province_mapping, refresh=attempt[0] > 1)
+
+    mapping = _province_mapping(retry(load, tries=3, label="province api"))
 
     print(f"✔ โหลดจังหวัด {len(mapping)} รายการ จาก API แล้ว")
     return mapping
@@ -109,62 +126,49 @@ def build_drive():
     )
     return build("drive", "v3", credentials=creds, cache_discovery=False)
 
-def drive_read_df(service):
-    req = service.files().get_media(fileId=DRIVE_FILE_ID)
-    data = req.execute()
-
-    text = data.decode("utf-8-sig")
-    return pd.read_csv(StringIO(text))
-
 def drive_merge_update(df_new: pd.DataFrame):
-    service = build_drive()
-
-    try:
-        df_old = drive_read_df(service)
-    except:
-        df_old = pd.DataFrame()
-
-    all_cols = list({*df_old.columns, *df_new.columns})
-    df_old = df_old.reindex(columns=all_cols)
-    df_new = df_new.reindex(columns=all_cols)
-
-    merged = pd.concat([df_old, df_new], ignore_index=True)
-    merged.drop_duplicates(subset=["Province", "DateTime"], keep="last", inplace=True)
-
-    buf = BytesIO()
-    buf.write(merged.to_csv(index=False, encoding="utf-8-sig").encode("utf-8-sig"))
-    buf.seek(0)
-
-    media = MediaIoBaseUpload(buf, mimetype="text/csv")
-    service.files().update(
-        fileId=DRIVE_FILE_ID,
-        media_body=media,
-        supportsAllDrives=True
-    ).execute()
-
-    print(f"✔ อัปเดตไฟล์ Drive rows = {len(merged)}")
-    return len(merged)
+    """
+    รวมผลวันนี้เข้ากับไฟล์บน Drive (ลบซ้ำตาม Province + ForecastDate + DateTime)
+    ดาวน์โหลดเฉพาะเมื่อไฟล์บน Drive เปลี่ยน และอัปโหลดแบบ resumable เฉพาะเมื่อมีแถวเปลี่ยน
+    """
+    return sync_append(build_drive(), DRIVE_FILE_ID, df_new, "rain")
 
 
 # ============================================================
 # Scraper
 # ============================================================
+def _forecast_signature(driver):
+    js = """
+    var el = document.querySelector('.forecast-weather, .forecast-rain');
+    return el ? el.innerText : '';
+    """
+    return driver.execute_script(js) or ""
+
 def open_home(driver):
-    safe_get(driver, HOME)
-    time.sleep(2)
+    t0 = time.time()
+    with metrics.stage("page_load"):
+        safe_get(driver, HOME)
+    with metrics.stage("wait_selector"):
+        wait_until(lambda: driver.execute_script("return !!document.getElementById('province-selector');"), WAIT_MED)
+    log_page_stats(driver, "TMD home", t0)
     bypass_popup(driver)
-    time.sleep(2)
+    wait_until(lambda: driver.execute_script(
+        "return !document.querySelector('.modal-backdrop, .swal2-container');"
+    ), 2)
 
 def select_province(driver, mapping, name):
     val = mapping[name]
+    before = _forecast_signature(driver)
     js = """
     var s = document.getElementById('province-selector');
     s.value = arguments[0];
     s.dispatchEvent(new Event('change',{bubbles:true}));
     """
     driver.execute_script(js, val)
-    time.sleep(0.5)
+    # รอให้พยากรณ์เปลี่ยนจากจังหวัดก่อนหน้า (บางจังหวัดข้อความเหมือนกัน -> รอแค่สั้น ๆ)
+    wait_until(lambda: _forecast_signature(driver) != before, 1.0)
 
+@metrics.timed("wait_forecast")
 def wait_forecast(driver):
     WebDriverWait(driver, WAIT_LONG).until(
         EC.any_of(
@@ -179,6 +183,7 @@ def parse(driver, province):
 
     return {
         "Province": province,
+        "ForecastDate": datetime.now().strftime("%Y-%m-%d"),
         "Weather": weather[0].text if weather else None,
         "RainChance": None,
         "Rainfall_mm": None,
@@ -186,38 +191,287 @@ def parse(driver, province):
     }
 
 
-# ============================================================
-# MAIN
-# ============================================================
-def main():
-    driver = make_driver()
+@metrics.timed("province")
+def scrape_province(driver, mapping, prov):
+    PACER.acquire()
+    try:
+        select_province(driver, mapping, prov)
+        wait_forecast(driver)
+    except TimeoutException:
+        PACER.failure()
+        raise
+    PACER.success()
+    return parse(driver, prov)
+
+
+def scrape_sequential(mapping) -> List[dict]:
+    driver = make_driver("tmd")
     rows = []
 
     try:
         open_home(driver)
-        mapping = collect_mapping()
 
         for i, prov in enumerate(mapping.keys(), 1):
             try:
-                select_province(driver, mapping, prov)
-                wait_forecast(driver)
-                row = parse(driver, prov)
-                rows.append(row)
+                rows.append(scrape_province(driver, mapping, prov))
                 print(f"[{i}] {prov} ✔")
-                time.sleep(random.uniform(SLEEP_MIN, SLEEP_MAX))
             except Exception as e:
                 print(f"[{i}] {prov} ✖ {e}")
 
     finally:
         driver.quit()
 
-    df = pd.DataFrame(rows)
-    df.to_csv(CSV_OUT, index=False, encoding="utf-8-sig")
+    return rows
+
+
+def scrape_parallel(mapping, n_workers: int) -> List[dict]:
+    """
+    ดึงหลายจังหวัดพร้อมกันด้วย browser N ตัว (เปิดหน้าแรก + ปิด popup ไว้ก่อน)
+    - แต่ละ worker หยิบจังหวัดจากคิวกลาง
+    - จังหวัดที่ล้มเหลวจะถูกคืนเข้าคิวลองใหม่ (สูงสุด PROVINCE_RETRIES ครั้ง นับจากจำนวนครั้งที่พัง)
+      โดยให้ worker ที่ยังไม่เคยลองจังหวัดนั้นหยิบก่อน
+    - browser ใช้ไม่ได้แล้ว (session ตาย) -> worker ปิดแล้วเปิดใหม่ เปิดไม่ได้ก็เลิก
+      (ไม่ใช้ session เสียไล่ทำให้ทุกจังหวัดที่หยิบมาเสียโควตา retry)
+    - ไม่มี browser ไหนเปิดได้ หรือไม่ได้ผลสักจังหวัดแต่งานยังค้าง -> raise (เหมือนแบบเรียงทีละจังหวัด)
+    - ผลลัพธ์เรียงตามลำดับจังหวัดเดิม
+    """
+    provinces = list(mapping.keys())
+    jobs = queue.Queue()
+    for i, prov in enumerate(provinces, 1):
+        jobs.put((i, prov, set(), 0))
+
+    results: Dict[int, dict] = {}
+    pending = [len(provinces)]
+    alive = [0]
+    started = [0]
+    lock = threading.Lock()
+
+    def finish_job():
+        with lock:
+            pending[0] -= 1
+
+    def open_driver(wid: int):
+        driver = None
+        try:
+            driver = make_driver("tmd")
+            open_home(driver)
+            return driver
+        except Exception as e:
+            print(f"[w{wid}] ✖ เปิด browser ไม่สำเร็จ: {e}")
+            if driver is not None:
+                driver.quit()
+            return None
+
+    def worker(wid: int):
+        driver = open_driver(wid)
+        if driver is None:
+            return
+        with lock:
+            alive[0] += 1
+            started[0] += 1
+        try:
+            while True:
+                with lock:
+                    if pending[0] <= 0:
+                        return
+                try:
+                    i, prov, tried_by, failures = jobs.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                # ถ้าเคยพังที่ worker นี้ และยังมี worker อื่นที่ไม่เคยลอง -> ส่งต่อ
+                with lock:
+                    others_left = alive[0] > len(tried_by | {wid})
+                if wid in tried_by and others_left:
+                    jobs.put((i, prov, tried_by, failures))
+                    time.sleep(0.1)
+                    continue
+
+                try:
+                    row = scrape_province(driver, mapping, prov)
+                    with lock:
+                        results[i] = row
+                    print(f"[{i}] {prov} ✔ (w{wid})")
+                    finish_job()
+                except Exception as e:
+                    failures += 1
+                    if failures <= PROVINCE_RETRIES:
+                        print(f"[{i}] {prov} ↻ retry {failures}/{PROVINCE_RETRIES} (w{wid}: {e})")
+                        jobs.put((i, prov, tried_by | {wid}, failures))
+                    else:
+                        print(f"[{i}] {prov} ✖ {e}")
+                        finish_job()
+                    if not isinstance(e, TimeoutException) and not _session_alive(driver):
+                        print(f"[w{wid}] ♻️ browser ใช้ไม่ได้แล้ว -> เปิดใหม่")
+                        _quit(driver)
+                        driver = open_driver(wid)
+                        if driver is None:
+                            print(f"[w{wid}] ✖ เลิกใช้ worker นี้")
+                            return
+        finally:
+            with lock:
+                alive[0] -= 1
+            if driver is not None:
+                _quit(driver)
+
+    threads = [threading.Thread(target=worker, args=(w,), daemon=True) for w in range(1, n_workers + 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if not started[0]:
+        raise RuntimeError(f"เปิด browser ไม่สำเร็จทั้ง {n_workers} ตัว")
+    if pending[0] > 0:
+        if not results:
+            raise RuntimeError(f"ไม่ได้ข้อมูลสักจังหวัด (ค้าง {pending[0]} จังหวัด, worker เลิกหมดแล้ว)")
+        print(f"⚠️ worker เลิกหมดก่อนเสร็จ: ค้าง {pending[0]} จังหวัด")
+
+    return [results[i] for i in sorted(results)]
+
+
+def _session_alive(driver) -> bool:
+    """session ยังคุยกับ browser ได้ไหม (error ระดับ session เช่น browser crash -> False)"""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver) -> None:
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+# ============================================================
+# พยากรณ์ 7 วันผ่าน JSON API (Selenium เป็นทางสำรอง)
+# ============================================================
+# ชื่อ field ที่ API อาจใช้ (ตัวแรกที่มีค่าถูกใช้, รองรับ dotted path)
+FORECAST_FIELDS = {
+    "ForecastDate": ("forecastDate", "ForecastDate", "date", "Date", "time"),
+    "Weather": ("weatherDescription", "WeatherDescription", "descTh", "description", "weather", "desc"),
+    "RainChance": ("rainArea", "RainArea", "rainChance", "percentRain", "rain_percent"),
+    "Rainfall_mm": ("rain", "Rain", "rainfall", "Rainfall", "rainfall_mm"),
+}
+
+
+def _pick(rec: dict, names) -> object:
+    for name in names:
+        v = dig(rec, name)
+        if v not in (None, ""):
+            return v
+    return None
+
+
+def _forecast_url(prov_id: str, province: str) -> str:
+    url = FORECAST_API.format(id=prov_id, name=quote(province))
+    return HOME + url if url.startswith("/") else url
+
+
+def rows_from_forecast(province: str, payload, scraped_at: str) -> List[dict]:
+    """record รายวันใน payload -> แถวละวัน (คอลัมน์เดียวกับ parse)"""
+    rows = []
+    for rec in find_records(payload):
+        day = _pick(rec, FORECAST_FIELDS["ForecastDate"])
+        rows.append({
+            "Province": province,
+            "ForecastDate": str(day)[:10] if day is not None else None,
+            "Weather": _pick(rec, FORECAST_FIELDS["Weather"]),
+            "RainChance": _pick(rec, FORECAST_FIELDS["RainChance"]),
+            "Rainfall_mm": _pick(rec, FORECAST_FIELDS["Rainfall_mm"]),
+            "DateTime": scraped_at,
+        })
+    return rows
+
+
+@metrics.timed("forecast_api")
+def fetch_forecast(province: str, prov_id: str, scraped_at: str) -> List[dict]:
+    payload = retry(lambda: get_json(_forecast_url(prov_id, province)), tries=2, label=f"forecast {province}")
+    rows = rows_from_forecast(province, payload, scraped_at)
+    if not rows:
+        raise ValueError("ไม่พบรายการพยากรณ์ใน response")
+    return rows
+
+
+def scrape_api(mapping) -> Tuple[Dict[str, List[dict]], List[str]]:
+    """
+    ดึงทุกจังหวัดพร้อมกันผ่าน Session กลาง (connection pool, ไม่เกิน HTTP_WORKERS request พร้อมกัน)
+    คืน (แถวของแต่ละจังหวัด, จังหวัดที่ต้องไปดึงด้วย Selenium)
+    """
+    scraped_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    provinces = list(mapping.keys())
+    # ลองจังหวัดแรกก่อน: endpoint ผิด/ล่ม -> ไม่ต้องยิงอีกหลายสิบครั้ง
+    first = provinces[0]
+    try:
+        results = {first: fetch_forecast(first, mapping[first], scraped_at)}
+    except Exception as e:
+        print(f"⚠️ API พยากรณ์ใช้ไม่ได้ ({repr(e)}) -> ใช้ Selenium ทุกจังหวัด")
+        return {}, provinces
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, HTTP_WORKERS)) as ex:
+        futures = {p: ex.submit(fetch_forecast, p, mapping[p], scraped_at) for p in provinces[1:]}
+        for prov, fut in futures.items():
+            try:
+                results[prov] = fut.result()
+            except Exception as e:
+                print(f"{prov} ✖ API: {e}")
+                failed.append(prov)
+    print(f"🌐 API พยากรณ์: {len(results)}/{len(provinces)} จังหวัด ({sum(map(len, results.values()))} แถว)")
+    return results, failed
+
+
+# ============================================================
+# MAIN
+# ============================================================
+def scrape_rain() -> pd.DataFrame:
+    """ดึงพยากรณ์ทุกจังหวัดแล้วบันทึก CSV_OUT (ยังไม่อัปโหลด Drive)"""
+    mapping = collect_mapping()
+
+    by_province: Dict[str, List[dict]] = {}
+    todo = mapping
+    if FORECAST_API:
+        by_province, failed = scrape_api(mapping)
+        todo = {p: mapping[p] for p in failed}
+
+    if todo:
+        if FORECAST_API:
+            print(f"🖥️ ใช้ Selenium กับ {len(todo)} จังหวัดที่ดึงผ่าน API ไม่ได้")
+        if RAIN_WORKERS > 1 and len(todo) > 1:
+            print(f"⚙ ใช้ browser {RAIN_WORKERS} ตัวพร้อมกัน")
+            rows = scrape_parallel(todo, RAIN_WORKERS)
+        else:
+            rows = scrape_sequential(todo)
+        for row in rows:
+            by_province[row["Province"]] = [row]
+
+    # เรียงตามลำดับจังหวัดจาก API รายชื่อ
+    df = pd.DataFrame([row for prov in mapping if prov in by_province for row in by_province[prov]])
+    # แถวที่ไม่ตรงสคีมา rain ไปอยู่ใน quarantine/rain.csv (ส่วนที่เหลือบันทึกตามปกติ)
+    quarantine = Quarantine("rain")
+    df = admit_frame(df, SCHEMAS["rain"], quarantine, CSV_OUT)
+    if quarantine.rows:
+        print(f"⚠️ กัก {quarantine.rows} แถวที่ไม่ตรงสคีมาไว้ที่ {quarantine.path}")
+    with metrics.stage("csv_write"):
+        df.to_csv(CSV_OUT, index=False, encoding="utf-8-sig")
+    metrics.incr("rows_saved", len(df))
     print(f"✔ บันทึก CSV → {CSV_OUT}")
+    return df
+
+
+def main():
+    metrics.start("scrap1")
+    df = scrape_rain()
 
     if ENABLE_GOOGLE_DRIVE_UPLOAD:
         drive_merge_update(df)
 
+    print(http_cache.summary())
+    metrics.info("http_cache", dict(http_cache.STATS))
+
 
 if __name__ == "__main__":
     main()
@@ -1,17 +1,29 @@
 from __future__ import annotations
 
 # ============================== 1) IMPORTS & CONFIG ==============================
-import os, re, time
+import os, re, time, math
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 import pandas as pd
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from mui_table import TABLE_ROWS_CSS, extract_rows, pagination_total, table_total
+from browser import log_page_stats, make_driver
+import metrics
+from checkpoint import Checkpoint
+from fingerprint import Fingerprints, Unchanged
+from http_fetch import fetch_records, use_http
+from netcapture import dig, drain_json_responses, fmt_num, records_from_payloads
+from pacing import Pacer, backoff_delay
+from row_sink import RowSink
+from schemas import SCHEMAS
+
 # ------------------------------- Runtime Config --------------------------------
 URL: str = os.getenv("WATERLEVEL_URL", "https://nationalthaiwater.onwr.go.th/waterlevel")
 CSV_OUT: str = os.getenv("CSV_OUT", "waterlevel_report.csv")
@@ -20,41 +32,39 @@ PAGE_TIMEOUT: int = int(os.getenv("PAGE_TIMEOUT", "25"))
 CLICK_TIMEOUT: int = int(os.getenv("CLICK_TIMEOUT", "10"))
 SLEEP_BETWEEN_PAGES: float = float(os.getenv("SLEEP_BETWEEN_PAGES", "0"))  # ✅ เร็วสุด = 0
 MAX_PAGES: int = int(os.getenv("MAX_PAGES", "0"))  # 0 = ไม่จำกัด (ตั้ง 3-5 ตอนเทสต์)
+PAGE_SHARDS: int = int(os.getenv("PAGE_SHARDS", "1"))  # >1 = แบ่งช่วงหน้าให้ driver หลายตัวดึงพร้อมกัน
+SHARD_RETRIES: int = int(os.getenv("SHARD_RETRIES", "1"))  # ดึงหน้าที่ขาดซ้ำกี่รอบก่อนถือว่าล้มเหลว
+CLICK_TRIES: int = int(os.getenv("CLICK_TRIES", "2"))  # คลิกซ้ำได้กี่ครั้งเมื่อตารางไม่เปลี่ยนหน้า
 
-# ============================= 2) Selenium (เร็ว/กัน timeout) =============================
-def make_driver() -> webdriver.Chrome:
-    opt = Options()
-    opt.page_load_strategy = "none"  # ✅ ไม่รอโหลดทั้งหน้า
-    opt.add_argument("--headless=new")
-    opt.add_argument("--no-sandbox")
-    opt.add_argument("--disable-dev-shm-usage")
-    opt.add_argument("--disable-gpu")
-    opt.add_argument("--window-size=1440,900")
-    opt.add_argument("--disable-background-networking")
-    opt.add_argument("--disable-extensions")
-    opt.add_argument("--no-first-run")
-    opt.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
-    )
-    drv = webdriver.Chrome(options=opt)
-    drv.set_script_timeout(120)
-    return drv
+# จังหวะคลิกเปลี่ยนหน้า ใช้ร่วมกันทุก shard (เร่ง/ผ่อนตามการตอบสนองของเว็บ)
+PACER = Pacer()
+CAPTURE_JSON: bool = os.getenv("CAPTURE_JSON", "false") == "true"  # ✅ ดัก JSON แทนการไล่หน้า
+CAPTURE_URL_PART: str = os.getenv("CAPTURE_URL_PART", "waterlevel")
+# FETCH_MODE=http: ดึงจาก API ตรง (ต้องใส่ WATERLEVEL_API_URL) ถ้าไม่ได้จะกลับไปใช้ Selenium
+API_URL: str = os.getenv("WATERLEVEL_API_URL", "")
+API_PAGE_PARAM: Optional[str] = os.getenv("WATERLEVEL_API_PAGE_PARAM") or None
 
+# ============================= 2) Selenium (เร็ว/กัน timeout) =============================
+# driver สร้างจาก browser.make_driver preset "table" (page_load_strategy=none + บล็อก asset)
 def open_url_with_retry(driver: webdriver.Chrome, url: str, tries: int = 3, wait_css: str = ".MuiTable-root tbody tr", wait_sec: int = PAGE_TIMEOUT):
     last_err = None
     for i in range(1, tries + 1):
         try:
             driver.get("about:blank")
-            driver.get(url)
-            WebDriverWait(driver, wait_sec).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, wait_css))
-            )
+            t0 = time.time()
+            with metrics.stage("page_load"):
+                driver.get(url)
+            with metrics.stage("wait_table"):
+                WebDriverWait(driver, wait_sec).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_css))
+                )
+            log_page_stats(driver, url, t0)
             return
         except Exception as e:
             last_err = e
             print(f"⚠️ open_url attempt {i}/{tries} failed: {repr(e)}")
-            time.sleep(1.5 * i)
+            if i < tries:
+                time.sleep(backoff_delay(i, base=1.5))
     raise last_err
 
 def _set_rows_per_page(driver: webdriver.Chrome, target_values=(200, 100, 50)):
@@ -94,12 +104,21 @@ def _set_rows_per_page(driver: webdriver.Chrome, target_values=(200, 100, 50)):
                 continue
     print("ℹ️ เปลี่ยน Rows per page ไม่สำเร็จ (อาจไม่มีตัวเลือกนี้)")
 
-def _find_next_button(driver: webdriver.Chrome):
-    xpaths = [
-        "//button[@aria-label='Go to next page']",
-        "//span[@title='Next Page']/button",
-        "//button[.//span[contains(@class,'MuiSvgIcon-root')]][@aria-label='Next Page']",
-    ]
+_NEXT_XPATHS = (
+    "//button[@aria-label='Go to next page']",
+    "//span[@title='Next Page']/button",
+    "//button[.//span[contains(@class,'MuiSvgIcon-root')]][@aria-label='Next Page']",
+)
+_PREV_XPATHS = (
+    "//button[@aria-label='Go to previous page']",
+    "//span[@title='Previous Page']/button",
+)
+_LAST_XPATHS = (
+    "//button[@aria-label='Go to last page']",
+    "//span[@title='Last Page']/button",
+)
+
+def _find_button(driver: webdriver.Chrome, xpaths):
     for xp in xpaths:
         try:
             btn = WebDriverWait(driver, CLICK_TIMEOUT).until(EC.presence_of_element_located((By.XPATH, xp)))
@@ -120,69 +139,315 @@ def _is_disabled(btn) -> bool:
     return False
 
 # ============================= 3) Scrape & Save =============================
-def scrape_waterlevel() -> list[list[str]]:
-    driver = make_driver()
+def _row_from_record(rec: dict, current_date: str) -> list[str]:
+    """แปลง record จาก API ให้เป็นแถวเดียวกับที่อ่านจากตาราง (9 คอลัมน์)"""
+    geo = (("ต.", "tumbon_name"), ("อ.", "amphoe_name"), ("จ.", "province_name"))
+    location = " ".join(f"{pre}{dig(rec, f'geocode.{key}.th')}" for pre, key in geo if dig(rec, f"geocode.{key}.th"))
+    when = str(dig(rec, "waterlevel_datetime", ""))
+    return [
+        str(dig(rec, "station.tele_station_name.th", "")).strip(),
+        location,
+        when[11:16] if len(when) >= 16 else when,
+        fmt_num(dig(rec, "waterlevel_msl")),
+        fmt_num(dig(rec, "station.min_bank")),
+        fmt_num(dig(rec, "station.ground_level")),
+        fmt_num(dig(rec, "storage_percent")),
+        str(dig(rec, "situation_level.text", dig(rec, "diff_wl_bank_text", ""))).strip(),
+        current_date,
+    ]
+
+def _rows_from_capture(driver: webdriver.Chrome, current_date: str) -> list[list[str]]:
+    """แถวจาก JSON ที่ดักได้; ไม่พบหรือจำนวนไม่ตรงกับ pagination ของตาราง -> [] (ให้ไล่หน้าแทน)"""
+    records = records_from_payloads(drain_json_responses(driver, CAPTURE_URL_PART), table_total(driver))
+    if not records:
+        return []
+    return [_row_from_record(r, current_date) for r in records]
+
+def scrape_waterlevel_http() -> list[list[str]]:
+    """ดึงผ่าน HTTP ล้วน; คืน [] ถ้าไม่ได้ตั้ง endpoint หรือดึงไม่สำเร็จ"""
+    if not API_URL:
+        print("ℹ️ FETCH_MODE=http แต่ไม่ได้ตั้ง WATERLEVEL_API_URL -> ใช้ Selenium")
+        return []
     try:
-        open_url_with_retry(driver, URL, tries=3, wait_css=".MuiTable-root tbody tr", wait_sec=PAGE_TIMEOUT)
+        records = fetch_records(API_URL, page_param=API_PAGE_PARAM)
+    except Exception as e:
+        print(f"⚠️ ดึงผ่าน HTTP ไม่สำเร็จ: {repr(e)} -> ใช้ Selenium")
+        return []
+    current_date = datetime.now().strftime("%m/%d/%y")
+    rows = [_row_from_record(r, current_date) for r in records]
+    print(f"🌐 ได้ข้อมูลผ่าน HTTP {len(rows)} แถว")
+    return rows
+
+def _first_row(driver: webdriver.Chrome):
+    # ใช้แค่แถวแรกสำหรับรอ staleness หลังคลิกเปลี่ยนหน้า
+    found = driver.find_elements(By.CSS_SELECTOR, TABLE_ROWS_CSS)
+    return found[0] if found else None
+
+def _page_rows(driver: webdriver.Chrome, page_idx: int, current_date: str) -> list[list[str]]:
+    rows: list[list[str]] = []
+    for cols in extract_rows(driver, label=f"หน้า {page_idx}"):
+        if len(cols) < 5:
+            continue
+        if len(cols) == 9:
+            cols[-1] = current_date
+        else:
+            cols.append(current_date)
+        rows.append(cols)
+    return rows
 
-        # ลดจำนวนหน้าให้มากที่สุด
+@metrics.timed("page_click")
+def _click_pager(driver: webdriver.Chrome, xpaths=_NEXT_XPATHS) -> bool:
+    """
+    คลิกปุ่มเปลี่ยนหน้าแล้วรอตารางใหม่; คืน False ถ้าไม่มีปุ่ม/ปุ่มถูก disable
+    แถวเดิมไม่หายภายใน PAGE_TIMEOUT -> คลิกซ้ำ (สูงสุด CLICK_TRIES ครั้ง) แล้ว raise TimeoutException
+    (ไม่คืน True ให้ผู้เรียกดึงหน้าเดิมซ้ำ)
+    """
+    first_old = _first_row(driver)
+    healthy = True
+    for attempt in range(1, CLICK_TRIES + 1):
+        if attempt > 1 and EC.staleness_of(first_old)(driver):
+            break  # เปลี่ยนหลังหมดเวลาพอดี -> ไม่ต้องคลิกซ้ำ (กันข้ามหน้า)
+        btn = _find_button(driver, xpaths)
+        if not btn or _is_disabled(btn):
+            return False
+
+        PACER.acquire()
         try:
-            _set_rows_per_page(driver, target_values=(200, 100, 50))
-        except Exception as e:
-            print("ℹ️ ข้ามการตั้ง Rows per page:", e)
+            driver.execute_script("arguments[0].click();", btn)
+        except Exception:
+            try:
+                btn.click()
+            except Exception:
+                return False
 
-        def _get_rows():
-            return driver.find_elements(By.CSS_SELECTOR, ".MuiTable-root tbody tr")
+        if first_old is None:
+            break
+        try:
+            WebDriverWait(driver, PAGE_TIMEOUT).until(EC.staleness_of(first_old))
+            break
+        except Exception:
+            healthy = False
+            PACER.failure()
+            print(f"⚠️ ตารางไม่เปลี่ยนหลังคลิก (ครั้งที่ {attempt}/{CLICK_TRIES})")
+    else:
+        raise TimeoutException(f"ตารางไม่เปลี่ยนหน้าหลังคลิก {CLICK_TRIES} ครั้ง")
 
-        all_data: list[list[str]] = []
-        current_date = datetime.now().strftime("%m/%d/%y")
+    try:
+        WebDriverWait(driver, PAGE_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ".MuiTable-root tbody tr"))
+        )
+    except Exception:
+        PACER.failure()
+        raise
+    if healthy:
+        PACER.success()
+    if SLEEP_BETWEEN_PAGES > 0:
+        time.sleep(SLEEP_BETWEEN_PAGES)
+    return True
+
+def _open_table(driver: webdriver.Chrome) -> None:
+    open_url_with_retry(driver, URL, tries=3, wait_css=".MuiTable-root tbody tr", wait_sec=PAGE_TIMEOUT)
+
+def _prepare_table(driver: webdriver.Chrome) -> None:
+    # ลดจำนวนหน้าให้มากที่สุด
+    try:
+        _set_rows_per_page(driver, target_values=(200, 100, 50))
+    except Exception as e:
+        print("ℹ️ ข้ามการตั้ง Rows per page:", e)
+
+def _total_pages(driver: webdriver.Chrome) -> int:
+    """อ่านจำนวนแถวทั้งหมดจากข้อความ pagination เช่น '1-200 of 5,432' แล้วคำนวณจำนวนหน้า"""
+    rows = pagination_total(driver)
+    per_page = len(driver.find_elements(By.CSS_SELECTOR, TABLE_ROWS_CSS))
+    if not rows or not per_page:
+        return 0
+    return math.ceil(rows / per_page)
+
+def _resume_to_checkpoint(driver: webdriver.Chrome, ckpt: Checkpoint, current_date: str) -> bool:
+    """ข้ามไปหน้าที่ checkpoint บันทึกไว้ (ไม่ดึงข้อมูลระหว่างทาง) แล้วเทียบ hash แถวแรก"""
+    for _ in range(ckpt.page - 1):
+        if not _click_pager(driver):
+            return False
+    rows = _page_rows(driver, ckpt.page, current_date)
+    return ckpt.matches(rows[0] if rows else None)
 
-        page_idx = 1
+def _scrape_page_range(driver: webdriver.Chrome, start: int, end: int, current_date: str,
+                       total: int = 0, ckpt: Optional[Checkpoint] = None,
+                       on_page: Optional[Callable[[list[list[str]]], object]] = None) -> dict[int, list[list[str]]]:
+    """
+    ดึงหน้า start..end (end=0 = จนหน้าสุดท้าย) จาก driver ที่เปิดตารางหน้า 1 ไว้แล้ว
+    - ช่วงที่อยู่ครึ่งหลัง (รู้ total) จะกระโดดไปหน้าสุดท้ายแล้วเดินถอยหลังแทน
+    - ถ้า ckpt มีหน้าค้าง driver ต้องอยู่ที่หน้านั้นแล้ว (_resume_to_checkpoint) และจะบันทึกทุกหน้า
+    - ถ้าใส่ on_page จะส่งแถวออกทีละหน้า (เรียงหน้า) และไม่เก็บไว้ในผลลัพธ์
+    """
+    pages: dict[int, list[list[str]]] = {}
+    backward = bool(total and end and start > total / 2 and _click_pager(driver, _LAST_XPATHS))
+
+    if backward:
+        page = total
+        while page > end:
+            if not _click_pager(driver, _PREV_XPATHS):
+                return pages
+            page -= 1
         while True:
-            rows = _get_rows()
-            for row in rows:
-                cols = [c.text.strip() for c in row.find_elements(By.CSS_SELECTOR, "td")]
-                if len(cols) < 5:
-                    continue
-                if len(cols) == 9:
-                    cols[-1] = current_date
-                else:
-                    cols.append(current_date)
-                all_data.append(cols)
-
-            if MAX_PAGES and page_idx >= MAX_PAGES:
-                print(f"⛔️ Reach MAX_PAGES={MAX_PAGES}, stop early for speed.")
+            pages[page] = _page_rows(driver, page, current_date)
+            if page <= start or not _click_pager(driver, _PREV_XPATHS):
                 break
+            page -= 1
+        return pages
 
-            next_btn = _find_next_button(driver)
-            if not next_btn or _is_disabled(next_btn):
-                break
+    page = 1
+    if ckpt is not None and ckpt.page:
+        pages = ckpt.pages()
+        print(f"↩️ ต่อจาก checkpoint หน้า {ckpt.page} ({sum(len(r) for r in pages.values())} แถว)")
+        if on_page is not None:
+            for p in sorted(pages):
+                on_page(pages[p])
+            pages = {}
+        if (end and ckpt.page >= end) or not _click_pager(driver):
+            return pages
+        page = ckpt.page + 1
+    while page < start:
+        if not _click_pager(driver):
+            return pages
+        page += 1
+    while True:
+        t_page = time.perf_counter()
+        rows = _page_rows(driver, page, current_date)
+        if on_page is not None:
+            on_page(rows)
+        else:
+            pages[page] = rows
+        if ckpt is not None:
+            ckpt.record(page, rows, rows[0] if rows else None)
+        if end and page >= end:
+            if MAX_PAGES and page >= MAX_PAGES:
+                print(f"⛔️ Reach MAX_PAGES={MAX_PAGES}, stop early for speed.")
+            break
+        if not _click_pager(driver):
+            break
+        metrics.observe("page", time.perf_counter() - t_page)
+        page += 1
+        print(f"➡️ Next Page Loaded: {page}")
+    return pages
 
-            first_old = rows[0] if rows else None
-            try:
-                driver.execute_script("arguments[0].click();", next_btn)
-            except Exception:
-                try:
-                    next_btn.click()
-                except Exception:
-                    break
+def _split_ranges(total: int, shards: int) -> list[tuple[int, int]]:
+    size = math.ceil(total / shards)
+    return [(s, min(s + size - 1, total)) for s in range(1, total + 1, size)]
 
-            if first_old is not None:
-                try:
-                    WebDriverWait(driver, PAGE_TIMEOUT).until(EC.staleness_of(first_old))
-                except Exception:
-                    pass
+def _missing_ranges(pages: dict[int, list[list[str]]], total: int) -> list[tuple[int, int]]:
+    """หน้าที่ยังไม่ได้ (1..total) รวมเป็นช่วงต่อเนื่อง"""
+    ranges: list[tuple[int, int]] = []
+    for p in range(1, total + 1):
+        if p in pages:
+            continue
+        if ranges and ranges[-1][1] == p - 1:
+            ranges[-1] = (ranges[-1][0], p)
+        else:
+            ranges.append((p, p))
+    return ranges
 
-            WebDriverWait(driver, PAGE_TIMEOUT).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".MuiTable-root tbody tr"))
-            )
-            if SLEEP_BETWEEN_PAGES > 0:
-                time.sleep(SLEEP_BETWEEN_PAGES)
+def _stitch_pages(pages: dict[int, list[list[str]]], boundaries: set[int]) -> list[list[str]]:
+    """รวมทุกหน้าตามลำดับ; ที่รอยต่อ shard ตัดแถวที่ซ้ำกับหน้าก่อนหน้า (ข้อมูลเลื่อนระหว่างดึง)"""
+    all_data: list[list[str]] = []
+    prev: set[tuple[str, ...]] = set()
+    for p in sorted(pages):
+        rows = pages[p]
+        if p in boundaries:
+            kept = [r for r in rows if tuple(r) not in prev]
+            if len(kept) != len(rows):
+                print(f"🧹 หน้า {p}: ตัดแถวซ้ำที่รอยต่อ {len(rows) - len(kept)} แถว")
+            rows = kept
+        all_data.extend(rows)
+        prev = {tuple(r) for r in pages[p]}
+    return all_data
 
-            page_idx += 1
-            print(f"➡️ Next Page Loaded: {page_idx}")
+def _scrape_shard(start: int, end: int, total: int, current_date: str) -> dict[int, list[list[str]]]:
+    driver = make_driver("table")
+    try:
+        _open_table(driver)
+        _prepare_table(driver)
+        print(f"🧩 shard หน้า {start}-{end} เริ่มแล้ว")
+        return _scrape_page_range(driver, start, end, current_date, total=total)
+    finally:
+        driver.quit()
 
-        return all_data
+def scrape_waterlevel(sink: Optional[RowSink] = None, fp: Optional[Fingerprints] = None) -> list[list[str]]:
+    """
+    ไล่ดึงตารางผ่าน browser
+    - ถ้าใส่ sink: โหมดไล่หน้าปกติจะเขียนลง sink ทีละหน้าแล้วคืน [] (ไม่กินหน่วยความจำตามจำนวนหน้า)
+    - โหมด JSON/แบ่ง shard ต้องได้ข้อมูลครบก่อนจึงคืนเป็น list ตามเดิม
+    - ถ้าใส่ fp: JSON หรือหน้าแรกเหมือนรอบก่อน -> raise Unchanged (ไฟล์เป็น snapshot ทั้งชุด
+      จึงหยุดกลางทางไม่ได้ ตัดสินจากหน้าแรกอย่างเดียว)
+    """
+    driver = make_driver("table", capture=CAPTURE_JSON)
+    try:
+        _open_table(driver)
+        current_date = datetime.now().strftime("%m/%d/%y")
+
+        if CAPTURE_JSON:
+            captured = _rows_from_capture(driver, current_date)
+            if captured:
+                if fp is not None and fp.payload_known(captured):
+                    raise Unchanged("JSON")
+                print(f"📡 ได้ข้อมูลจาก JSON โดยตรง {len(captured)} แถว (ไม่ต้องไล่หน้า)")
+                return captured
+            print("ℹ️ ไม่พบ JSON ที่ครบทั้งตาราง -> กลับไปไล่หน้าแบบเดิม")
+
+        _prepare_table(driver)
+
+        ckpt = Checkpoint("waterlevel")
+        if fp is not None and not ckpt.page and fp.page_known(1, _page_rows(driver, 1, current_date)):
+            fp.stopped_at = 1
+            raise Unchanged("หน้าแรก")
+
+        total = _total_pages(driver) if PAGE_SHARDS > 1 else 0
+        # กดหน้าสุดท้ายแล้วเดินถอยหลังได้เฉพาะตอนดึงครบทุกหน้า:
+        # ถ้า MAX_PAGES ตัดช่วงไว้ หน้าสุดท้ายจริงไม่ใช่หน้า total -> ทุก shard เดินไปข้างหน้าอย่างเดียว
+        last_page = total
+        if MAX_PAGES and total:
+            if MAX_PAGES < total:
+                last_page = 0
+            total = min(total, MAX_PAGES)
+        if total > 1:
+            ranges = _split_ranges(total, PAGE_SHARDS)
+            print(f"🧩 แบ่ง {total} หน้าเป็น {len(ranges)} ช่วง: {ranges}")
+            pages: dict[int, list[list[str]]] = {}
+            boundaries = {s for s, _ in ranges[1:]}
+            with ThreadPoolExecutor(max_workers=len(ranges) - 1 or 1) as ex:
+                futures = [ex.submit(_scrape_shard, s, e, last_page, current_date) for s, e in ranges[1:]]
+                # ช่วงแรกใช้ driver ที่เปิดไว้แล้ว
+                pages.update(_scrape_page_range(driver, *ranges[0], current_date))
+                for fut in futures:
+                    try:
+                        pages.update(fut.result())
+                    except Exception as e:
+                        print(f"⚠️ shard ล้มเหลว: {repr(e)}")
+            # ไฟล์เป็น snapshot ทั้งชุด -> หน้าที่ขาดต้องดึงซ้ำ ไม่งั้นถือว่ารอบนี้ล้มเหลว
+            for attempt in range(1, SHARD_RETRIES + 1):
+                retry_ranges = _missing_ranges(pages, total)
+                if not retry_ranges:
+                    break
+                print(f"↻ ดึงหน้าที่ขาดซ้ำ (รอบ {attempt}/{SHARD_RETRIES}): {retry_ranges[:10]}")
+                for first, last in retry_ranges:
+                    boundaries.add(first)
+                    try:
+                        pages.update(_scrape_shard(first, last, last_page, current_date))
+                    except Exception as e:
+                        print(f"⚠️ shard {first}-{last} ล้มเหลว: {repr(e)}")
+            missing = [p for p in range(1, total + 1) if p not in pages]
+            if missing:
+                raise RuntimeError(f"ดึงไม่ครบ {len(missing)}/{total} หน้า: {missing[:10]}")
+            return _stitch_pages(pages, boundaries - {1})
+
+        if ckpt.page and not _resume_to_checkpoint(driver, ckpt, current_date):
+            print("ℹ️ checkpoint ไม่ตรงกับหน้าเว็บ -> เริ่มหน้า 1 ใหม่")
+            ckpt.clear()
+            _open_table(driver)
+            _prepare_table(driver)
+        on_page = sink.write_rows if sink is not None else None
+        pages = _scrape_page_range(driver, 1, MAX_PAGES, current_date, ckpt=ckpt, on_page=on_page)
+        return _stitch_pages(pages, set())
     finally:
         driver.quit()
 
@@ -192,39 +457,56 @@ def extract_thai(text: str) -> str:
     m = re.search(r"[ก-๙].*", str(text))
     return m.group(0).strip() if m else str(text).strip()
 
+WATERLEVEL = SCHEMAS["waterlevel"]
+HEADERS = WATERLEVEL.names
+
+def open_sink(out_path: str) -> RowSink:
+    """
+    sink ของไฟล์ผลลัพธ์: header ตามสคีมา, แถวที่ไม่ตรงสคีมาไป quarantine, Station ผ่าน extract_thai
+    fmt="csv" เสมอ (waterlevel_drive / daemon อ่านไฟล์นี้เป็น CSV ไม่ขึ้นกับ SINK_FORMAT)
+    """
+    return RowSink(out_path, HEADERS, fmt="csv", transforms={"Station": extract_thai}, schema=WATERLEVEL)
+
 def save_csv(all_data: list[list[str]], out_path: str) -> int:
     if not all_data:
         print("⚠️ ไม่พบข้อมูลให้บันทึก")
         return 0
 
-    max_cols = max(len(r) for r in all_data)
-    all_data = [r + [""] * (max_cols - len(r)) for r in all_data]
-
-    headers = [
-        "Station","Location","Time","Water_Level","Bank_Level",
-        "Gauge_Zero","Capacity_Percent","Status","Data_Time",
-    ]
-    if len(headers) < max_cols:
-        headers += [f"Extra_{i + 1}" for i in range(max_cols - len(headers))]
-
-    df = pd.DataFrame(all_data, columns=headers)
-    df["Station"] = df["Station"].apply(extract_thai)
-
-    out_dir = os.path.dirname(os.path.abspath(out_path))
-    if out_dir and not os.path.exists(out_dir):
-        os.makedirs(out_dir, exist_ok=True)
-
-    df.to_csv(out_path, index=False, encoding="utf-8-sig")
-    print(f"💾 บันทึก {len(df)} แถว -> {os.path.abspath(out_path)}")
-    return len(df)
+    with open_sink(out_path) as sink:
+        sink.write_rows(all_data)
+    print(f"💾 บันทึก {sink.rows} แถว -> {os.path.abspath(sink.path)}")
+    return sink.rows
 
 # ==================================== 4) Main ====================================
-def main() -> None:
+def main() -> int:
     t0 = time.time()
-    all_data = scrape_waterlevel()
-    rows_saved = save_csv(all_data, CSV_OUT)
+    metrics.start("scrap2")
+    fp = Fingerprints("waterlevel", output=CSV_OUT)
+    all_data = scrape_waterlevel_http() if use_http() else []
+    try:
+        if all_data:
+            if fp.payload_known(all_data):
+                raise Unchanged("HTTP")
+            rows_saved = save_csv(all_data, CSV_OUT)
+        else:
+            # เขียนลงไฟล์ทีละหน้า; โหมดที่คืนข้อมูลเป็นก้อน (JSON/shard) เขียนต่อท้ายใน sink เดียวกัน
+            with open_sink(CSV_OUT) as sink:
+                sink.write_rows(scrape_waterlevel(sink, fp))
+            rows_saved = sink.rows
+            if rows_saved:
+                print(f"💾 บันทึก {rows_saved} แถว -> {os.path.abspath(CSV_OUT)}")
+            else:
+                print("⚠️ ไม่พบข้อมูลให้บันทึก")
+    except Unchanged as e:
+        print(f"✔ ข้อมูล ({e}) เหมือนรอบก่อน -> ใช้ไฟล์เดิม {os.path.abspath(CSV_OUT)}")
+        rows_saved = 0
+    if rows_saved:
+        Checkpoint("waterlevel").clear()
+        fp.save()
     elapsed = time.time() - t0
+    metrics.incr("rows_saved", rows_saved)
     print(f"⏱ เสร็จสิ้น: บันทึก {rows_saved} แถว ใช้เวลา {elapsed:.2f} วินาที")
+    return rows_saved
 
 if __name__ == "__main__":
     main()
@@ -1,112 +1,405 @@
+import csv
+import io
 import os
+import sys
 import time
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from selenium import webdriver
+import pandas as pd
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
+
+from browser import log_page_stats, make_driver
+import metrics
+from checkpoint import Checkpoint
+from csv_ingest import read_csv_fast
+from fingerprint import FORCE_SCRAPE, Fingerprints
+from history_store import DAM_COLUMNS, HISTORY_STORE, write_partition
+from http_fetch import fetch_records, use_http
+from key_index import KEY_INDEX_ENABLED, KEYS, KeyIndex
+from mui_table import TABLE_ROWS_CSS, extract_rows, first_row_text, table_total, wait_table_changed
+from netcapture import dig, drain_json_responses, fmt_num, fmt_with_percent, records_from_payloads
+from pacing import Pacer
+from row_sink import RowSink
+from schemas import SCHEMAS
 
 # ================================== CONFIG ================================== #
-URL = "https://nationalthaiwater.onwr.go.th/dam"
+URL = os.getenv("DAM_URL", "https://nationalthaiwater.onwr.go.th/dam")
+DAM = SCHEMAS["waterdam"]
+
+# ดัก JSON ที่เติมตารางแทนการกด Next Page ทีละหน้า (ถ้าไม่พบจะกลับไปใช้ scrape_data)
+CAPTURE_JSON = os.getenv("CAPTURE_JSON", "false") == "true"
+CAPTURE_URL_PART = os.getenv("CAPTURE_URL_PART", "dam")
+
+# FETCH_MODE=http: ดึงจาก API ตรงโดยไม่เปิด Chrome (ต้องตั้ง endpoint ของทั้งสองแท็บ)
+API_URLS = {
+    "แหล่งน้ำขนาดใหญ่": os.getenv("DAM_LARGE_API_URL", ""),
+    "แหล่งน้ำขนาดกลาง": os.getenv("DAM_MEDIUM_API_URL", ""),
+}
+API_PAGE_PARAM = os.getenv("DAM_API_PAGE_PARAM") or None
 
-options = Options()
-options.add_argument("--headless=new")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
+PAGE_TIMEOUT = int(os.getenv("PAGE_TIMEOUT", "15"))
+CLICK_TRIES = int(os.getenv("CLICK_TRIES", "2"))  # คลิก Next ซ้ำได้กี่ครั้งเมื่อตารางไม่เปลี่ยน
+# จังหวะคลิกเปลี่ยนหน้า ใช้ร่วมกันทุกแท็บ (เร่ง/ผ่อนตามการตอบสนองของเว็บ)
+PACER = Pacer()
+
+# แท็บที่ต้องดึง: dam_type -> (ชื่อแท็บ, index ของ tabpanel)
+TABS = {
+    "large": ("แหล่งน้ำขนาดใหญ่", 0),
+    "medium": ("แหล่งน้ำขนาดกลาง", 1),
+}
+# true = เปิด browser แยกต่อแท็บและดึงพร้อมกัน
+PARALLEL_TABS = os.getenv("PARALLEL_TABS", "true") == "true"
 
 # ================================== FUNCTIONS ================================== #
-def scrape_data(tab_name: str) -> list[list[str]]:
+@metrics.timed("page_click")
+def _click_next(driver) -> bool:
+    """
+    คลิก Next Page แล้วรอให้แถวแรกเปลี่ยน; False = ไม่มีหน้าถัดไป/คลิกไม่ได้
+    ตารางไม่เปลี่ยนภายใน PAGE_TIMEOUT -> คลิกซ้ำ (สูงสุด CLICK_TRIES ครั้ง) แล้ว raise TimeoutException
+    (ไม่คืน True ให้ผู้เรียกดึงหน้าเดิมซ้ำ)
+    """
+    first_before = first_row_text(driver)
+    for attempt in range(1, CLICK_TRIES + 1):
+        if attempt > 1 and first_row_text(driver) not in ("", first_before):
+            return True  # เปลี่ยนหลังหมดเวลาพอดี -> ไม่ต้องคลิกซ้ำ (กันข้ามหน้า)
+        try:
+            next_button = WebDriverWait(driver, 5).until(
+                EC.element_to_be_clickable((By.XPATH, "//span[@title='Next Page']/button"))
+            )
+        except Exception:
+            return False
+        if not next_button.is_enabled():
+            return False
+        PACER.acquire()
+        driver.execute_script("arguments[0].click();", next_button)
+        if wait_table_changed(driver, first_before, timeout=PAGE_TIMEOUT):
+            PACER.success()
+            return True
+        PACER.failure()
+        print(f"⚠️ ตารางไม่เปลี่ยนหลังคลิก Next (ครั้งที่ {attempt}/{CLICK_TRIES})")
+    raise TimeoutException(f"ตารางไม่เปลี่ยนหน้าหลังคลิก Next {CLICK_TRIES} ครั้ง")
+
+def resume_to_checkpoint(driver, ckpt: Checkpoint) -> bool:
+    """ข้ามไปหน้าที่ checkpoint บันทึกไว้ (ไม่ดึงข้อมูลระหว่างทาง) แล้วเทียบ hash แถวแรก"""
+    for _ in range(ckpt.page - 1):
+        if not _click_next(driver):
+            return False
+    rows = extract_rows(driver)
+    return ckpt.matches(rows[0] if rows else None)
+
+def scrape_data(driver, tab_name: str, ckpt: Checkpoint | None = None,
+                sink: RowSink | None = None, fp: Fingerprints | None = None) -> list[list[str]]:
+    """
+    ไล่ดึงทุกหน้าของแท็บปัจจุบัน
+    - ถ้า ckpt มีหน้าค้างอยู่ driver ต้องอยู่ที่หน้านั้นแล้ว (resume_to_checkpoint)
+    - บันทึก checkpoint ทุกหน้าที่ดึงเสร็จ
+    - ถ้าใส่ sink จะเขียนต่อท้ายไฟล์ทีละหน้าและคืน [] (แถวจาก checkpoint อยู่ในไฟล์แล้ว)
+    - ถ้าใส่ fp: หน้าแรกเหมือนรอบก่อน -> ถือว่าทั้งแท็บไม่เปลี่ยน หยุดทันที
+      หน้าอื่นที่เหมือนรอบก่อนไม่เขียนลง sink ซ้ำ แต่ยังไล่ต่อจนจบ
+      (หน้ากลาง ๆ ที่ตรงกันไม่ได้แปลว่าหน้าหลังจากนั้นไม่เปลี่ยน)
+    """
     all_data = []
     current_date = datetime.today().strftime("%m/%d/%Y")
     page = 1
     print(f"\nเริ่มดึงข้อมูล: {tab_name}")
+    if ckpt is not None and ckpt.page:
+        if sink is None:
+            all_data = ckpt.rows()
+        print(f"↩️ ต่อจาก checkpoint หน้า {ckpt.page} ({ckpt.state['rows']} แถว)")
+        if not _click_next(driver):
+            print(f"จบการดึงข้อมูล: {tab_name}")
+            return all_data
+        page = ckpt.page + 1
     while True:
-        time.sleep(2)
-        rows = driver.find_elements(By.CSS_SELECTOR, ".MuiTable-root tbody tr")
-        count_before = len(all_data)
-        for row in rows:
-            cols = [col.text.strip() for col in row.find_elements(By.CSS_SELECTOR, "td")]
+        t_page = time.perf_counter()
+        with metrics.stage("wait_table"):
+            WebDriverWait(driver, PAGE_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, TABLE_ROWS_CSS))
+            )
+        rows = extract_rows(driver, label=f"หน้า {page}")
+        first_raw = list(rows[0]) if rows else None
+        page_data = []
+        for cols in rows:
             if any(col not in ("", "-", None) for col in cols):
                 cols += [current_date, tab_name]
-                all_data.append(cols)
-        scraped_this_page = len(all_data) - count_before
-        print(f"หน้า {page}: เก็บข้อมูลแล้ว {scraped_this_page} แถว")
-        try:
-            next_button = WebDriverWait(driver, 5).until(
-                EC.element_to_be_clickable((By.XPATH, "//span[@title='Next Page']/button"))
-            )
-            if next_button.is_enabled():
-                driver.execute_script("arguments[0].click();", next_button)
-                page += 1
-                print(f"ไปยังหน้า {page}...")
-                time.sleep(2)
+                page_data.append(cols)
+        known = fp is not None and fp.page_known(page, page_data)
+        if known and page == 1:
+            fp.stopped_at = page
+            print(f"⏭️ หน้าแรกเหมือนรอบก่อน -> {tab_name} บันทึกไว้แล้ว หยุดดึง")
+            break
+        if sink is not None:
+            if known:
+                print(f"⏭️ หน้า {page} เหมือนรอบก่อน (อยู่ในไฟล์แล้ว) -> ไม่เขียนซ้ำ")
             else:
-                print(f"จบการดึงข้อมูล: {tab_name}")
-                break
-        except:
-            print(f"ไม่พบปุ่ม 'Next Page' หรือคลิกไม่ได้: {tab_name}")
+                sink.write_rows(page_data)
+        else:
+            all_data.extend(page_data)
+        if ckpt is not None:
+            ckpt.record(page, page_data, first_raw)
+        print(f"หน้า {page}: เก็บข้อมูลแล้ว {len(page_data)} แถว")
+        if not _click_next(driver):
+            print(f"จบการดึงข้อมูล: {tab_name}")
             break
+        metrics.observe("page", time.perf_counter() - t_page)
+        page += 1
+        print(f"ไปยังหน้า {page}...")
     return all_data
 
-def save_data_to_csv(data: list[list[str]], dam_type: str) -> int:
-    if not data:
-        print(f"⚠️ ไม่มีข้อมูล {dam_type} ให้บันทึก")
-        return 0
-    file_path = f"waterdam_report_{dam_type}.csv"
-    file_exists = os.path.exists(file_path)
-    df = pd.DataFrame(data)
-    df.replace("", pd.NA, inplace=True)
-    df.dropna(axis=1, how="all", inplace=True)
-    if file_exists:
-        with open(file_path, encoding="utf-8-sig") as f:
-            first_line = f.readline()
-            existing_cols = len(first_line.strip().split(",")) if first_line else 0
-        if existing_cols and existing_cols != df.shape[1]:
-            print(f"⚠️ โครงสร้างไม่ตรงกับไฟล์เดิม ไม่บันทึก {dam_type}")
-            return 0
-    df.to_csv(file_path, mode="a", index=False, encoding="utf-8-sig", header=not file_exists)
-    print(f"💾 บันทึกข้อมูล {dam_type} ลงไฟล์ {file_path} แล้ว ({len(df)} แถว)")
-    return len(df)
+def _usable_capacity(rec: dict):
+    try:
+        return float(dig(rec, "dam.normal_storage")) - float(dig(rec, "dam.min_storage", 0))
+    except (TypeError, ValueError):
+        return None
 
-# ================================== MAIN ================================== #
-if __name__ == "__main__":
-    start_time = time.time()
-    driver = webdriver.Chrome(options=options)
+def _row_from_record(rec: dict) -> list[str]:
+    """แปลง record จาก API ให้เรียงคอลัมน์เหมือนตาราง (Dam ... Outflow)"""
+    return [
+        str(dig(rec, "dam.dam_name.th", "")).strip(),
+        str(dig(rec, "geocode.province_name.th", "")).strip(),
+        fmt_num(dig(rec, "dam.normal_storage")),
+        fmt_num(_usable_capacity(rec)),
+        fmt_with_percent(dig(rec, "dam_storage"), dig(rec, "dam_storage_percent")),
+        fmt_with_percent(dig(rec, "dam_uses_water"), dig(rec, "dam_uses_water_percent")),
+        fmt_num(dig(rec, "dam_inflow")),
+        fmt_num(dig(rec, "dam_released")),
+    ]
+
+def capture_data(driver, tab_name: str) -> list[list[str]] | None:
+    """
+    สร้างแถวจาก JSON ที่ดักได้ของแท็บปัจจุบัน
+    ไม่พบ หรือจำนวน record ไม่ตรงกับ 'x-y of N' ของตาราง -> None (ให้ scrape_tab ไล่หน้าแบบเดิม)
+    """
+    records = records_from_payloads(drain_json_responses(driver, CAPTURE_URL_PART), table_total(driver))
+    if not records:
+        print(f"ℹ️ ไม่พบ JSON ที่ครบทั้งแท็บ {tab_name} -> ไล่หน้าแบบเดิม")
+        return None
+    current_date = datetime.today().strftime("%m/%d/%Y")
+    all_data = []
+    for rec in records:
+        cols = _row_from_record(rec)
+        if any(col not in ("", "-", None) for col in cols):
+            all_data.append(cols + [current_date, tab_name])
+    print(f"📡 {tab_name}: ได้ข้อมูลจาก JSON โดยตรง {len(all_data)} แถว")
+    return all_data
+
+def fetch_data_http(tab_name: str) -> list[list[str]]:
+    """ดึงแท็บผ่าน HTTP ล้วน; คืน [] ถ้าไม่มี endpoint หรือดึงไม่สำเร็จ"""
+    url = API_URLS.get(tab_name)
+    if not url:
+        return []
     try:
+        records = fetch_records(url, page_param=API_PAGE_PARAM)
+    except Exception as e:
+        print(f"⚠️ ดึง {tab_name} ผ่าน HTTP ไม่สำเร็จ: {repr(e)}")
+        return []
+    current_date = datetime.today().strftime("%m/%d/%Y")
+    all_data = []
+    for rec in records:
+        cols = _row_from_record(rec)
+        if any(col not in ("", "-", None) for col in cols):
+            all_data.append(cols + [current_date, tab_name])
+    print(f"🌐 {tab_name}: ได้ข้อมูลผ่าน HTTP {len(all_data)} แถว")
+    return all_data
+
+def open_tab(driver, tab_index: int) -> None:
+    """เปิดหน้า dam แล้วสลับไปแท็บที่ต้องการ (0 = แท็บแรก ไม่ต้องคลิก)"""
+    t0 = time.time()
+    with metrics.stage("page_load"):
         driver.get(URL)
+    with metrics.stage("wait_table"):
         WebDriverWait(driver, 15).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, ".MuiTable-root tbody tr"))
         )
-        large_dam_data = scrape_data("แหล่งน้ำขนาดใหญ่")
-        medium_tab_button = WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.XPATH, "//button[@aria-controls='tabpanel-1']"))
-        )
-        try:
-            WebDriverWait(driver, 10).until_not(
-                EC.presence_of_element_located((By.CLASS_NAME, "MuiBackdrop-root"))
-            )
-        except: pass
-        driver.execute_script("arguments[0].click();", medium_tab_button)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, ".MuiTable-root tbody tr"))
-        )
-        medium_dam_data = scrape_data("แหล่งน้ำขนาดกลาง")
-        rows_large = save_data_to_csv(large_dam_data, "large")
-        rows_medium = save_data_to_csv(medium_dam_data, "medium")
-        elapsed = time.time() - start_time
-        when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(
-            f"รันสำเร็จ {when}\n"
-            f"- Large: {rows_large} แถว\n"
-            f"- Medium: {rows_medium} แถว\n"
-            f"- ใช้เวลา: {elapsed:.2f} วินาที\n"
+    log_page_stats(driver, f"dam tab {tab_index}", t0)
+    if tab_index == 0:
+        return
+    if CAPTURE_JSON:
+        drain_json_responses(driver, CAPTURE_URL_PART)  # ทิ้ง JSON ของแท็บแรก
+    tab_button = WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.XPATH, f"//button[@aria-controls='tabpanel-{tab_index}']"))
+    )
+    try:
+        WebDriverWait(driver, 10).until_not(
+            EC.presence_of_element_located((By.CLASS_NAME, "MuiBackdrop-root"))
         )
-    except Exception as e:
-        when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"เกิดข้อผิดพลาด: {repr(e)} @ {when}")
-        raise
+    except: pass
+    driver.execute_script("arguments[0].click();", tab_button)
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, ".MuiTable-root tbody tr"))
+    )
+
+def scrape_tab(dam_type: str, ckpt: Checkpoint | None = None, sink: RowSink | None = None,
+               fp: Fingerprints | None = None) -> list[list[str]]:
+    """ดึงแท็บเดียวแบบครบวงจร: HTTP ก่อน (ถ้าเปิดใช้) แล้วค่อย browser ของตัวเอง"""
+    tab_name, tab_index = TABS[dam_type]
+    data = fetch_data_http(tab_name) if use_http() else []
+    if data:
+        return data
+    driver = make_driver("table", capture=CAPTURE_JSON)
+    try:
+        open_tab(driver, tab_index)
+        if CAPTURE_JSON:
+            data = capture_data(driver, tab_name)
+            if data is not None:
+                return data
+        if ckpt is not None and ckpt.page and not resume_to_checkpoint(driver, ckpt):
+            print(f"ℹ️ checkpoint ของ {tab_name} ไม่ตรงกับหน้าเว็บ -> เริ่มหน้า 1 ใหม่")
+            # แถวของรอบที่ค้างต่อท้ายไฟล์ไปแล้ว -> ตัดทิ้งก่อน ไม่งั้นหน้า 1.. ถูกเขียนซ้ำ
+            offset = ckpt.offset
+            if sink is not None and offset is not None:
+                sink.truncate(offset)
+            ckpt.clear()
+            if offset is not None:
+                ckpt.begin(offset)
+            open_tab(driver, tab_index)
+        return scrape_data(driver, tab_name, ckpt, sink, fp)
     finally:
         driver.quit()
+
+def open_sink(dam_type: str) -> RowSink:
+    """ต่อท้าย waterdam_report_{dam_type}.csv; แถวที่ไม่ตรงสคีมาไป quarantine/waterdam.csv ส่วนที่เหลือบันทึกตามปกติ"""
+    return RowSink(f"waterdam_report_{dam_type}.csv", mode="a", fmt="csv", schema=DAM)
+
+def _rows_since(path: str, offset: int) -> list[list[str]]:
+    """แถวที่ต่อท้ายไฟล์ตั้งแต่ byte offset (ไม่รวม header)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        text = f.read().decode("utf-8-sig")
+    rows = list(csv.reader(io.StringIO(text)))
+    return rows[1:] if offset == 0 else rows
+
+class _SkipStored:
+    """
+    ข้ามแถวที่ key (Dam, Data_Time, Water_Type) เคยเขียนลงไฟล์แล้ว เช่น workflow retry ในวันเดียวกัน
+    ดัชนีผูกกับขนาดไฟล์ CSV; ไฟล์ถูกแก้จากที่อื่น -> สร้างดัชนีใหม่จากไฟล์
+    """
+    def __init__(self, sink: RowSink, dam_type: str):
+        self.sink = sink
+        self.skipped = 0
+        self.index = KeyIndex(f"waterdam_{dam_type}", KEYS["waterdam"])
+        self._sync()
+
+    def _sync(self, force: bool = False) -> None:
+        size = os.path.getsize(self.sink.path) if os.path.exists(self.sink.path) else 0
+        if force or not self.index.synced(size):
+            if size:
+                self.index.rebuild(read_csv_fast(self.sink.path), size)
+            else:
+                self.index.rebuild(pd.DataFrame(columns=DAM_COLUMNS), 0)
+
+    def truncate(self, offset: int) -> None:
+        """ตัดไฟล์แล้วสร้างดัชนีใหม่จากไฟล์ (key ของแถวที่ถูกตัดต้องไม่ถูกข้ามรอบนี้)"""
+        self.sink.truncate(offset)
+        self._sync(force=True)
+
+    def write_rows(self, rows) -> int:
+        # ตรวจสคีมาก่อนลงดัชนี: แถวที่ถูกกักไม่ควรทำให้รอบถัดไปข้าม key นั้น
+        rows = self.sink.admit(rows)
+        if not rows:
+            return 0
+        df = pd.DataFrame(rows, columns=DAM_COLUMNS)
+        keep = ~(self.index.seen(df) | df.duplicated(subset=KEYS["waterdam"]).to_numpy())
+        self.skipped += len(rows) - int(keep.sum())
+        kept = [r for r, k in zip(rows, keep) if k]
+        self.index.add(df[keep])
+        return self.sink.write_rows(kept, checked=True)
+
+    def close(self) -> None:
+        if self.skipped:
+            print(f"⏭️ {self.sink.path}: ข้าม {self.skipped} แถวที่บันทึกไว้แล้ว")
+        if os.path.exists(self.sink.path):
+            self.index.commit(os.path.getsize(self.sink.path))
+        self.index.close()
+
+def run_tab(dam_type: str) -> int:
+    """
+    ดึงแล้วเขียนลงไฟล์ทีละหน้า เพื่อไม่ให้แท็บอื่นที่ล้มเหลวทำข้อมูลแท็บนี้หาย
+    แท็บที่ดึงครบแล้ววันนี้ถูกข้าม (retry หลังอีกแท็บล้มเหลวจะไม่ต่อท้ายแถวเดิมซ้ำ)
+    """
+    ckpt = Checkpoint(f"dam_{dam_type}")
+    if ckpt.done and not FORCE_SCRAPE:
+        print(f"✔ แท็บ {dam_type} ดึงครบแล้ววันนี้ -> ข้าม (FORCE_SCRAPE=true เพื่อดึงใหม่)")
+        return 0
+    skip = None
+    try:
+        with open_sink(dam_type) as sink:
+            start = os.path.getsize(sink.path) if os.path.exists(sink.path) else 0
+            ckpt.begin(start)
+            fp = Fingerprints(f"dam_{dam_type}", output=sink.path)
+            skip = _SkipStored(sink, dam_type) if KEY_INDEX_ENABLED else None
+            target = skip or sink
+            data = scrape_tab(dam_type, ckpt, target, fp)
+            if data and fp.payload_known(data):
+                data = []  # JSON/HTTP ได้ก้อนเดิมทุกแถว -> อยู่ในไฟล์แล้ว
+            target.write_rows(data)  # JSON/HTTP ได้ข้อมูลมาเป็นก้อนเดียว
+    finally:
+        # หลังปิด sink แล้ว -> fingerprint เป็นขนาดไฟล์สุดท้าย
+        # (ล้มเหลวกลางทางก็ต้องปิด ไม่งั้น retry ในโปรเซสเดียวกันเจอ database is locked)
+        if skip is not None:
+            skip.close()
+    fp.save()
+    if sink.rows:
+        print(f"💾 บันทึกข้อมูล {dam_type} ลงไฟล์ {sink.path} แล้ว ({sink.rows} แถว)")
+    elif fp.unchanged:
+        print(f"✔ ข้อมูล {dam_type} เหมือนรอบก่อน -> ไม่ต้องบันทึกซ้ำ")
+    else:
+        print(f"⚠️ ไม่มีข้อมูล {dam_type} ให้บันทึก")
+    if HISTORY_STORE and not fp.unchanged:
+        # ไล่หน้าแบบมี checkpoint: แถวครบทั้งวัน (รวมรอบก่อนที่ resume มา) อยู่ใน ckpt
+        # ปิด checkpoint: อ่านแถวที่รอบนี้ต่อท้ายไฟล์ (ไม่ถือสำเนาไว้ในหน่วยความจำระหว่างดึง)
+        if data:
+            rows = data
+        elif ckpt.state:
+            rows = ckpt.rows()
+        else:
+            rows = _rows_since(sink.path, ckpt.offset)
+        rows = DAM.filter(rows)
+        with metrics.stage("history_write"):
+            write_partition("waterdam", rows, dam_type, date_formats=("%m/%d/%Y",))
+    ckpt.mark_done()
+    return sink.rows
+
+def save_data_to_csv(data: list[list[str]], dam_type: str) -> int:
+    if not data:
+        print(f"⚠️ ไม่มีข้อมูล {dam_type} ให้บันทึก")
+        return 0
+    with open_sink(dam_type) as sink:
+        sink.write_rows(data)
+    print(f"💾 บันทึกข้อมูล {dam_type} ลงไฟล์ {sink.path} แล้ว ({sink.rows} แถว)")
+    return sink.rows
+
+# ================================== MAIN ================================== #
+if __name__ == "__main__":
+    start_time = time.time()
+    metrics.start("scrap3")
+    results: dict[str, int] = {}
+    errors: dict[str, Exception] = {}
+    workers = len(TABS) if PARALLEL_TABS else 1
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {dam_type: ex.submit(run_tab, dam_type) for dam_type in TABS}
+        for dam_type, fut in futures.items():
+            try:
+                results[dam_type] = fut.result()
+            except Exception as e:
+                errors[dam_type] = e
+                results[dam_type] = 0
+                when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                print(f"เกิดข้อผิดพลาด ({dam_type}): {repr(e)} @ {when}")
+
+    elapsed = time.time() - start_time
+    when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(
+        f"{'รันสำเร็จ' if not errors else 'รันเสร็จแต่มีข้อผิดพลาด'} {when}\n"
+        f"- Large: {results['large']} แถว\n"
+        f"- Medium: {results['medium']} แถว\n"
+        f"- ใช้เวลา: {elapsed:.2f} วินาที\n"
+    )
+    if errors:
+        sys.exit(1)
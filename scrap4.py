@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 import os, time, sys
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+import metrics
+from csv_ingest import engine_order, iter_csv_chunks, read_csv_fast, sniff
+from history_store import export_csv
+
 # ============================== PATH SETUP ==============================
 def _pick_existing(*candidates: Path) -> Path | None:
     for p in candidates:
@@ -37,6 +42,21 @@ if _out_candidate.drive:  # ถ้าเป็น path แบบมี drive (C:
 else:
     OUT_CSV = (BASE_DIR / _out_candidate).resolve()
 
+# ไฟล์ผลลัพธ์แบบมีชนิดข้อมูล (float32/datetime/category, ค่าว่างเป็น NaN) — ว่าง = ไม่สร้าง
+TYPED_OUT = os.getenv("TYPED_OUT", "")
+# รูปแบบ Data_Time ของไฟล์อินพุต (คั่นด้วย ,) เช่น "%m/%d/%Y" ของ scrap3
+# ว่าง = รูปแบบของไฟล์ประวัติเขื่อน (measurements.DATE_FORMATS["waterdam"] = d/m/Y)
+# ค่าที่แปลงไม่ได้/กำกวม -> หยุดด้วย ValueError (ไม่เขียน NaT)
+TYPED_DATE_FORMATS = tuple(f for f in os.getenv("TYPED_DATE_FORMATS", "").split(",") if f)
+
+# โหมดรวมไฟล์: memory = อ่านทั้งไฟล์ (เดิม), stream = อ่านทีละ chunk ภายใน MERGE_MEMORY_MB
+# auto = ใช้ stream เมื่อขนาดไฟล์อินพุต (x MEMORY_FACTOR) เกินงบหน่วยความจำ
+# store = export จาก history store (ต้องตั้ง MERGE_MODE=store เอง: คอลัมน์/รูปแบบตัวเลขและวันที่
+#         ไม่เหมือนไฟล์ของโหมด memory/stream ผู้ใช้ waterdam_report.csv เดิมจึงต้องเลือกเปลี่ยนเอง)
+MERGE_MODE = os.getenv("MERGE_MODE", "auto")  # auto | memory | stream | store
+MERGE_MEMORY_MB = int(os.getenv("MERGE_MEMORY_MB", "512"))
+MEMORY_FACTOR = 8  # DataFrame ของ string ใช้ RAM ราว ๆ 5-10 เท่าของขนาด CSV
+
 # ============================== GUARD ==============================
 def _fail_missing():
     print("❌ ไม่พบไฟล์อินพุตที่ต้องใช้สำหรับการรวมไฟล์", file=sys.stderr)
@@ -49,38 +69,173 @@ def _fail_missing():
     print('   MEDIUM_CSV=path/to/waterdam_report_medium.csv', file=sys.stderr)
     sys.exit(1)
 
-if LARGE_CSV is None or MEDIUM_CSV is None:
-    _fail_missing()
-
 # ======================== Core (รวมไฟล์ + Clean) ========================
+@metrics.timed("csv_read")
 def read_csv_smart(path: Path) -> pd.DataFrame:
     """
-    อ่าน CSV แบบทนทาน:
-    - ลองหลาย encoding (utf-8-sig, utf-8, cp874, latin-1)
+    อ่าน CSV แบบทนทาน (ดู csv_ingest):
+    - เดา encoding (utf-8-sig, utf-8, cp874, latin-1) และตัวคั่นจากส่วนต้นไฟล์ แล้วอ่านรอบเดียว
     - เก็บทุกคอลัมน์เป็น string เพื่อลดปัญหา type
     - on_bad_lines='warn' กัน crash ถ้ามีแถวเสียรูป
     """
-    encodings = ("utf-8-sig", "utf-8", "cp874", "latin-1")
-    last_err = None
-    for enc in encodings:
+    return read_csv_fast(path, verbose=True)
+
+# ค่าที่ถือว่า "ไม่มีข้อมูล" -> แทนด้วย "0" (เทียบแบบตรงตัว ก่อน strip เหมือนเดิม)
+ZERO_TOKENS = ("-", "--", "–", "—", "")
+
+def clean_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    ทำความสะอาดแบบ vectorized ทีละคอลัมน์ (ผลลัพธ์เหมือน fillna -> replace -> applymap(strip) เดิม)
+    - NaN -> "0", ค่าที่เป็นขีด/ว่าง (ตรงตัว) -> "0", ตัด space ซ้ายขวา
+    - ทำกับค่าที่ไม่ซ้ำของแต่ละคอลัมน์ (factorize) แล้วกระจายกลับด้วย take
+      ข้อมูลเขื่อนซ้ำกันสูง (ชื่อเขื่อน/วันที่/ตัวเลข) จึงประมวลผลแค่หลักพันค่าต่อคอลัมน์
+    """
+    out = {}
+    for col in df.columns:
+        codes, uniques = pd.factorize(df[col], use_na_sentinel=True)
+        cleaned = [
+            "0" if u in ZERO_TOKENS else (u.strip() if isinstance(u, str) else u)
+            for u in uniques
+        ]
+        cleaned.append("0")  # code -1 (NaN) -> ตัวสุดท้าย
+        out[col] = np.asarray(cleaned, dtype=object)[codes]
+    return pd.DataFrame(out, index=df.index, columns=df.columns)
+
+def save_typed(df: pd.DataFrame, path: Path) -> None:
+    """
+    เขียนข้อมูลเขื่อนที่แปลงชนิดแล้ว (measurements.type_dam_frame) เป็น parquet
+    ใช้ก่อน clean_frame เพื่อให้ค่าว่างยังเป็น NaN ไม่ใช่ "0"
+    """
+    from measurements import type_dam_frame
+    typed = type_dam_frame(df, TYPED_DATE_FORMATS or None)
+    raw_mb = df.memory_usage(deep=True).sum() / 1e6
+    typed_mb = typed.memory_usage(deep=True).sum() / 1e6
+    path.parent.mkdir(parents=True, exist_ok=True)
+    typed.to_parquet(path, index=False)
+    print(f"🧮 บันทึกแบบมีชนิดข้อมูล: {path} (หน่วยความจำ {raw_mb:,.1f} MB -> {typed_mb:,.1f} MB)")
+
+def _pick_encoding(path: Path) -> str:
+    """
+    ลำดับเดียวกับ read_csv_smart แต่ลอง decode ทั้งไฟล์ทีละบล็อก (ไม่ parse, ใช้หน่วยความจำคงที่)
+    โหมด stream เขียนผลไปแล้วย้อนกลับไม่ได้ จึงตรวจทั้งไฟล์แทนการเดาจากตัวอย่าง
+    """
+    import codecs
+    for enc in ("utf-8-sig", "utf-8", "cp874"):
+        dec = codecs.getincrementaldecoder(enc)()
         try:
-            return pd.read_csv(
-                path,
-                encoding=enc,
-                dtype=str,
-                low_memory=False,
-                on_bad_lines="warn",
-            )
-        except UnicodeDecodeError as e:
-            last_err = e
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    dec.decode(block)
+                dec.decode(b"", final=True)
+            return enc
+        except UnicodeDecodeError:
             continue
-    # ถ้ายังไม่ผ่าน ลอง auto อีกครั้ง
-    try:
-        return pd.read_csv(path, dtype=str, low_memory=False, on_bad_lines="warn")
-    except Exception as e:
-        raise RuntimeError(f"อ่านไฟล์ไม่ได้: {path} (last_err={last_err}, err={e})")
+    return "latin-1"
+
+def _row_bytes(path: Path, encoding: str, sep: str, columns: list) -> float:
+    """ประมาณ RAM ต่อแถวจากตัวอย่าง 2,000 แถวแรก"""
+    sample = pd.read_csv(path, encoding=encoding, sep=sep, dtype=str, nrows=2000, on_bad_lines="warn")
+    sample = sample.reindex(columns=columns)
+    return max(sample.memory_usage(deep=True).sum() / max(len(sample), 1), 64.0)
+
+def _iter_chunks(path: Path, encoding: str, sep: str, columns: list, dam_type: str, chunk_rows: int,
+                 engine: str):
+    # ตัวอ่านเดียวกับ read_csv_smart (csv_ingest) -> ค่า string เหมือนโหมด memory ทุกตัว
+    for chunk in iter_csv_chunks(path, encoding, sep, chunk_rows, engine):
+        # คอลัมน์ไม่ครบ -> NaN, เกิน -> ตัดทิ้ง (เหมือนโหมด memory)
+        chunk = chunk.reindex(columns=columns)
+        chunk["DamType"] = dam_type
+        yield clean_frame(chunk)
+
+@metrics.timed("merge_stream")
+def run_merge_stream():
+    """
+    รวม + clean + ลบแถวซ้ำ ทีละ chunk ผลลัพธ์เหมือนโหมด memory ทุก byte
+    - แถวซ้ำตรวจด้วย hash 64-bit ของทั้งแถว เก็บเป็น np.uint64 ที่เรียงไว้ (8 byte/แถว)
+    - ขนาด chunk คำนวณจาก MERGE_MEMORY_MB หลังหักที่ของ hash
+    - เขียนลง {OUT_CSV}.part ทีละ chunk แล้ว rename ตอนเสร็จ
+    """
+    fmt = {p: (_pick_encoding(p), sniff(p)[1]) for p in (LARGE_CSV, MEDIUM_CSV)}
+    enc, sep = fmt[LARGE_CSV]
+    columns = list(pd.read_csv(LARGE_CSV, encoding=enc, sep=sep, dtype=str, nrows=0).columns)
+    budget = MERGE_MEMORY_MB * 1024 * 1024
+    est_rows = sum(p.stat().st_size for p in (LARGE_CSV, MEDIUM_CSV)) // 32  # ขอบบนคร่าว ๆ
+    room = max(budget - est_rows * 8, budget // 4)
+    # /4: chunk ดิบ + ผล clean + hash + buffer ของ to_csv อยู่พร้อมกัน
+    chunk_rows = max(1000, int(room / 4 / _row_bytes(LARGE_CSV, enc, sep, columns)))
+    print(f"🌊 รวมแบบ stream: chunk ละ {chunk_rows:,} แถว (งบ {MERGE_MEMORY_MB} MB)")
+
+    part = OUT_CSV.with_name(OUT_CSV.name + ".part")
+    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    engines = engine_order()
+    for n, engine in enumerate(engines, 1):
+        try:
+            total, written = _stream_to(part, fmt, columns, chunk_rows, engine)
+            break
+        except Exception as e:
+            if n == len(engines):
+                raise
+            # แถวเสียรูปกลางไฟล์ (pyarrow) -> เขียน .part ใหม่ทั้งไฟล์ด้วย C engine
+            print(f"ℹ️ อ่านแบบ {engine} ไม่ผ่าน ({e}) -> เริ่มใหม่ด้วย C engine")
+    os.replace(part, OUT_CSV)
+
+    deduped = total - written
+    if deduped > 0:
+        print(f"🧹 ลบแถวซ้ำ {deduped:,} แถว")
+    print(f"💾 รวมไฟล์แล้ว: {OUT_CSV} ({written:,} แถว)")
+    return written, str(OUT_CSV)
+
+def _stream_to(part: Path, fmt: dict, columns: list, chunk_rows: int, engine: str) -> tuple[int, int]:
+    """เขียนผลรวมลง part ทีละ chunk; คืน (แถวที่อ่าน, แถวที่เขียน)"""
+    seen = np.empty(0, dtype=np.uint64)
+    total = written = 0
+    first = True
+    for path, dam_type in ((LARGE_CSV, "large"), (MEDIUM_CSV, "medium")):
+        for chunk in _iter_chunks(path, *fmt[path], columns + ["DamType"], dam_type, chunk_rows, engine):
+            total += len(chunk)
+            h = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            keep = ~pd.Series(h).duplicated().to_numpy()
+            if len(seen):
+                pos = np.searchsorted(seen, h).clip(max=len(seen) - 1)
+                keep &= seen[pos] != h
+            if keep.any():
+                seen = np.union1d(seen, h[keep])
+                chunk = chunk[keep]
+                chunk.to_csv(part, index=False, header=first, mode="w" if first else "a",
+                             encoding="utf-8-sig" if first else "utf-8")
+                first = False
+                written += len(chunk)
+    if first:  # ไม่มีแถวเลย -> เขียนแค่ header
+        pd.DataFrame(columns=columns + ["DamType"]).to_csv(part, index=False, encoding="utf-8-sig")
+    return total, written
+
+def _use_stream() -> bool:
+    if MERGE_MODE == "stream":
+        return True
+    if MERGE_MODE == "memory" or TYPED_OUT:  # TYPED_OUT ต้องใช้ข้อมูลทั้งก้อน
+        return False
+    size = sum(p.stat().st_size for p in (LARGE_CSV, MEDIUM_CSV))
+    return size * MEMORY_FACTOR > MERGE_MEMORY_MB * 1024 * 1024
+
+@metrics.timed("merge_store")
+def run_merge_store():
+    """
+    รวมจาก history store: scan partition ของ waterdam แบบ lazy แล้วเขียน CSV ทีละ batch
+    (ข้อมูลรายวันถูกแทนที่ทั้ง partition อยู่แล้ว จึงไม่ต้องลบแถวซ้ำทั้งประวัติ)
+    """
+    OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+    rows = export_csv("waterdam", str(OUT_CSV))
+    print(f"💾 รวมไฟล์แล้ว: {OUT_CSV} ({rows:,} แถว)")
+    return rows, str(OUT_CSV)
 
 def run_merge_only():
+    if MERGE_MODE == "store":
+        return run_merge_store()
+    if LARGE_CSV is None or MEDIUM_CSV is None:
+        _fail_missing()
+    if _use_stream():
+        return run_merge_stream()
+
     print(f"📥 อ่านไฟล์ใหญ่  : {LARGE_CSV}")
     print(f"📥 อ่านไฟล์กลาง : {MEDIUM_CSV}")
 
@@ -102,29 +257,33 @@ def run_merge_only():
     # รวม
     df = pd.concat([df_large, df_medium], ignore_index=True)
 
-    # ทำความสะอาดเบื้องต้น (ทำทุกคอลัมน์แบบ string)
-    df = df.fillna("0")
-    # แทนค่าขีด/ว่างเป็น "0"
-    df = df.replace({"-": "0", "--": "0", "–": "0", "—": "0", "": "0"})
-    # ตัด space ซ้ายขวา
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
+    if TYPED_OUT:
+        save_typed(df, Path(TYPED_OUT))
+
+    # ทำความสะอาดเบื้องต้น (NaN/ขีด/ว่าง -> "0", ตัด space) แบบ vectorized ทีละคอลัมน์
+    with metrics.stage("clean"):
+        df = clean_frame(df)
 
     # ลบแถวซ้ำ
     before = len(df)
-    df = df.drop_duplicates()
+    with metrics.stage("dedup"):
+        df = df.drop_duplicates()
     deduped = before - len(df)
     if deduped > 0:
         print(f"🧹 ลบแถวซ้ำ {deduped:,} แถว")
 
     OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(OUT_CSV, index=False, encoding="utf-8-sig")
+    with metrics.stage("csv_write"):
+        df.to_csv(OUT_CSV, index=False, encoding="utf-8-sig")
     print(f"💾 รวมไฟล์แล้ว: {OUT_CSV} ({len(df):,} แถว)")
     return len(df), str(OUT_CSV)
 
 # ================================== MAIN ==================================
 def main():
     t0 = time.time()
+    metrics.start("scrap4")
     rows, out_path = run_merge_only()
+    metrics.incr("rows_saved", rows)
     elapsed = time.time() - t0
     when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+โหมด daemon ของ scrap2: เปิด browser (หรือ HTTP session) ค้างไว้แล้วดึงระดับน้ำซ้ำทุก POLL_INTERVAL วินาที
+- แต่ละรอบเก็บเฉพาะแถวที่ Data_Time + Time ของสถานีเปลี่ยนจากรอบก่อน แล้วต่อท้าย DAEMON_OUT
+- หน่วยความจำคงที่: จำแค่วันเวลาล่าสุดต่อสถานี (จำนวนสถานีคงที่)
+- เปลี่ยน driver ใหม่เอง: ครบ DRIVER_MAX_POLLS รอบ / JS heap ของหน้าเว็บเกิน DRIVER_MAX_MB / เกิด error
+- FETCH_MODE=http + WATERLEVEL_API_URL: ไม่เปิด Chrome เลย (Session กลาง keep-alive)
+- CAPTURE_JSON=true: โหลดหน้าใหม่แล้วอ่าน JSON ที่ดักได้ ไม่ต้องไล่หน้า
+หยุดด้วย Ctrl+C / SIGTERM (หรือ MAX_POLLS รอบ)
+"""
+import csv
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import metrics
+import scrap2
+from browser import make_driver
+from http_fetch import use_http
+from pacing import backoff_delay
+from row_sink import RowSink
+
+# ================================== CONFIG ================================== #
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", "600"))
+DAEMON_OUT = os.getenv("DAEMON_OUT", "waterlevel_live.csv")
+DRIVER_MAX_POLLS = int(os.getenv("DRIVER_MAX_POLLS", "50"))
+DRIVER_MAX_MB = float(os.getenv("DRIVER_MAX_MB", "512"))
+MAX_POLLS = int(os.getenv("MAX_POLLS", "0"))  # 0 = ไม่หยุด
+
+TIME_COL = scrap2.HEADERS.index("Time")
+DATE_COL = scrap2.HEADERS.index("Data_Time")
+
+_JS_HEAP = "return (performance.memory && performance.memory.usedJSHeapSize) || 0;"
+
+
+# ================================== SOURCES ================================== #
+class _HttpSource:
+    def rows(self) -> List[List[str]]:
+        return scrap2.scrape_waterlevel_http()
+
+    def needs_recycle(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+class _BrowserSource:
+    """driver ตัวเดียวใช้ต่อหลายรอบ (ไม่ต้องเปิด Chrome ใหม่ทุกครั้ง)"""
+
+    def __init__(self):
+        self.driver = None
+        self.polls = 0
+
+    def rows(self) -> List[List[str]]:
+        if self.driver is None:
+            self.driver = make_driver("table", capture=scrap2.CAPTURE_JSON)
+        scrap2._open_table(self.driver)
+        self.polls += 1
+        current_date = datetime.now().strftime("%m/%d/%y")
+        if scrap2.CAPTURE_JSON:
+            captured = scrap2._rows_from_capture(self.driver, current_date)
+            if captured:
+                return captured
+        scrap2._prepare_table(self.driver)
+        pages = scrap2._scrape_page_range(self.driver, 1, scrap2.MAX_PAGES, current_date)
+        return scrap2._stitch_pages(pages, set())
+
+    def heap_mb(self) -> float:
+        try:
+            return float(self.driver.execute_script(_JS_HEAP) or 0) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def needs_recycle(self) -> bool:
+        if self.driver is None:
+            return False
+        if self.polls >= DRIVER_MAX_POLLS:
+            print(f"♻️ ใช้ driver ครบ {self.polls} รอบ -> เปิดใหม่")
+            return True
+        heap = self.heap_mb()
+        if heap > DRIVER_MAX_MB:
+            print(f"♻️ JS heap {heap:,.0f} MB เกิน {DRIVER_MAX_MB:,.0f} MB -> เปิดใหม่")
+            return True
+        return False
+
+    def close(self) -> None:
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+        self.polls = 0
+
+
+# ================================== DELTAS ================================== #
+def _key(row: List[str]) -> Tuple[str, str]:
+    return scrap2.extract_thai(row[0]), row[1] if len(row) > 1 else ""
+
+
+def _when(row: List[str]) -> Tuple[str, str]:
+    """
+    (Data_Time, Time) ของแถว: Time เป็นแค่ HH:MM สถานีที่รายงานเวลาเดิมทุกวัน (เช่น 07:00)
+    ต้องดูวันที่ด้วย ไม่งั้นค่าของวันใหม่ถูกมองว่าไม่เปลี่ยน
+    (ค่าเดิมที่ค้างข้ามเที่ยงคืนถูกเขียนอีกครั้งภายใต้ Data_Time วันใหม่ เหมือนไฟล์รายวันของ scrap2)
+    """
+    return (row[DATE_COL] if len(row) > DATE_COL else "",
+            row[TIME_COL] if len(row) > TIME_COL else "")
+
+
+class DeltaFilter:
+    """จำ (Data_Time, Time) ล่าสุดต่อ (Station, Location); รอบถัดไปคืนเฉพาะแถวที่เปลี่ยนหรือสถานีใหม่"""
+
+    def __init__(self):
+        self.last: Dict[Tuple[str, str], Tuple[str, str]] = {}
+
+    def seed(self, path: str) -> None:
+        """เริ่มจากแถวล่าสุดของแต่ละสถานีในไฟล์เดิม (อ่านทีละแถว ไม่โหลดทั้งไฟล์)"""
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) > TIME_COL:
+                    self.last[_key(row)] = _when(row)
+        print(f"📂 เริ่มจาก {len(self.last):,} สถานีใน {path}")
+
+    def take(self, rows: List[List[str]]) -> List[List[str]]:
+        current: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        changed = []
+        for row in rows:
+            key = _key(row)
+            when = _when(row)
+            if key not in current and self.last.get(key) != when:
+                changed.append(row)
+            current[key] = when
+        # อัปเดตแทนการแทนที่: รอบที่ได้ไม่ครบ (เช่น คลิกหน้าถัดไปพลาดกลางทาง) ต้องไม่ทำให้ลืมสถานีที่เหลือ
+        # ไม่งั้นรอบถัดไปที่ได้ครบจะต่อท้ายแถวเดิมของสถานีเหล่านั้นซ้ำ
+        self.last.update(current)
+        return changed
+
+
+# ================================== MAIN ================================== #
+def open_sink(path: str) -> RowSink:
+    """ต่อท้ายไฟล์ (header เดียวกับ scrap2 ตอนสร้างไฟล์ใหม่)"""
+    return RowSink(path, scrap2.HEADERS, mode="a", fmt="csv", transforms={"Station": scrap2.extract_thai},
+                   schema=scrap2.WATERLEVEL)
+
+
+def run() -> int:
+    metrics.start("waterlevel_daemon")
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    source = _HttpSource() if use_http() and scrap2.API_URL else _BrowserSource()
+    deltas = DeltaFilter()
+    deltas.seed(DAEMON_OUT)
+    print(f"🛰️ เริ่ม daemon: ทุก {POLL_INTERVAL:.0f}s -> {DAEMON_OUT} ({type(source).__name__.strip('_')})")
+
+    polls = failures = 0
+    try:
+        while not stop.is_set():
+            t0 = time.monotonic()
+            try:
+                with metrics.stage("poll"):
+                    rows = source.rows()
+                if not rows:
+                    raise RuntimeError("ไม่ได้แถวเลย")
+                new = deltas.take(rows)
+                if new:
+                    with open_sink(DAEMON_OUT) as sink:
+                        sink.write_rows(new)
+                metrics.incr("delta_rows", len(new))
+                print(f"🔁 {datetime.now():%H:%M:%S} รอบ {polls + 1}: {len(rows)} แถว, เปลี่ยน {len(new)} แถว "
+                      f"({time.monotonic() - t0:.1f}s)")
+                failures = 0
+                if source.needs_recycle():
+                    source.close()
+            except Exception as e:
+                failures += 1
+                metrics.incr("poll_errors")
+                print(f"⚠️ รอบนี้ล้มเหลว ({failures} ครั้งติด): {repr(e)} -> เปิด driver ใหม่")
+                source.close()
+                stop.wait(backoff_delay(failures, base=5, cap=POLL_INTERVAL))
+                continue
+            polls += 1
+            if MAX_POLLS and polls >= MAX_POLLS:
+                break
+            stop.wait(max(0.0, POLL_INTERVAL - (time.monotonic() - t0)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.close()
+    print(f"⏹ หยุด daemon หลัง {polls} รอบ")
+    return polls
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+ต่อท้ายไฟล์ระดับน้ำ (CSV_OUT ของ scrap2) เข้ากับไฟล์บน Google Drive (รวม + ลบซ้ำ + สคีมา waterlevel)
+- มี DRIVE_FILE_ID -> sync เข้าไฟล์นั้น
+- ไม่มี -> หาไฟล์ชื่อเดียวกันใน DRIVE_FOLDER_ID; ไม่พบและเป็น Shared Drive -> สร้างใหม่
+เดิมเป็นสคริปต์ในขั้น "Append & Upload to Google Drive" ของ auto_waterlevel.yml
+แยกออกมาเพื่อให้ orchestrate.py เรียกเป็นฟังก์ชันได้
+"""
+import io
+import json
+import os
+import sys
+from typing import Optional
+
+import pandas as pd
+from google.oauth2.service_account import Credentials
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
+
+import metrics
+from drive_sync import sync_append
+from schemas import SCHEMAS
+
+
+def normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """สคีมา 9 คอลัมน์ (อังกฤษ) ของ schemas.SCHEMAS["waterlevel"]; หัวคอลัมน์ไทยแปลงตาม alias"""
+    return SCHEMAS["waterlevel"].normalize(df)
+
+
+def read_bytes(data: bytes) -> pd.DataFrame:
+    try:
+        return pd.read_csv(io.BytesIO(data))
+    except Exception:
+        return pd.read_csv(io.BytesIO(data), encoding="utf-8-sig")
+
+
+def _escape_single_quotes(s: str) -> str:
+    return s.replace("'", "\\'")
+
+
+def _find_by_name_in_folder(drive, name: str, folder_id: str) -> Optional[dict]:
+    q = "name = '{}' and '{}' in parents and trashed = false".format(_escape_single_quotes(name), folder_id)
+    r = drive.files().list(q=q, fields="files(id,name,mimeType)", supportsAllDrives=True,
+                           includeItemsFromAllDrives=True).execute()
+    files = r.get("files", [])
+    return files[0] if files else None
+
+
+def _create_new(drive, csv_path: str, folder_id: Optional[str], df: pd.DataFrame) -> str:
+    tmp = "__merged_upload.csv"
+    df.to_csv(tmp, index=False, encoding="utf-8-sig")
+    body = {"name": os.path.basename(csv_path)}
+    if folder_id:
+        body["parents"] = [folder_id]
+    media = MediaFileUpload(tmp, mimetype="text/csv", resumable=True)
+    created = drive.files().create(body=body, media_body=media, fields="id", supportsAllDrives=True).execute()
+    print(f"✅ Created new fileId={created['id']}, rows={len(df)}")
+    return created["id"]
+
+
+def upload_waterlevel(csv_path: str, sa_info: dict, file_id: Optional[str] = None,
+                      folder_id: Optional[str] = None) -> int:
+    """sync csv_path ขึ้น Drive แล้วคืนจำนวนแถวของไฟล์บน Drive; ทำไม่ได้ -> RuntimeError"""
+    new_df = normalize(pd.read_csv(csv_path))
+    creds = Credentials.from_service_account_info(sa_info, scopes=["https://www.googleapis.com/auth/drive"])
+    drive = build("drive", "v3", credentials=creds, cache_discovery=False)
+
+    def sync_update(fid: str) -> int:
+        # ดาวน์โหลดเฉพาะเมื่อไฟล์บน Drive เปลี่ยน (cache ตาม md5) / ลบซ้ำตาม Station + Data_Time (+Time)
+        rows = sync_append(drive, fid, new_df, "waterlevel", reader=read_bytes, normalize=normalize,
+                           fresh_on_error=False)
+        print(f"✅ Synced fileId={fid}, rows={rows}")
+        return rows
+
+    # 1) ถ้ามี FILE_ID -> ดาวน์โหลดเดิม, รวม, ลบซ้ำ, อัปเดตทับ
+    if file_id:
+        return sync_update(file_id)
+
+    # 2) ไม่มี FILE_ID -> หาไฟล์เดิมตามชื่อในโฟลเดอร์ที่ระบุ
+    if not folder_id:
+        raise RuntimeError("ต้องใส่ DRIVE_FILE_ID (ไฟล์เดิม) หรือ PURIPAT_ID (โฟลเดอร์ปลายทาง)")
+    try:
+        fmeta = drive.files().get(fileId=folder_id, fields="id,name,mimeType,driveId,size,parents",
+                                  supportsAllDrives=True).execute()
+    except HttpError as e:
+        raise RuntimeError(f"อ่านโฟลเดอร์ไม่สำเร็จ: {e}") from e
+
+    existing = _find_by_name_in_folder(drive, os.path.basename(csv_path), folder_id)
+    if existing:
+        return sync_update(existing["id"])
+
+    # 3) ไม่พบไฟล์เดิม: Shared Drive สร้างใหม่ได้
+    if fmeta.get("driveId"):
+        _create_new(drive, csv_path, folder_id, new_df)
+        return len(new_df)
+    # โฟลเดอร์เป็น My Drive และไม่มีไฟล์เดิม -> SA ไม่มีโควตาสร้างใหม่
+    raise RuntimeError(
+        "โฟลเดอร์นี้เป็น My Drive และไม่พบไฟล์เดิมให้ append; SA ไม่สามารถ 'สร้างใหม่' ใน My Drive ได้\n"
+        "👉 วิธีใช้ append บน My Drive: สร้างไฟล์ว่างชื่อเดียวกันในโฟลเดอร์นี้ แล้วแชร์ให้ SA เป็น Editor "
+        "หรือใส่ DRIVE_FILE_ID ของไฟล์นั้น"
+    )
+
+
+def main() -> None:
+    metrics.start("waterlevel_drive")
+    try:
+        upload_waterlevel(
+            os.environ.get("CSV_OUT", "waterlevel_report.csv"),
+            json.loads(os.environ["SERVICE_ACCOUNT_JSON"]),
+            file_id=(os.environ.get("DRIVE_FILE_ID") or "").strip() or None,
+            folder_id=(os.environ.get("DRIVE_FOLDER_ID") or "").strip() or None,
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()